@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Database-backed benchmarks of parsing, auto-tag filtering, related tags
+   and the tags view, reporting latency and query counts. """
+from __future__ import unicode_literals, print_function
+
+import shutil
+import tempfile
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from colloquial.colloquialisms.models import Colloquialism
+from colloquial.colloquialisms.views import tags_data
+
+from .seed import seed
+from .utils import time_call, report
+
+
+class Rollback(Exception):
+    pass
+
+
+def measure(func, repeat):
+    """Return (seconds, queries) for func; queries from a single run. """
+
+    with CaptureQueriesContext(connection) as queries:
+        func()
+    return time_call(func, repeat), len(queries)
+
+
+def run(sizes=(1000, 2000, 4000, 8000), repeat=3, seed_value=0):
+    """For each size K, seed K tags over K / 100 transcripts and K / 20
+       colloquialisms, inside a transaction which is rolled back afterwards,
+       and time each path. Returns a dict of name to scaling exponent. """
+
+    paths = ('parse(save=True)', 'filter_auto', 'related_tags', 'tags_data')
+    results = dict((path, []) for path in paths)
+    media_root = tempfile.mkdtemp()
+
+    try:
+        with override_settings(MEDIA_ROOT=media_root):
+            for size in sizes:
+                try:
+                    with transaction.atomic():
+                        transcripts = seed(
+                            transcripts=max(size // 100, 2),
+                            colloquialisms=max(size // 20, 10),
+                            tags=size, seed=seed_value)
+                        item = transcripts[0]
+
+                        def parse():
+                            item.get_tags().delete()
+                            item.parse(save=True)
+
+                        results['parse(save=True)'].append(
+                            measure(parse, repeat))
+                        results['filter_auto'].append(measure(
+                            lambda: list(Colloquialism.objects.filter_auto()),
+                            repeat))
+                        results['related_tags'].append(measure(
+                            lambda: list(item.related_tags()
+                                         .with_colloquialism()
+                                         .with_transcript()),
+                            repeat))
+                        results['tags_data'].append(
+                            measure(lambda: tags_data(item), repeat))
+
+                        raise Rollback
+                except Rollback:
+                    pass
+    finally:
+        shutil.rmtree(media_root)
+
+    exponents = {}
+    for path in paths:
+        times = [seconds for seconds, queries in results[path]]
+        exponents[path] = report(path, 'tag', sizes, times)
+        print('  queries: %s\n' % ', '.join(
+            '%s' % queries for seconds, queries in results[path]))
+
+    return exponents
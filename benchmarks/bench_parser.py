@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""Parser micro-benchmarks over synthetic transcripts. """
+from __future__ import unicode_literals, print_function
+
+from StringIO import StringIO
+
+from colloquial.colloquialisms.parser import parse_tags, parse_transcript, \
+    auto_tag_text, auto_tag_file, get_webvttfile
+
+from .corpus import generate_vocabulary, generate_transcript, TYPES
+from .utils import time_call, report
+
+
+def get_tag(start, start_exact, colloquialism):
+    return (colloquialism, start_exact)
+
+
+def get_colloquialism(value, language, type):
+    return value
+
+
+def run(sizes=(100, 200, 400, 800), vocabulary_sizes=(10, 100, 1000),
+        repeat=3, seed=0):
+    """Time each parser entry point against growing cue counts, and the
+       auto-tag functions against growing vocabularies. Returns a dict of
+       benchmark name to scaling exponent. """
+
+    exponents = {}
+    vocabulary = generate_vocabulary(max(vocabulary_sizes), seed=seed)
+    base_vocabulary = vocabulary[:min(vocabulary_sizes)]
+
+    contents = dict(
+        (size, generate_transcript(size, base_vocabulary, seed=seed))
+        for size in sizes)
+    plain_contents = dict(
+        (size, generate_transcript(size, base_vocabulary, tagged=False,
+                                   seed=seed))
+        for size in sizes)
+
+    # parse_tags over the concatenated cue text
+    texts = dict(
+        (size, [item.text for item in
+                get_webvttfile(StringIO(contents[size]))])
+        for size in sizes)
+    times = [time_call(lambda: [list(parse_tags(t)) for t in texts[size]],
+                       repeat)
+             for size in sizes]
+    exponents['parse_tags'] = report('parse_tags', 'cue', sizes, times)
+
+    times = [time_call(lambda: parse_transcript(
+                StringIO(contents[size]), 'en', TYPES, get_tag,
+                get_colloquialism), repeat)
+             for size in sizes]
+    exponents['parse_transcript'] = report(
+        'parse_transcript', 'cue', sizes, times)
+
+    times = [time_call(lambda: auto_tag_file(
+                StringIO(plain_contents[size]), base_vocabulary, StringIO()),
+                repeat)
+             for size in sizes]
+    exponents['auto_tag_file'] = report('auto_tag_file', 'cue', sizes, times)
+
+    # auto_tag_text against growing vocabularies, on a fixed text
+    text = '\n'.join(
+        item.text for item in
+        get_webvttfile(StringIO(plain_contents[min(sizes)])))
+    times = [time_call(lambda: auto_tag_text(text, vocabulary[:size]),
+                       repeat)
+             for size in vocabulary_sizes]
+    exponents['auto_tag_text'] = report(
+        'auto_tag_text', 'vocabulary entry', vocabulary_sizes, times)
+
+    return exponents
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""Synthetic WebVTT corpus generator for benchmarks.
+
+Generates transcripts resembling the te reo Māori archive - macron-heavy
+text, voice spans, tagged colloquialisms and tags left unclosed across cue
+boundaries - along with vocabularies of any size. Output is deterministic for
+a given seed.
+"""
+from __future__ import unicode_literals
+
+import random
+from itertools import product
+
+
+WORDS = (
+    'ā', 'ānō', 'āhua', 'ēnei', 'ētahi', 'hāpū', 'hōhā', 'īnoi', 'kāinga',
+    'kōrero', 'kōtiro', 'kūmara', 'māhaki', 'māra', 'mātua', 'mōhio',
+    'nō', 'nā', 'ōku', 'pēnei', 'pūrākau', 'rā', 'rākau', 'tāku', 'tāne',
+    'tēnā', 'tērā', 'tēnei', 'tūnga', 'wāhi', 'wāhine', 'whānau', 'whāngai',
+    'ariki', 'awa', 'haere', 'hapu', 'he', 'hei', 'i', 'iwi', 'ka', 'kai',
+    'kaumatua', 'ki', 'ko', 'koe', 'mai', 'marae', 'me', 'moana', 'nei',
+    'ngā', 'o', 'pea', 'reo', 'roto', 'tahi', 'taua', 'te', 'tupu', 'whai',
+)
+
+NAMES = (
+    'Hohepa', 'Tipene', 'Rukuwai', 'Matire', 'Rapihana', 'Ngārama', 'Maru',
+    'Panguru', 'Hokianga', 'Rārawa', 'Mītai', 'Pōmare', 'Tāwhiao', 'Hēni',
+)
+
+PUNCTUATION = ('', '', '', '', ',', '.', '?')
+
+TYPES = ('idiom', 'proper_name', 'place')
+
+
+def generate_vocabulary(size, types=TYPES, seed=0):
+    """Return a list of size distinct {'type': ..., 'value': ...} dicts, as
+       accepted by auto_tag_text. Values are one to three words long. """
+
+    rng = random.Random(seed)
+    words = WORDS + NAMES
+
+    candidates = [(w, ) for w in words] + list(product(NAMES, words)) + \
+        list(product(words, words, NAMES))
+    if size > len(candidates):
+        raise ValueError('Vocabulary size must be at most %s' %
+                         len(candidates))
+
+    values = rng.sample(candidates, size)
+    return [{'type': rng.choice(types), 'value': ' '.join(v)}
+            for v in values]
+
+
+def format_time(ms):
+    return '%02d:%02d:%02d.%03d' % (
+        ms // 3600000, ms // 60000 % 60, ms // 1000 % 60, ms % 1000)
+
+
+def generate_transcript(cues, vocabulary, tag_density=0.1,
+                        voice_span_rate=0.2, cross_cue_rate=0.05,
+                        words_per_cue=20, tagged=True, seed=0):
+    """Return the content of a WebVTT file with the given number of cues.
+
+       tag_density is the proportion of words which start a vocabulary
+       phrase. Phrases are wrapped in <c.TYPE> tags unless tagged is False,
+       in which case the plain text is suitable for auto-tagging.
+       cross_cue_rate is the chance of a multi-word tag being split across
+       the end of one cue and the start of the next, and voice_span_rate the
+       chance of a cue starting with a <v NAME> span.
+    """
+
+    rng = random.Random(seed)
+    lines = ['WEBVTT', '']
+    carry = ''
+    start = 0
+
+    for index in range(1, cues + 1):
+        words = [carry] if carry else []
+        carry = ''
+
+        while len(words) < words_per_cue:
+            if vocabulary and rng.random() < tag_density:
+                info = rng.choice(vocabulary)
+                value = info['value']
+                if tagged:
+                    words.append('<c.%s>%s</c>' % (info['type'], value))
+                else:
+                    words.append(value)
+            else:
+                words.append(rng.choice(WORDS) + rng.choice(PUNCTUATION))
+
+        # split a multi-word tag over the cue boundary
+        if tagged and vocabulary and rng.random() < cross_cue_rate:
+            multi = [v for v in vocabulary if ' ' in v['value']]
+            if multi:
+                info = rng.choice(multi)
+                first, rest = info['value'].split(' ', 1)
+                words.append('<c.%s>%s' % (info['type'], first))
+                carry = '%s</c>' % rest
+
+        text = ' '.join(words)
+        if rng.random() < voice_span_rate:
+            text = '<v %s> %s' % (rng.choice(NAMES[:3]), text)
+
+        # wrap lines at roughly 60 characters
+        cue_lines = []
+        line = []
+        for word in text.split(' '):
+            line.append(word)
+            if sum(len(w) + 1 for w in line) > 60:
+                cue_lines.append(' '.join(line))
+                line = []
+        if line:
+            cue_lines.append(' '.join(line))
+
+        end = start + rng.randint(2000, 10000)
+        lines.extend([
+            '%s' % index,
+            '%s --> %s' % (format_time(start), format_time(end)),
+        ] + cue_lines + [''])
+        start = end
+
+    return '\n'.join(lines)
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""Seed the database with a synthetic corpus for the database benchmarks. """
+from __future__ import unicode_literals
+
+import random
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+
+from colloquial.colloquialisms.models import Colloquialism
+from colloquial.transcripts.models import Transcript, Tag
+
+from .corpus import generate_vocabulary, generate_transcript
+
+
+def seed(transcripts, colloquialisms, tags, language='en', types=None,
+         cues=100, files=1, seed=0):
+    """Create the given numbers of Transcript, Colloquialism and Tag rows
+       with bulk inserts, with tags spread randomly over transcripts and
+       colloquialisms. The first files transcripts get a synthetic
+       transcript file of the given number of cues, tagged from the
+       vocabulary. Returns the list of transcripts. """
+
+    rng = random.Random(seed)
+    if types is None:
+        types = [t[0] for t in Colloquialism._meta.get_field('type').choices]
+
+    vocabulary = generate_vocabulary(colloquialisms, types=types, seed=seed)
+    Colloquialism.objects.bulk_create(
+        Colloquialism(type=v['type'], value=v['value'], language=language,
+                      normalised_value=Colloquialism.normalise_value(
+                          v['value'], v['type']))
+        for v in vocabulary)
+
+    Transcript.objects.bulk_create(
+        Transcript(title='Transcript %s' % i, language=language)
+        for i in range(transcripts))
+    transcript_list = list(Transcript.objects.order_by('pk'))
+    colloquialism_pks = list(
+        Colloquialism.objects.values_list('pk', flat=True))
+
+    batch = []
+    for i in range(tags):
+        start = timedelta(seconds=rng.randint(0, 3600))
+        batch.append(Tag(
+            transcript=rng.choice(transcript_list),
+            colloquialism_id=rng.choice(colloquialism_pks),
+            start=start, start_exact=start))
+    Tag.objects.bulk_create(batch, batch_size=500)
+
+    for i, transcript in enumerate(transcript_list[:files]):
+        content = generate_transcript(
+            cues, vocabulary[:50], seed=seed + i).encode('utf-8')
+        transcript.transcript_file.save(
+            'transcript_%s.vtt' % transcript.pk, ContentFile(content))
+
+    return transcript_list
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""Timing and reporting helpers shared by the benchmark modules. """
+from __future__ import unicode_literals, print_function, division
+
+import math
+import timeit
+
+
+def time_call(func, repeat=3, number=1):
+    """Return the best time in seconds of repeat runs of func. """
+
+    timer = timeit.Timer(func)
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def scaling_exponent(sizes, times):
+    """Least-squares slope of log(time) against log(size); ~1 means linear
+       scaling, ~2 quadratic. """
+
+    points = [(math.log(s), math.log(t)) for s, t in zip(sizes, times)
+              if s > 0 and t > 0]
+    if len(points) < 2:
+        return None
+
+    mean_x = sum(x for x, y in points) / len(points)
+    mean_y = sum(y for x, y in points) / len(points)
+    numerator = sum((x - mean_x) * (y - mean_y) for x, y in points)
+    denominator = sum((x - mean_x) ** 2 for x, y in points)
+
+    return numerator / denominator if denominator else None
+
+
+def report(name, unit, sizes, times):
+    """Print a scaling curve for a benchmark and return its exponent. """
+
+    exponent = scaling_exponent(sizes, times)
+
+    print('%s (by %s)' % (name, unit))
+    for size, seconds in zip(sizes, times):
+        print('  %10d  %10.4fs  %10.1fus/%s' % (
+            size, seconds, seconds * 1e6 / size, unit))
+    if exponent is not None:
+        print('  scaling exponent: %.2f' % exponent)
+    print('')
+
+    return exponent
@@ -0,0 +1 @@
+default_app_config = 'colloquial.colloquialisms.apps.ColloquialismsConfig'
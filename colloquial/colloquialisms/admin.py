@@ -2,19 +2,85 @@
 from __future__ import unicode_literals
 
 from django.contrib import admin
+from django.conf import settings
 from django.conf.urls import url
-from django.core.urlresolvers import reverse
+from django.core.paginator import Paginator
+from django.core.urlresolvers import reverse, NoReverseMatch
+from django.utils.functional import cached_property
+from django.utils.html import format_html, format_html_join
 
-from .models import Colloquialism
+from .models import Colloquialism, ColloquialismStats
 from . import admin_views
 
 
+# transcripts with more tags than this show a summary instead of the inline
+INLINE_TAG_LIMIT = getattr(settings, 'COLLOQUIAL_ADMIN_INLINE_TAG_LIMIT', 100)
+
+# number of colloquialisms listed in the tag summary
+SUMMARY_LENGTH = 20
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator which uses table statistics for the unfiltered count, where
+       the queryset supports it (see TagQuerySet.estimated_count). """
+
+    @cached_property
+    def count(self):
+        if hasattr(self.object_list, 'estimated_count'):
+            return self.object_list.estimated_count()
+        return super(EstimatedCountPaginator, self).count
+
+
 @admin.register(Colloquialism)
 class ColloquialismAdmin(admin.ModelAdmin):
-    list_display = ('value', 'type', 'language', 'created', 'updated', )
+    list_display = ('value', 'type', 'language', 'occurrences',
+                    'transcripts', 'created', 'updated', )
     list_filter = ('type', 'language', 'created', )
+    list_select_related = ('stats', )
     search_fields = ('value', 'meaning')
 
+    def get_stats(self, obj):
+        try:
+            return obj.stats
+        except ColloquialismStats.DoesNotExist:
+            return None
+
+    def occurrences(self, obj):
+        stats = self.get_stats(obj)
+        return stats.occurrences if stats else 0
+
+    occurrences.admin_order_field = 'stats__occurrences'
+
+    def transcripts(self, obj):
+        stats = self.get_stats(obj)
+        return stats.transcripts if stats else 0
+
+    transcripts.admin_order_field = 'stats__transcripts'
+
+
+class BaseTagInline(admin.TabularInline):
+    """Inline for AbstractTag subclasses. Uses a raw id widget rather than
+       rendering every colloquialism into a select on every row. """
+
+    extra = 0
+    raw_id_fields = ('colloquialism', )
+
+    def get_queryset(self, request):
+        qs = super(BaseTagInline, self).get_queryset(request)
+        return qs.with_colloquialism()
+
+
+class BaseTagAdmin(admin.ModelAdmin):
+    """Admin for AbstractTag subclasses, suitable for very large tag tables.
+       Subclasses should add the transcript relation to list_select_related
+       and raw_id_fields. """
+
+    list_display = ('colloquialism', 'start', )
+    list_select_related = ('colloquialism', )
+    raw_id_fields = ('colloquialism', )
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
 
 class BaseTranscriptAdmin(admin.ModelAdmin):
     def get_url_name(self, view):
@@ -35,6 +101,57 @@ class BaseTranscriptAdmin(admin.ModelAdmin):
 
     links.allow_tags = True
 
+    def tag_summary(self, obj):
+        """Read-only summary of the most frequent colloquialisms in the
+           transcript, with a link to the paginated tag changelist. """
+
+        if not obj.pk:
+            return ''
+
+        tag_cls = obj.get_tag_cls()
+        counts = obj.get_tags().get_counts()
+        top = sorted(counts.items(), key=lambda c: c[1],
+                     reverse=True)[:SUMMARY_LENGTH]
+        colloquialisms = Colloquialism.objects.in_bulk(
+            [pk for pk, count in top])
+
+        summary = format_html_join(
+            '', '<li>{} ({})</li>',
+            ((colloquialisms[pk], count) for pk, count in top))
+
+        try:
+            changelist_url = reverse('admin:%s_%s_changelist' % (
+                tag_cls._meta.app_label, tag_cls._meta.model_name))
+        except NoReverseMatch:
+            link = ''
+        else:
+            link = format_html(
+                '<a href="{}?{}={}">View all {} tags</a>', changelist_url,
+                tag_cls.transcript_rel, obj.pk, sum(counts.values()))
+
+        return format_html('<ul>{}</ul>{}', summary, link)
+
+    tag_summary.short_description = 'Tag summary'
+
+    def get_inline_instances(self, request, obj=None):
+        """Omit tag inlines for transcripts with too many tags to edit in a
+           single page; tag_summary links to the tag changelist instead. """
+
+        inlines = super(BaseTranscriptAdmin, self).get_inline_instances(
+            request, obj)
+
+        if obj is None:
+            return inlines
+
+        tag_cls = obj.get_tag_cls()
+        tag_inlines = [i for i in inlines if i.model is tag_cls]
+        if tag_inlines and \
+                obj.get_tags()[:INLINE_TAG_LIMIT + 1].count() > \
+                INLINE_TAG_LIMIT:
+            return [i for i in inlines if i not in tag_inlines]
+
+        return inlines
+
     def get_urls(self):
         urls = super(BaseTranscriptAdmin, self).get_urls()
 
@@ -19,15 +19,15 @@ def process_transcript(request, item_cls, pk):
     tags, errors = transcript.parse()
 
     if len(tags) and request.method == 'POST':
-        delete_count, __ = transcript.tags.all().delete()
-        tags, errors = transcript.parse(save=True)
+        delete_count = transcript.clear_tags()
+        count, errors = transcript.parse(save=True)
 
         for error in errors:
             messages.add_message(request, messages.ERROR, error)
 
         if not(len(errors)):
             msg = '%s tags deleted, %s tags added.' % (
-                delete_count, len(tags))
+                delete_count, count)
             messages.add_message(request, messages.INFO, msg)
 
         return redirect(change_view, transcript.pk)
@@ -2,7 +2,55 @@
 from __future__ import unicode_literals
 
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.models.signals import post_delete, pre_delete, pre_save, \
+    post_save
+from django.utils.module_loading import import_string
 
+from . import instrumentation
 
-class AccountsConfig(AppConfig):
-    name = 'colloquialisms'
+
+class ColloquialismsConfig(AppConfig):
+    name = 'colloquial.colloquialisms'
+    label = 'colloquialisms'
+
+    def ready(self):
+        from .signals import clear_transcript_index, \
+            clear_transcript_similarity, clear_transcript_stats, \
+            check_retag, retag_on_save
+        from .registry import get_transcript_models
+        from .vocabulary import invalidate
+
+        # rebuild auto-tag matchers when the vocabulary changes
+        colloquialism = self.get_model('Colloquialism')
+        post_save.connect(invalidate, sender=colloquialism,
+                          dispatch_uid='colloquial_invalidate_vocabulary')
+        post_delete.connect(invalidate, sender=colloquialism,
+                            dispatch_uid='colloquial_invalidate_vocabulary')
+
+        # connect to transcript models only, so that other models (tags in
+        # particular) can still be deleted without fetching them first
+        for model in get_transcript_models():
+            post_delete.connect(
+                clear_transcript_index, sender=model,
+                dispatch_uid='colloquial_clear_transcript_index')
+            post_delete.connect(
+                clear_transcript_similarity, sender=model,
+                dispatch_uid='colloquial_clear_transcript_similarity')
+            pre_delete.connect(
+                clear_transcript_stats, sender=model,
+                dispatch_uid='colloquial_clear_transcript_stats')
+
+        # tag new or newly enabled colloquialisms as they are saved; off by
+        # default since it runs in the request, see retag_colloquialisms
+        # for the alternative
+        if getattr(settings, 'COLLOQUIAL_RETAG_ON_SAVE', False):
+            pre_save.connect(check_retag, sender=colloquialism,
+                             dispatch_uid='colloquial_check_retag')
+            post_save.connect(retag_on_save, sender=colloquialism,
+                              dispatch_uid='colloquial_retag_on_save')
+
+        # dotted paths to MetricsSink subclasses, e.g.
+        # 'colloquial.colloquialisms.signals.SignalSink'
+        for path in getattr(settings, 'COLLOQUIAL_METRICS_SINKS', ()):
+            instrumentation.add_sink(import_string(path)())
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""Prefix autocomplete over colloquialisms, for as-you-type suggestions.
+
+   Colloquialisms are loaded into a prefix trie on normalised_value per
+   language and type, on first use, and kept for the life of the process.
+   They're reloaded when the vocabulary version changes (see vocabulary.py),
+   so lookups don't query the database between vocabulary changes.
+"""
+from __future__ import unicode_literals
+
+from collections import defaultdict
+from heapq import merge
+from itertools import islice
+
+from .vocabulary import get_version
+
+
+_tries = {}
+_version = [None]
+
+
+class Node(object):
+    __slots__ = ('children', 'entries')
+
+    def __init__(self):
+        self.children = {}
+        self.entries = []
+
+
+class PrefixTrie(object):
+    """Trie of entries by key, e.g. normalised value. Entries may be any
+       value; those with the same key are returned in insertion order. """
+
+    def __init__(self, items=()):
+        self.root = Node()
+        self.size = 0
+        for key, entry in items:
+            self.add(key, entry)
+
+    def __len__(self):
+        return self.size
+
+    def add(self, key, entry):
+        node = self.root
+        for char in key:
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = Node()
+            node = child
+        node.entries.append(entry)
+        self.size += 1
+
+    def iter_prefix(self, prefix):
+        """Yield (key, entry) for keys starting with prefix, in key order.
+        """
+
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return
+
+        # depth first, so shorter keys come before their extensions
+        stack = [(prefix, node)]
+        while stack:
+            key, node = stack.pop()
+            for entry in node.entries:
+                yield key, entry
+            for char in sorted(node.children, reverse=True):
+                stack.append((key + char, node.children[char]))
+
+    def complete(self, prefix, limit=None):
+        """Return a list of entries whose keys start with prefix, in key
+           order, up to limit. """
+
+        return [entry for key, entry in
+                islice(self.iter_prefix(prefix), limit)]
+
+
+def get_tries(language):
+    """Return a dict of PrefixTries of colloquialisms in language, by type.
+       Entries are dicts with 'id', 'type', 'value' and 'normalised_value'
+       keys. """
+
+    from .models import Colloquialism
+
+    version = get_version()
+    if version != _version[0]:
+        _tries.clear()
+        _version[0] = version
+
+    # another thread may clear _tries at any point, so only look it up once
+    tries = _tries.get(language)
+    if tries is None:
+        by_type = defaultdict(PrefixTrie)
+        for info in Colloquialism.objects.filter(language=language) \
+                .order_by('normalised_value', 'pk') \
+                .values('id', 'type', 'value', 'normalised_value'):
+            by_type[info['type']].add(info['normalised_value'], info)
+        tries = _tries[language] = dict(by_type)
+    return tries
+
+
+def complete(prefix, language, types=None, limit=10):
+    """Return up to limit colloquialisms in language, optionally restricted
+       to types, whose normalised values start with prefix, as dicts (see
+       get_tries) ordered by normalised value. """
+
+    from .core import normalise_value
+
+    tries = get_tries(language)
+    if types is None:
+        types = sorted(tries)
+
+    def iter_type(type):
+        # tagged with the type, so entries with equal keys aren't compared
+        for key, entry in tries[type].iter_prefix(
+                normalise_value(prefix, type)):
+            yield key, type, entry
+
+    found = [iter_type(type) for type in types if type in tries]
+    return [entry for key, type, entry in islice(merge(*found), limit)]
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""Standalone auto-tagging and parsing, for worker processes.
+
+   Takes a vocabulary and the bytes of a transcript file, and returns the
+   tagged transcript or the tags found in it, without Django, settings or
+   database access. pyvtt is only imported when a file is read. A
+   vocabulary may be a Matcher, e.g. from a mapped vocabulary file (see
+   load_matcher), or an iterable of dicts with 'type' and 'value' keys:
+
+       from colloquial.colloquialisms.core import load_matcher, parse
+
+       matcher = load_matcher('/var/lib/colloquial/vocabulary.bin', 'mi')
+       tags, errors = parse(data, 'mi', matcher)
+
+   AbstractTranscript.parse does the same for transcripts in the database,
+   and creates the colloquialisms and tags.
+"""
+from __future__ import unicode_literals
+
+from io import BytesIO
+from StringIO import StringIO
+
+from .matcher import Matcher
+from .parser import auto_tag_file, parse_transcript
+
+
+def normalise_value(value, type):
+    """Normalise value string - currently just lowercase it so that all are
+       case-insensitive; in future some types may be case-sensitive. """
+
+    return value.lower()
+
+
+def load_matcher(path, language, types=None):
+    """Return a Matcher for language, optionally restricted to types, from
+       a vocabulary file written by the export_vocabulary command. """
+
+    from .vocabfile import VocabularyFile
+
+    return VocabularyFile(path).get_matcher(language, types)
+
+
+def get_matcher(vocabulary):
+    if isinstance(vocabulary, Matcher):
+        return vocabulary
+    return Matcher(vocabulary)
+
+
+def auto_tag(data, vocabulary):
+    """Return the WebVTT content of data (bytes) with occurrences of the
+       vocabulary wrapped in <c.TYPE>...</c>, as unicode. """
+
+    output = StringIO()
+    auto_tag_file(BytesIO(data), get_matcher(vocabulary), output)
+    return output.getvalue()
+
+
+def parse(data, language, vocabulary=None, valid_types=None):
+    """Parse tags from data (bytes), after auto-tagging it if vocabulary is
+       given. Return
+
+       (tags, errors)
+
+       where tags is a list of dicts with 'type', 'value',
+       'normalised_value', 'language', 'start' and 'start_exact' keys, and
+       errors a list of strings. valid_types may be None to accept any
+       type.
+    """
+
+    if vocabulary is not None:
+        transcript_file = StringIO(auto_tag(data, vocabulary))
+    else:
+        transcript_file = BytesIO(data)
+
+    def get_colloquialism(value, language, type):
+        return {
+            'type': type,
+            'value': value,
+            'normalised_value': normalise_value(value, type),
+            'language': language,
+        }
+
+    def get_tag(start, start_exact, colloquialism):
+        return dict(colloquialism, start=start, start_exact=start_exact)
+
+    return parse_transcript(
+        transcript_file, language, valid_types=valid_types,
+        get_tag=get_tag, get_colloquialism=get_colloquialism)
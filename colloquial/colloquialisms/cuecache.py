@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""Cache of parsed transcript cues, keyed by the transcript file's content
+   hash, so that repeated operations on an unchanged file skip both reading
+   it from storage and parsing it.
+
+   Results derived from the content, i.e. the auto-tagged transcript and
+   the tags parsed from it, are cached in the same way (see
+   get_cached_result), so transcripts with identical files are auto-tagged
+   and parsed once per vocabulary of their language. Those results expire
+   after COLLOQUIAL_RESULT_CACHE_TIMEOUT seconds (default a week), since
+   entries for superseded vocabularies are never read again.
+
+   Set COLLOQUIAL_CUE_CACHE to the alias of a configured Django cache, e.g.
+   a FileBasedCache on local disk, to enable it.
+"""
+from __future__ import unicode_literals
+
+import hashlib
+import json
+import zlib
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .parser import get_webvttfile
+
+
+KEY_PREFIX = 'colloquial:cues:'
+RESULT_KEY_PREFIX = 'colloquial:results:'
+
+# cues are cached indefinitely, since the key changes with the content
+TIMEOUT = None
+
+# results derived from the content also depend on the vocabulary
+RESULT_TIMEOUT = 7 * 24 * 60 * 60
+
+
+def content_hash(file_obj):
+    """Return the hex sha256 digest of a file-like object's content. """
+
+    digest = hashlib.sha256()
+    file_obj.seek(0)
+    while True:
+        chunk = file_obj.read(64 * 1024)
+        if not chunk:
+            break
+        if not isinstance(chunk, bytes):
+            chunk = chunk.encode('utf-8')
+        digest.update(chunk)
+    file_obj.seek(0)
+    return digest.hexdigest()
+
+
+def get_cache():
+    alias = getattr(settings, 'COLLOQUIAL_CUE_CACHE', None)
+    return caches[alias] if alias else None
+
+
+def serialise(webvttfile):
+    """Compact form of a WebVTTFile: zlib-compressed JSON of the line
+       ending and a list of [index, start, end, position, text] cues, with
+       start and end in milliseconds. """
+
+    data = [webvttfile.eol, [
+        [item.index, item.start.ordinal, item.end.ordinal, item.position,
+         item.text] for item in webvttfile]]
+    return zlib.compress(
+        json.dumps(data, separators=(',', ':')).encode('utf-8'))
+
+
+def deserialise(data):
+    from pyvtt import WebVTTFile, WebVTTItem
+    from pyvtt.vtttime import WebVTTTime
+
+    eol, cues = json.loads(zlib.decompress(data).decode('utf-8'))
+    return WebVTTFile([
+        WebVTTItem(index, WebVTTTime.from_ordinal(start),
+                   WebVTTTime.from_ordinal(end), text, position)
+        for index, start, end, position, text in cues], eol=eol)
+
+
+def get_cached_webvttfile(file_obj, file_hash):
+    """Get a WebVTTFile for file_obj, from the cache if file_hash is given
+       and the cache is enabled. A new instance is returned on every call,
+       so callers may modify it. """
+
+    cache = get_cache()
+    if cache is None or not file_hash:
+        return get_webvttfile(file_obj)
+
+    key = KEY_PREFIX + file_hash
+    data = cache.get(key)
+    if data is not None:
+        return deserialise(data)
+
+    webvttfile = get_webvttfile(file_obj)
+    cache.set(key, serialise(webvttfile), TIMEOUT)
+    return webvttfile
+
+
+def get_cached_result(name, file_hash, key_parts, compute):
+    """Return compute(), a picklable result derived from the content with
+       file_hash, cached under name and key_parts (anything else the result
+       depends on) if file_hash is given and the cache is enabled. """
+
+    cache = get_cache()
+    if cache is None or not file_hash:
+        return compute()
+
+    key = '%s%s:%s:%s' % (RESULT_KEY_PREFIX, name, file_hash, hashlib.md5(
+        '|'.join('%s' % part for part in key_parts).encode('utf-8'))
+        .hexdigest())
+    result = cache.get(key)
+    if result is None:
+        result = compute()
+        cache.set(key, result, getattr(
+            settings, 'COLLOQUIAL_RESULT_CACHE_TIMEOUT', RESULT_TIMEOUT))
+    return result
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import os
+
+from django.db import models
+from django.db.models.fields.files import FieldFile
+
+from .cuecache import content_hash
+
+
+class HashedFieldFile(FieldFile):
+    def save(self, name, content, save=True):
+        digest = content_hash(content)
+        setattr(self.instance, self.field.hash_field, digest)
+        if not self.field.content_addressed:
+            super(HashedFieldFile, self).save(name, content, save)
+            return
+
+        self.name = self.field.store(self.instance, name, content, digest)
+        setattr(self.instance, self.field.name, self.name)
+        self._committed = True
+        if save:
+            self.instance.save()
+            # the last other instance may have deleted the file since
+            # store() found it, before this one was saved
+            if not self.storage.exists(self.name):
+                self.field.store(self.instance, name, content, digest)
+
+    save.alters_data = True
+
+    def delete(self, save=True):
+        setattr(self.instance, self.field.hash_field, '')
+        if not (self and self.field.content_addressed and self.is_shared()):
+            super(HashedFieldFile, self).delete(save)
+            return
+
+        # keep the stored file for the other instances
+        if hasattr(self, '_file'):
+            self.close()
+            del self.file
+        self.name = None
+        setattr(self.instance, self.field.name, self.name)
+        self._committed = False
+        if save:
+            self.instance.save()
+
+    delete.alters_data = True
+
+    def is_shared(self):
+        """Return whether other instances refer to the same stored file. """
+
+        return type(self.instance)._default_manager.filter(
+            **{self.field.name: self.name}) \
+            .exclude(pk=self.instance.pk).exists()
+
+
+class HashedFileField(models.FileField):
+    """FileField which stores the sha256 digest of the file's content in
+       the model field named by hash_field whenever a file is saved.
+
+       With content_addressed=True, files are stored under their digest,
+       so identical content is stored once and shared by every instance
+       it's saved to; the stored file is only deleted with the last.
+
+       Deleting checks for other instances before deleting the file, and
+       saving reuses a stored file found to exist, without a lock. Saving
+       with save=True checks again once the instance is saved, and writes
+       the file again if it has been deleted meanwhile. But a delete()
+       which checks before the new instance is committed, and deletes the
+       file after that second check, still leaves it pointing at a missing
+       file. Where identical files may be uploaded while others are
+       deleted, serialise the two, e.g. with a lock on the digest. """
+
+    attr_class = HashedFieldFile
+
+    def __init__(self, *args, **kwargs):
+        self.hash_field = kwargs.pop('hash_field')
+        self.content_addressed = kwargs.pop('content_addressed', False)
+        super(HashedFileField, self).__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super(HashedFileField, self).deconstruct()
+        kwargs['hash_field'] = self.hash_field
+        if self.content_addressed:
+            kwargs['content_addressed'] = True
+        return name, path, args, kwargs
+
+    def store(self, instance, name, content, digest=None):
+        """Write content to storage, as uploaded with file name name, and
+           return its stored name. If content_addressed, it's named by its
+           digest in the upload directory, keeping name's extension, and
+           only written if not already stored. """
+
+        name = self.generate_filename(instance, name)
+        if self.content_addressed:
+            if digest is None:
+                digest = content_hash(content)
+            directory, filename = os.path.split(name)
+            name = os.path.join(
+                directory, digest + os.path.splitext(filename)[1].lower())
+            if self.storage.exists(name):
+                return name
+
+        stored = self.storage.save(name, content, max_length=self.max_length)
+        if self.content_addressed and stored != name:
+            # identical content was stored under name since exists() was
+            # checked, so the storage chose another name for this copy
+            self.storage.delete(stored)
+            return name
+        return stored
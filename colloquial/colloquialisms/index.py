@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""Inverted index of transcript text.
+
+   Each indexed token maps to postings of (cue start, position) pairs, where
+   cue start is in milliseconds and position is the token's offset within the
+   cue text. Postings are stored delta-encoded as varints, i.e.
+
+       varint(start - previous start) varint(position) ...
+
+   so that a token occurring throughout a long transcript costs a few bytes
+   per occurrence. Phrases are matched by consecutive positions within a cue.
+"""
+from __future__ import unicode_literals
+
+from collections import defaultdict
+
+from .parser import tokenise
+
+
+def encode_varint(value, buf):
+    """Append value to bytearray buf as an unsigned LEB128 varint. """
+
+    while value > 0x7f:
+        buf.append((value & 0x7f) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+
+def encode_postings(postings):
+    """Encode a list of (start, position) pairs. """
+
+    buf = bytearray()
+    previous = 0
+    for start, position in sorted(postings):
+        encode_varint(start - previous, buf)
+        encode_varint(position, buf)
+        previous = start
+    return bytes(buf)
+
+
+def decode_postings(data):
+    """Decode postings as encoded by encode_postings. data may be any bytes,
+       buffer or memoryview, as returned by the database. """
+
+    postings = []
+    values = []
+    value = shift = 0
+    start = 0
+
+    for byte in bytearray(data):
+        value |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+
+        values.append(value)
+        value = shift = 0
+        if len(values) == 2:
+            start += values[0]
+            postings.append((start, values[1]))
+            values = []
+
+    return postings
+
+
+def index_cues(cues):
+    """Build postings from an iterable of (start, text) cues, with start in
+       milliseconds. Returns a dict of token to a list of (start, position)
+       pairs. """
+
+    index = defaultdict(list)
+    for start, text in cues:
+        for position, token in enumerate(tokenise(text)):
+            index[token].append((start, position))
+    return index
+
+
+def match_phrase(postings):
+    """Given a list of postings, one per consecutive token of a phrase,
+       return the sorted cue starts at which the whole phrase occurs. """
+
+    if not postings:
+        return []
+
+    following = [set(p) for p in postings[1:]]
+    starts = set()
+    for start, position in postings[0]:
+        if all((start, position + offset) in later
+               for offset, later in enumerate(following, 1)):
+            starts.add(start)
+    return sorted(starts)
+
+
+def match_phrase_spans(postings):
+    """As match_phrase, also returning the starts of cues in which the
+       phrase starts and continues at the start of the next cue, i.e. the
+       next cue in which any of its tokens occur. """
+
+    if not postings:
+        return []
+
+    positions = [set(p) for p in postings]
+    cue_starts = sorted(set(start for p in postings for start, pos in p))
+    following = dict(zip(cue_starts, cue_starts[1:]))
+
+    starts = set()
+    for start, position in postings[0]:
+        # match as much of the phrase as follows in this cue, then the rest
+        # from the start of the next
+        count = 1
+        while count < len(postings) and \
+                (start, position + count) in positions[count]:
+            count += 1
+        if count == len(postings):
+            starts.add(start)
+            continue
+
+        next_start = following.get(start)
+        if next_start is not None and all(
+                (next_start, offset) in positions[count + offset]
+                for offset in range(len(postings) - count)):
+            starts.add(start)
+    return sorted(starts)
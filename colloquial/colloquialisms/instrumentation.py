@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""Optional timers and counters for the parse, auto-tag and tags view hot
+   paths.
+
+   Nothing is recorded unless a sink is registered, either with add_sink or
+   via the COLLOQUIAL_METRICS_SINKS setting, so the disabled cost is a list
+   truthiness check per stage. Sinks receive
+
+       sink.timing(name, seconds, tags)
+       sink.count(name, value, tags)
+
+   where tags is a dict of context such as the language or transcript.
+   This module only imports Django to count queries (see stage), so the
+   parser can use it outside a Django process. Queries are counted by
+   wrapping the cursors of the current thread's connections, rather than
+   from the debug query log, which is capped and only logs the default
+   database.
+"""
+from __future__ import unicode_literals
+
+import time
+
+
+_sinks = []
+
+
+class MetricsSink(object):
+    """Base class for metrics sinks; subclasses override either method. """
+
+    def timing(self, name, seconds, tags):
+        pass
+
+    def count(self, name, value, tags):
+        pass
+
+
+def add_sink(sink):
+    if sink not in _sinks:
+        _sinks.append(sink)
+
+
+def remove_sink(sink):
+    if sink in _sinks:
+        _sinks.remove(sink)
+
+
+def enabled():
+    return bool(_sinks)
+
+
+def count(name, value=1, **tags):
+    """Record a counter value. """
+
+    for sink in _sinks:
+        sink.count(name, value, tags)
+
+
+class CountingCursor(object):
+    """Proxy for a connection's cursor, counting the queries run on it in
+       the connection's colloquial_queries. """
+
+    def __init__(self, cursor, connection):
+        self.cursor = cursor
+        self.connection = connection
+
+    def execute(self, *args, **kwargs):
+        self.connection.colloquial_queries += 1
+        return self.cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        self.connection.colloquial_queries += 1
+        return self.cursor.executemany(*args, **kwargs)
+
+    def callproc(self, *args, **kwargs):
+        self.connection.colloquial_queries += 1
+        return self.cursor.callproc(*args, **kwargs)
+
+    def __getattr__(self, attr):
+        return getattr(self.cursor, attr)
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.cursor.__exit__(exc_type, exc_value, traceback)
+
+
+def count_cursors(connection):
+    """Count the queries run on a database connection (wrapper) from now
+       on, by wrapping the cursors it makes. """
+
+    def wrap(make_cursor):
+        return lambda cursor: CountingCursor(make_cursor(cursor), connection)
+
+    connection.colloquial_queries = 0
+    connection.make_cursor = wrap(connection.make_cursor)
+    connection.make_debug_cursor = wrap(connection.make_debug_cursor)
+
+
+def get_query_counts():
+    """Return a dict of database alias to the number of queries run on the
+       current thread's connection to it. Connections are counted from the
+       first call, so compare two results. """
+
+    from django.db import connections
+
+    counts = {}
+    for connection in connections.all():
+        if not hasattr(connection, 'colloquial_queries'):
+            count_cursors(connection)
+        counts[connection.alias] = connection.colloquial_queries
+    return counts
+
+
+class stage(object):
+    """Context manager timing a stage of work, i.e.
+
+       with stage('auto_tag_file.tag', language='mi'):
+           ...
+
+       If count_queries is True, the number of database queries run during
+       the stage in the current thread, on any database, is also counted,
+       as NAME.queries.
+    """
+
+    __slots__ = ('name', 'tags', 'count_queries', 'start', 'queries')
+
+    def __init__(self, name, count_queries=False, **tags):
+        self.name = name
+        self.tags = tags
+        self.count_queries = count_queries
+        self.start = None
+        self.queries = None
+
+    def __enter__(self):
+        if not _sinks:
+            return self
+
+        if self.count_queries:
+            self.queries = get_query_counts()
+
+        self.start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.start is None:
+            return
+
+        elapsed = time.time() - self.start
+
+        if self.queries is not None:
+            after = get_query_counts()
+            count('%s.queries' % self.name,
+                  sum(value - self.queries.get(alias, 0)
+                      for alias, value in after.items()), **self.tags)
+
+        for sink in _sinks:
+            sink.timing(self.name, elapsed, self.tags)
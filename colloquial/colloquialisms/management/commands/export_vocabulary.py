@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ...vocabfile import write_vocabulary_file
+from ...vocabulary import get_full_vocabulary
+
+
+class Command(BaseCommand):
+    help = 'Write the compiled auto-tag vocabulary to a file which worker ' \
+           'processes map into memory (see COLLOQUIAL_VOCABULARY_FILE).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?',
+            help='Output path, defaults to COLLOQUIAL_VOCABULARY_FILE')
+
+    def handle(self, *args, **options):
+        path = options['path'] or getattr(
+            settings, 'COLLOQUIAL_VOCABULARY_FILE', None)
+        if not path:
+            raise CommandError(
+                'No path given and COLLOQUIAL_VOCABULARY_FILE is not set')
+
+        version = write_vocabulary_file(path, get_full_vocabulary())
+        self.stdout.write('Wrote %s (version %s)' % (path, version))
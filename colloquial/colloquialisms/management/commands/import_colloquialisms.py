@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import csv
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from ...models import Colloquialism, DEFAULT_LANGUAGE, TYPE_CHOICES
+
+
+FIELDS = ('value', 'type', 'language', 'meaning', 'allow_auto_tag')
+
+TRUE_VALUES = ('1', 'true', 'yes', 'y')
+
+
+def read_csv(f):
+    """Yield (line number, dict) for rows of a CSV file with a header row.
+    """
+
+    reader = csv.reader(f)
+    header = [name.decode('utf-8-sig').strip().lower()
+              for name in next(reader, [])]
+    for row in reader:
+        if row:
+            yield reader.line_num, dict(
+                zip(header, (value.decode('utf-8') for value in row)))
+
+
+def read_jsonl(f):
+    """Yield (line number, dict) for lines of a JSON lines file. """
+
+    for line_num, line in enumerate(f, 1):
+        line = line.strip()
+        if line:
+            try:
+                yield line_num, json.loads(line.decode('utf-8-sig'))
+            except ValueError as e:
+                yield line_num, e
+
+
+class Command(BaseCommand):
+    help = 'Import colloquialisms from a CSV file with a header row, or a ' \
+           'JSON lines file of objects, with value, type, language, ' \
+           'meaning and allow_auto_tag fields (value is required). ' \
+           'Existing colloquialisms are skipped.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format', choices=('csv', 'jsonl'),
+            help='File format, by default from the file extension')
+        parser.add_argument('--type', help='Type of rows without one')
+        parser.add_argument(
+            '--language', default=DEFAULT_LANGUAGE,
+            help='Language of rows without one')
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Number of rows read and created at a time')
+
+    def get_colloquialism(self, info, options):
+        """Return an unsaved Colloquialism from info, or raise ValueError.
+        """
+
+        if not isinstance(info, dict):
+            raise ValueError('expected an object')
+
+        info = dict((key, info.get(key)) for key in FIELDS)
+        value = (info['value'] or '').strip()
+        type = info['type'] or options['type']
+        language = info['language'] or options['language']
+        allow_auto_tag = info['allow_auto_tag']
+        if allow_auto_tag is None or allow_auto_tag == '':
+            allow_auto_tag = True
+        elif not isinstance(allow_auto_tag, bool):
+            allow_auto_tag = \
+                ('%s' % allow_auto_tag).strip().lower() in TRUE_VALUES
+
+        if not value:
+            raise ValueError('no value')
+        if len(value) > Colloquialism._meta.get_field('value').max_length:
+            raise ValueError('value is too long')
+        if type not in self.types:
+            raise ValueError('invalid type %s' % type)
+        if language not in self.languages:
+            raise ValueError('invalid language %s' % language)
+
+        return Colloquialism(
+            value=value, type=type, language=language,
+            meaning=info['meaning'] or '', allow_auto_tag=allow_auto_tag)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format'] or (
+            'jsonl' if path.endswith(('.jsonl', '.json')) else 'csv')
+        read = read_jsonl if format == 'jsonl' else read_csv
+
+        self.types = set(choice[0] for choice in TYPE_CHOICES)
+        self.languages = set(choice[0] for choice in settings.LANGUAGES)
+        if options['type'] and options['type'] not in self.types:
+            raise CommandError('Invalid type %s' % options['type'])
+
+        read_count = created_count = invalid_count = 0
+
+        try:
+            f = open(path, 'rb')
+        except IOError as e:
+            raise CommandError(e)
+
+        with f:
+            rows = read(f)
+            while True:
+                chunk = list(islice(rows, options['chunk_size']))
+                if not chunk:
+                    break
+
+                colloquialisms = []
+                for line_num, info in chunk:
+                    read_count += 1
+                    try:
+                        if isinstance(info, ValueError):
+                            raise info
+                        colloquialisms.append(
+                            self.get_colloquialism(info, options))
+                    except ValueError as e:
+                        invalid_count += 1
+                        self.stderr.write('Line %s: %s' % (line_num, e))
+
+                if not colloquialisms:
+                    continue
+                with transaction.atomic():
+                    created_count += len(
+                        Colloquialism.objects.create_missing(colloquialisms))
+
+        self.stdout.write('%s rows read, %s colloquialisms created, %s '
+                          'skipped as existing or duplicate, %s invalid' % (
+                              read_count, created_count,
+                              read_count - created_count - invalid_count,
+                              invalid_count))
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import csv
+from StringIO import StringIO
+from itertools import islice
+from multiprocessing import Pool
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.encoding import force_bytes
+
+from ...mining import CandidateCounter, count_transcript
+from ...models import Colloquialism, DEFAULT_LANGUAGE
+from ...parser import tokenise
+from ...registry import get_transcript_models
+from .import_colloquialisms import FIELDS
+
+
+class Command(BaseCommand):
+    help = 'List phrases which recur across transcripts of a language, ' \
+           'but aren\'t yet colloquialisms, as candidates for editors. ' \
+           'The output is a CSV file which import_colloquialisms reads, ' \
+           'once its type column is filled in.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model', action='append', dest='models',
+            help='Transcript model, e.g. transcripts.Transcript; may be '
+                 'repeated. Defaults to all transcript models')
+        parser.add_argument('--language', default=DEFAULT_LANGUAGE,
+                            help='Language of the transcripts to mine')
+        parser.add_argument('--type', default='',
+                            help='Type to fill in for every candidate')
+        parser.add_argument('--min-words', type=int, default=2,
+                            help='Minimum number of words in a phrase')
+        parser.add_argument('--max-words', type=int, default=4,
+                            help='Maximum number of words in a phrase')
+        parser.add_argument(
+            '--min-transcripts', type=int, default=2,
+            help='Minimum number of transcripts a phrase occurs in')
+        parser.add_argument('--limit', type=int, default=500,
+                            help='Number of candidates listed')
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Number of processes counting transcripts')
+        parser.add_argument(
+            '--sketch-width', type=int, default=2 ** 20,
+            help='Counters per row of the count-min sketches; more are '
+                 'more accurate for a large corpus, at 8 bytes each')
+        parser.add_argument('--output',
+                            help='Path of the CSV file, by default stdout')
+
+    def get_models(self, labels):
+        if not labels:
+            return get_transcript_models()
+
+        models = []
+        for label in labels:
+            try:
+                model = apps.get_model(label)
+            except (LookupError, ValueError) as e:
+                raise CommandError(e)
+            if model not in get_transcript_models():
+                raise CommandError('%s is not a transcript model' % label)
+            models.append(model)
+        return models
+
+    def iter_files(self, models, language):
+        """Yield the bytes of each transcript file in language. """
+
+        for model in models:
+            for transcript in model._default_manager.order_by('pk') \
+                    .iterator():
+                transcript_file = transcript.get_transcript_file()
+                if transcript.get_language() != language or \
+                        not transcript_file:
+                    continue
+                transcript_file.open('rb')
+                try:
+                    yield transcript_file.read()
+                finally:
+                    transcript_file.close()
+
+    def handle(self, *args, **options):
+        language = options['language']
+        if language not in set(choice[0] for choice in settings.LANGUAGES):
+            raise CommandError('Invalid language %s' % language)
+        min_n, max_n = options['min_words'], options['max_words']
+        if not 0 < min_n <= max_n:
+            raise CommandError('Invalid --min-words or --max-words')
+
+        models = self.get_models(options['models'])
+
+        # existing colloquialisms, tokenised as the transcripts are
+        exclude = set(
+            ' '.join(tokenise(value))
+            for value in Colloquialism.objects.filter(language=language)
+            .values_list('normalised_value', flat=True).iterator())
+        counter = CandidateCounter(
+            options['min_transcripts'], max(options['limit'], 1) * 10,
+            exclude, options['sketch_width'])
+
+        workers = max(options['workers'], 1)
+        pool = Pool(workers) if workers > 1 else None
+        files = ((data, min_n, max_n)
+                 for data in self.iter_files(models, language))
+
+        try:
+            while True:
+                # a few files per worker at a time, as Pool.imap would read
+                # them all into memory
+                batch = list(islice(files, workers * 4))
+                if not batch:
+                    break
+                if pool is None:
+                    results = map(count_transcript, batch)
+                else:
+                    results = pool.map(count_transcript, batch)
+                for counts in results:
+                    counter.add(counts)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        candidates = counter.most_common(options['limit'])
+
+        buf = StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(FIELDS + ('transcripts', 'occurrences'))
+        for candidate in candidates:
+            writer.writerow([force_bytes(value) for value in (
+                candidate.phrase, options['type'], language, '', '',
+                candidate.transcripts, candidate.occurrences)])
+
+        if options['output']:
+            with open(options['output'], 'wb') as f:
+                f.write(buf.getvalue())
+        else:
+            self.stdout.write(buf.getvalue().decode('utf-8'), ending='')
+
+        self.stderr.write('%s transcripts mined, %s candidates listed' % (
+            counter.count, len(candidates)))
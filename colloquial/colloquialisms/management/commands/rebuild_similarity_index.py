@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.core.management.base import BaseCommand
+
+from ...registry import get_transcript_models
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the MinHash similarity index of every transcript from ' \
+           'its tags, e.g. after changing COLLOQUIAL_MINHASH_PERMUTATIONS ' \
+           'or COLLOQUIAL_MINHASH_BANDS.'
+
+    def handle(self, *args, **options):
+        count = 0
+        for model in get_transcript_models():
+            for transcript in model._default_manager.order_by('pk') \
+                    .iterator():
+                transcript.index_similarity(force=True)
+                count += 1
+        self.stdout.write('%s transcripts indexed' % count)
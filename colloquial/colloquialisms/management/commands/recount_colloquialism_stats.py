@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.core.management.base import BaseCommand
+
+from ...models import ColloquialismStats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the occurrence counters of every colloquialism from ' \
+           'the tag tables.'
+
+    def handle(self, *args, **options):
+        count = ColloquialismStats.objects.recount()
+        self.stdout.write('%s colloquialisms with tags' % count)
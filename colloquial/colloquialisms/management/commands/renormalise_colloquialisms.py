@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...renormalise import renormalise_chunk
+
+
+class Command(BaseCommand):
+    help = 'Re-normalise the values of all colloquialisms, e.g. after ' \
+           'changing normalise_value, in chunks by primary key. ' \
+           'Colloquialisms whose values collide are merged, and their tags ' \
+           'repointed. With --state, progress is saved after each chunk ' \
+           'and an interrupted run resumes from there.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--state',
+            help='Path of a file in which to save progress, and resume from')
+        parser.add_argument('--restart', action='store_true',
+                            help='Ignore saved progress')
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Number of colloquialisms processed in each transaction')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report changes and merges without saving them')
+
+    def read_state(self, path):
+        if not path or not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'rb') as f:
+                return json.loads(f.read().decode('utf-8'))
+        except ValueError:
+            raise CommandError('%s is not a valid state file' % path)
+
+    def write_state(self, path, state):
+        with open(path + '.tmp', 'wb') as f:
+            f.write(json.dumps(state).encode('utf-8'))
+        os.rename(path + '.tmp', path)
+
+    def handle(self, *args, **options):
+        path = options['state']
+        dry_run = options['dry_run']
+        state = {} if options['restart'] else self.read_state(path)
+        after_pk = state.get('last_pk')
+        if after_pk is not None:
+            self.stdout.write('Resuming after %s' % after_pk)
+
+        totals = dict((key, state.get(key, 0))
+                      for key in ('count', 'changed', 'merged'))
+
+        while True:
+            chunk = renormalise_chunk(after_pk, options['chunk_size'],
+                                      dry_run)
+            if chunk.last_pk is None:
+                break
+
+            for survivor, merged in chunk.merges:
+                self.stdout.write('Merged %s into %s (%s): %s' % (
+                    ', '.join('%s (%s)' % (c.pk, c.value) for c in merged),
+                    survivor.pk, survivor.value, survivor.normalised_value))
+
+            after_pk = chunk.last_pk
+            totals['count'] += chunk.count
+            totals['changed'] += chunk.changed
+            totals['merged'] += sum(len(m.merged) for m in chunk.merges)
+
+            if path and not dry_run:
+                self.write_state(path, dict(totals, last_pk=after_pk))
+
+        self.stdout.write(
+            '%(count)s colloquialisms processed, %(changed)s re-normalised, '
+            '%(merged)s merged%(dry_run)s' % dict(
+                totals, dry_run=' (dry run)' if dry_run else ''))
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.core.management.base import BaseCommand
+
+from ...models import Colloquialism
+from ...retag import retag_colloquialism
+
+
+class Command(BaseCommand):
+    help = 'Tag occurrences of the given colloquialisms in indexed ' \
+           'transcripts, e.g. after adding them or enabling auto-tagging.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('pks', nargs='+', type=int,
+                            help='Colloquialism primary keys')
+
+    def handle(self, *args, **options):
+        for colloquialism in Colloquialism.objects.filter(
+                pk__in=options['pks']):
+            created = retag_colloquialism(colloquialism)
+            self.stdout.write('%s: %s tags created' % (
+                colloquialism, created))
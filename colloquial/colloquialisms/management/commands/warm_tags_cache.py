@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import json
+import os
+import tempfile
+from multiprocessing.pool import ThreadPool
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from ... import tagscache
+from ...registry import get_transcript_models
+from ...views import get_tags_data
+
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def write_json(path, data):
+    """Write data to path as JSON, replacing it atomically. """
+
+    directory = os.path.dirname(path)
+    with tempfile.NamedTemporaryFile(dir=directory, delete=False) as f:
+        f.write(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+    os.chmod(f.name, 0o644)
+    os.rename(f.name, path)
+
+
+class Command(BaseCommand):
+    help = 'Precompute the tags view payload of each transcript, into the ' \
+           'tags cache (COLLOQUIAL_TAGS_CACHE) or as static JSON files. ' \
+           'Only payloads whose tags or related tags have changed are ' \
+           'rebuilt, unless --all is given.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model', action='append', dest='models',
+            help='Transcript model, e.g. transcripts.Transcript; may be '
+                 'repeated. Defaults to all transcript models')
+        parser.add_argument(
+            '--output',
+            help='Write <app_label>.<model_name>/<pk>.json files to this '
+                 'directory instead of filling the cache')
+        parser.add_argument('--all', action='store_true',
+                            help='Rebuild every payload')
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Number of payloads built at once')
+        parser.add_argument('--all-collections', action='store_true',
+                            help='As for the tags view')
+        parser.add_argument('--related-limit', type=int,
+                            help='As for the tags view')
+
+    def get_models(self, labels):
+        if not labels:
+            return get_transcript_models()
+
+        models = []
+        for label in labels:
+            try:
+                model = apps.get_model(label)
+            except (LookupError, ValueError) as e:
+                raise CommandError(e)
+            if model not in get_transcript_models():
+                raise CommandError('%s is not a transcript model' % label)
+            models.append(model)
+        return models
+
+    def warm(self, item):
+        """Build item's payload if it has changed. Returns (label,
+           fingerprint, built). """
+
+        options = self.options
+        label = '%s:%s' % (item._meta.label_lower, item.pk)
+        fingerprint = tagscache.get_fingerprint(
+            item, options['all_collections'], options['related_limit'])
+
+        if options['output']:
+            path = self.get_path(item)
+            if not options['all'] and os.path.exists(path) and \
+                    self.manifest.get(label) == fingerprint:
+                return label, fingerprint, False
+        else:
+            key = tagscache.get_key(item, fingerprint)
+            if not options['all'] and key in self.cache:
+                return label, fingerprint, False
+
+        data = get_tags_data(item, options['all_collections'],
+                             options['related_limit'])
+        if options['output']:
+            write_json(path, data)
+        else:
+            self.cache.set(key, data, tagscache.TIMEOUT)
+        return label, fingerprint, True
+
+    def warm_in_thread(self, item):
+        try:
+            return self.warm(item)
+        finally:
+            # each worker thread has its own connection
+            connections.close_all()
+
+    def get_path(self, item):
+        return os.path.join(self.options['output'], item._meta.label_lower,
+                            '%s.json' % item.pk)
+
+    def handle(self, *args, **options):
+        self.options = options
+        models = self.get_models(options['models'])
+
+        output = options['output']
+        manifest_path = os.path.join(output, MANIFEST_NAME) if output \
+            else None
+        self.manifest = {}
+        if output:
+            for model in models:
+                directory = os.path.join(output, model._meta.label_lower)
+                if not os.path.isdir(directory):
+                    os.makedirs(directory)
+            if os.path.exists(manifest_path):
+                with open(manifest_path, 'rb') as f:
+                    self.manifest = json.loads(f.read().decode('utf-8'))
+        else:
+            self.cache = tagscache.get_cache()
+            if self.cache is None:
+                raise CommandError(
+                    'COLLOQUIAL_TAGS_CACHE is not set; use --output to '
+                    'write static files')
+
+        workers = max(options['workers'], 1)
+        pool = ThreadPool(workers) if workers > 1 else None
+        built = skipped = 0
+        seen = set()
+
+        try:
+            for model in models:
+                items = model._default_manager.order_by('pk').iterator()
+                if pool is None:
+                    results = (self.warm(item) for item in items)
+                else:
+                    results = pool.imap_unordered(self.warm_in_thread, items)
+
+                for label, fingerprint, rebuilt in results:
+                    seen.add(label)
+                    self.manifest[label] = fingerprint
+                    if rebuilt:
+                        built += 1
+                    else:
+                        skipped += 1
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        removed = 0
+        if output:
+            # remove the files of deleted transcripts
+            prefixes = tuple('%s:' % model._meta.label_lower
+                             for model in models)
+            for label in list(self.manifest):
+                if label.startswith(prefixes) and label not in seen:
+                    model_label, pk = label.rsplit(':', 1)
+                    path = os.path.join(output, model_label, '%s.json' % pk)
+                    if os.path.exists(path):
+                        os.remove(path)
+                    del self.manifest[label]
+                    removed += 1
+            write_json(manifest_path, self.manifest)
+
+        self.stdout.write('%s payloads built, %s unchanged, %s removed' % (
+            built, skipped, removed))
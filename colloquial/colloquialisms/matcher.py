@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""Compiled auto-tag vocabulary.
+
+   A Matcher holds a vocabulary as a dict of token sequences, and tags text
+   by scanning its tokens once, taking the longest vocabulary phrase
+   starting at each token. Matching is case-insensitive and ignores
+   differences in whitespace, so phrases may span line breaks. Since tokens
+   are whole words (including macrons), phrases only match on word
+   boundaries.
+
+   tag_cues tags a sequence of cues in one pass, carrying any partial
+   phrase from the end of one cue into the start of the next, so a phrase
+   split across cues is tagged as <c.TYPE>start of phrase in one cue and
+   end of phrase</c> in the next.
+
+   The number of tokens scanned is counted as auto_tag.tokens when
+   instrumentation is enabled.
+"""
+from __future__ import unicode_literals
+
+import hashlib
+import re
+
+from . import instrumentation
+from .tokenizer import scan, TEXT, TAG, END_TAG, MARKUP
+
+
+# words, or single punctuation characters
+MATCH_TOKEN_RE = re.compile(r'\w+|[^\w\s]', flags=re.UNICODE)
+
+
+def phrase_key(value):
+    """Return the tuple of normalised tokens matched for a value. """
+
+    return tuple(MATCH_TOKEN_RE.findall(value.lower()))
+
+
+def is_tag(token):
+    """Whether token opens a colloquialism (or class-less <c>) tag. """
+
+    return token.kind == TAG or \
+        token.kind == MARKUP and token.value.lower() == 'c'
+
+
+class Segment(object):
+    """Plain text within a cue which may be tagged, and the tags to be
+       inserted into it as (position, order, markup). """
+
+    __slots__ = ('text', 'inserts')
+
+    def __init__(self, text):
+        self.text = text
+        self.inserts = []
+
+    def render(self):
+        if not self.inserts:
+            return self.text
+
+        parts = []
+        pos = 0
+        for insert_pos, order, markup in sorted(self.inserts):
+            parts.append(self.text[pos:insert_pos])
+            parts.append(markup)
+            pos = insert_pos
+        parts.append(self.text[pos:])
+        return ''.join(parts)
+
+
+class Matcher(object):
+    """Tags occurrences of a vocabulary in text. vocabulary should be an
+       iterable of dicts with 'type' and 'value' keys, as for auto_tag_text.
+       Where two entries have the same value, the first is used. """
+
+    def __init__(self, vocabulary):
+        self.phrases = {}
+        self.first_tokens = set()
+        self.max_length = 0
+
+        for info in vocabulary:
+            key = phrase_key(info['value'])
+            if not key or key in self.phrases:
+                continue
+
+            self.phrases[key] = info['type']
+            self.first_tokens.add(key[0])
+            self.max_length = max(self.max_length, len(key))
+
+    def __len__(self):
+        return len(self.phrases)
+
+    def get_digest(self):
+        """Return a hex digest of the vocabulary, which only changes with
+           it, to key results derived from it. """
+
+        digest = getattr(self, '_digest', None)
+        if digest is None:
+            h = hashlib.sha1()
+            for key, tag_type in sorted(self.phrases.items()):
+                h.update(('%s\t%s\n' % (' '.join(key), tag_type))
+                         .encode('utf-8'))
+            digest = self._digest = h.hexdigest()
+        return digest
+
+    def match(self, words):
+        """Yield (first, last, type) for each non-overlapping vocabulary
+           phrase in words, a list of lowercase tokens, where first and
+           last are the indexes of its first and last words, preferring the
+           longest phrase at each position. """
+
+        i = 0
+        count = len(words)
+
+        while i < count:
+            if words[i] in self.first_tokens:
+                for length in range(min(self.max_length, count - i), 0, -1):
+                    tag_type = self.phrases.get(tuple(words[i:i + length]))
+                    if tag_type is not None:
+                        yield i, i + length - 1, tag_type
+                        i += length
+                        break
+                else:
+                    i += 1
+            else:
+                i += 1
+
+    def find(self, text):
+        """Yield (start, end, type) for each non-overlapping vocabulary
+           phrase in plain text, preferring the longest phrase at each
+           position. """
+
+        tokens = list(MATCH_TOKEN_RE.finditer(text))
+        for first, last, tag_type in self.match(
+                [t.group().lower() for t in tokens]):
+            yield tokens[first].start(), tokens[last].end(), tag_type
+
+    def tag_plain(self, text):
+        """Wrap vocabulary phrases in text, which must not contain
+           markup. """
+
+        segment = Segment(text)
+        self.tag_run([segment])
+        return segment.render()
+
+    def tag_run(self, segments):
+        """Tag a run of Segments, consecutive but for cue boundaries, which
+           are treated as whitespace. A phrase may span segments. Returns
+           the number of tokens scanned. """
+
+        tokens = []
+        for segment in segments:
+            tokens.extend((segment, m.start(), m.end(), m.group().lower())
+                          for m in MATCH_TOKEN_RE.finditer(segment.text))
+
+        for first, last, tag_type in self.match([t[3] for t in tokens]):
+            segment, start = tokens[first][:2]
+            segment.inserts.append((start, 1, '<c.%s>' % tag_type))
+            segment, end = tokens[last][0], tokens[last][2]
+            segment.inserts.append((end, 0, '</c>'))
+        return len(tokens)
+
+    def tag_text(self, text):
+        """Wrap vocabulary phrases in text with <c.TYPE>...</c>, leaving
+           markup and the content of existing tags untouched. Text before a
+           closing tag with no opening tag is treated as the end of a tag
+           continued from the previous cue. """
+
+        return self.tag_cues([text])[0]
+
+    def tag_cues(self, texts):
+        """Tag each of a sequence of cue texts as for tag_text, in a single
+           pass. Phrases may continue from one cue to the next where neither
+           the end of the first nor the start of the second is markup, and
+           existing tags may be continued across cues. Returns a list of the
+           tagged texts. """
+
+        cues = []
+        run = []
+        in_tag = False
+        scanned = 0
+
+        for text in texts:
+            tokens = list(scan(text))
+            if not in_tag:
+                # a stray closing tag ends a tag continued from before
+                for token in tokens:
+                    if is_tag(token):
+                        break
+                    if token.kind == END_TAG:
+                        in_tag = True
+                        break
+
+            pieces = []
+            for token in tokens:
+                if token.kind == TEXT and not in_tag:
+                    segment = Segment(token.value)
+                    pieces.append(segment)
+                    run.append(segment)
+                    continue
+
+                # markup and existing tags end the run, but the end of the
+                # cue doesn't
+                if run:
+                    scanned += self.tag_run(run)
+                    run = []
+
+                pieces.append(token.raw)
+                if is_tag(token):
+                    in_tag = True
+                elif token.kind == END_TAG:
+                    in_tag = False
+
+            if not tokens or tokens[-1].kind != TEXT:
+                if run:
+                    scanned += self.tag_run(run)
+                    run = []
+            cues.append(pieces)
+
+        if run:
+            scanned += self.tag_run(run)
+
+        if instrumentation.enabled():
+            instrumentation.count('auto_tag.tokens', scanned)
+
+        return [''.join(piece.render() if isinstance(piece, Segment)
+                        else piece for piece in pieces)
+                for pieces in cues]
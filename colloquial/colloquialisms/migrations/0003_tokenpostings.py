@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.8 on 2026-10-19 09:30
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('colloquialisms', '0002_colloquialism_allow_auto_tag'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenPostings',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transcript_type', models.CharField(max_length=100)),
+                ('transcript_id', models.BigIntegerField()),
+                ('language', models.CharField(db_index=True, max_length=30)),
+                ('token', models.CharField(db_index=True, max_length=100)),
+                ('postings', models.BinaryField()),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='tokenpostings',
+            unique_together=set([('transcript_type', 'transcript_id', 'token')]),
+        ),
+    ]
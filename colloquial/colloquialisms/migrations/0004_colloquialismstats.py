@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.8 on 2026-10-19 09:47
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('colloquialisms', '0003_tokenpostings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ColloquialismStats',
+            fields=[
+                ('colloquialism', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='colloquialisms.Colloquialism')),
+                ('occurrences', models.IntegerField(default=0)),
+                ('transcripts', models.IntegerField(default=0)),
+                ('last_seen', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'colloquialism stats',
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.8 on 2026-10-19 10:01
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('colloquialisms', '0004_colloquialismstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MinHashBand',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(db_index=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MinHashSignature',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transcript_type', models.CharField(max_length=100)),
+                ('transcript_id', models.BigIntegerField()),
+                ('signature', models.BinaryField()),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='minhashsignature',
+            unique_together=set([('transcript_type', 'transcript_id')]),
+        ),
+        migrations.AddField(
+            model_name='minhashband',
+            name='signature',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bands', to='colloquialisms.MinHashSignature'),
+        ),
+    ]
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""MinHash signatures and LSH banding for approximate similarity of
+   transcripts by their sets of colloquialisms.
+
+   A signature is the minimum of each of NUM_PERM hash functions over a
+   set of integers (colloquialism primary keys). The fraction of equal
+   positions in two signatures estimates the Jaccard similarity of their
+   sets. Signatures are split into bands of consecutive rows, each hashed
+   to one value; transcripts sharing any band value are candidates, which
+   is likely if their similarity s is high. With b bands (the
+   COLLOQUIAL_MINHASH_BANDS setting) of r = NUM_PERM / b rows each, the
+   probability of sharing at least one is
+
+       1 - (1 - s ** r) ** b
+
+   so more bands (fewer rows each) give higher recall but more candidates.
+   Requiring several shared bands gives fewer candidates, but lower recall.
+
+   Like the parser core, this module doesn't import Django.
+"""
+from __future__ import unicode_literals
+
+import hashlib
+import random
+import struct
+
+
+# a Mersenne prime, larger than any hash value
+PRIME = (1 << 61) - 1
+
+HASH_SEED = 20171019
+
+_coefficients = {}
+
+
+def get_coefficients(num_perm):
+    """Return num_perm (a, b) pairs for the hash functions
+       (a * x + b) % PRIME, the same in every process. """
+
+    if num_perm not in _coefficients:
+        rng = random.Random(HASH_SEED)
+        _coefficients[num_perm] = [
+            (rng.randint(1, PRIME - 1), rng.randint(0, PRIME - 1))
+            for i in range(num_perm)]
+    return _coefficients[num_perm]
+
+
+def signature(elements, num_perm):
+    """Return the MinHash signature of a set of non-negative integers, as a
+       list of num_perm integers, or None if the set is empty. """
+
+    elements = set(elements)
+    if not elements:
+        return None
+
+    return [min((a * x + b) % PRIME for x in elements)
+            for a, b in get_coefficients(num_perm)]
+
+
+def pack(sig):
+    return struct.pack(str('<%dQ' % len(sig)), *sig)
+
+
+def unpack(data):
+    data = bytes(data)
+    return list(struct.unpack(str('<%dQ' % (len(data) // 8)), data))
+
+
+def band_values(sig, bands):
+    """Return a list of one signed 64 bit value per band of sig, which
+       must divide into bands equally. The band index is included, so
+       values of different bands don't match. """
+
+    if len(sig) % bands:
+        raise ValueError('%s permutations do not divide into %s bands' % (
+            len(sig), bands))
+
+    rows = len(sig) // bands
+    values = []
+    for band in range(bands):
+        digest = hashlib.md5(struct.pack(str('<H'), band) +
+                             pack(sig[band * rows:(band + 1) * rows]))
+        values.append(struct.unpack(str('<q'), digest.digest()[:8])[0])
+    return values
+
+
+def similarity(sig1, sig2):
+    """Estimate the Jaccard similarity of the sets with signatures sig1 and
+       sig2. """
+
+    if not sig1 or len(sig1) != len(sig2):
+        return 0.0
+    return sum(1 for a, b in zip(sig1, sig2) if a == b) / float(len(sig1))
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""Mining transcripts for candidate colloquialisms: phrases which recur
+   across transcripts.
+
+   Each transcript's cues are stripped of voice spans and tags, tokenised,
+   and split into n-grams, which don't span cues. A transcript is counted
+   in a worker process (see count_transcript), and the main process adds
+   its n-grams to two count-min sketches, of occurrences and of the number
+   of transcripts containing each n-gram. The sketches take fixed memory
+   however large the corpus, and never underestimate a count, so
+   CandidateCounter only needs to keep the top n-grams by estimated number
+   of transcripts. See the mine_colloquialisms command.
+
+   Like the parser core, this module doesn't import Django.
+"""
+from __future__ import unicode_literals
+
+import hashlib
+import heapq
+import struct
+from array import array
+from collections import Counter, namedtuple
+from io import BytesIO
+
+from .parser import get_webvttfile, tokenise
+from .tokenizer import strip
+
+
+# a mined phrase, with estimated counts
+Candidate = namedtuple('Candidate', ('phrase', 'transcripts', 'occurrences'))
+
+
+def ngrams(tokens, min_n, max_n):
+    """Yield the n-grams of a list of tokens, for min_n <= n <= max_n, as
+       strings of space-separated tokens. """
+
+    for n in range(min_n, max_n + 1):
+        for i in range(len(tokens) - n + 1):
+            yield ' '.join(tokens[i:i + n])
+
+
+def count_transcript(args):
+    """Return a Counter of the n-grams in a transcript file, given a tuple
+       of (the file's bytes, min_n, max_n). A function of one argument, for
+       Pool.map. """
+
+    data, min_n, max_n = args
+    counts = Counter()
+    for item in get_webvttfile(BytesIO(data)):
+        counts.update(ngrams(tokenise(strip(item.text).text), min_n, max_n))
+    return counts
+
+
+class CountMinSketch(object):
+    """Approximate counts of strings in depth rows of width counters. An
+       estimate exceeds the true count by at most 2N / width (N being the
+       total of all counts), with probability at least 1 - 0.5 ** depth.
+    """
+
+    def __init__(self, width=2 ** 20, depth=4):
+        self.width = width
+        self.depth = depth
+        self.rows = [array(str('l'), [0]) * width for i in range(depth)]
+
+    def get_indexes(self, key):
+        # double hashing, with two 64 bit halves of one digest
+        h1, h2 = struct.unpack(
+            str('<QQ'), hashlib.md5(key.encode('utf-8')).digest())
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add(self, key, count=1):
+        """Add count to key, and return its new estimate. """
+
+        estimate = None
+        for row, index in zip(self.rows, self.get_indexes(key)):
+            row[index] += count
+            if estimate is None or row[index] < estimate:
+                estimate = row[index]
+        return estimate
+
+    def __getitem__(self, key):
+        return min(row[index]
+                   for row, index in zip(self.rows, self.get_indexes(key)))
+
+
+class CandidateCounter(object):
+    """Counts n-grams, transcript by transcript, keeping up to
+       max_candidates of those found in at least min_transcripts
+       transcripts and not in exclude. """
+
+    def __init__(self, min_transcripts=2, max_candidates=10000,
+                 exclude=(), width=2 ** 20, depth=4):
+        self.min_transcripts = min_transcripts
+        self.max_candidates = max_candidates
+        self.exclude = exclude
+        self.transcripts = CountMinSketch(width, depth)
+        self.occurrences = CountMinSketch(width, depth)
+        # estimated number of transcripts by phrase
+        self.candidates = {}
+        self.count = 0
+
+    def add(self, counts):
+        """Add a transcript's Counter of n-grams. """
+
+        self.count += 1
+        for phrase, count in counts.items():
+            self.occurrences.add(phrase, count)
+            estimate = self.transcripts.add(phrase)
+            if estimate >= self.min_transcripts and \
+                    phrase not in self.exclude:
+                self.candidates[phrase] = estimate
+
+        if len(self.candidates) > self.max_candidates * 2:
+            self.prune()
+
+    def prune(self):
+        # estimates only increase, so pruned phrases would have been found
+        # again when next seen
+        self.candidates = dict(heapq.nlargest(
+            self.max_candidates, self.candidates.items(),
+            key=lambda item: item[1]))
+
+    def most_common(self, limit=None):
+        """Return a list of up to limit Candidates, by most transcripts,
+           then most occurrences. """
+
+        candidates = [
+            Candidate(phrase, self.transcripts[phrase],
+                      self.occurrences[phrase])
+            for phrase in self.candidates]
+        candidates.sort(key=lambda c: (-c.transcripts, -c.occurrences,
+                                       c.phrase))
+        return candidates[:limit] if limit is not None else candidates
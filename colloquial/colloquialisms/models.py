@@ -2,16 +2,25 @@
 from __future__ import unicode_literals
 
 from StringIO import StringIO
+from collections import Counter, defaultdict
+from itertools import islice
 
-from django.db import models
+from django.apps import apps
+from django.db import models, transaction
 from django.utils.translation import ugettext_lazy as _
 from django.utils.encoding import python_2_unicode_compatible
 from django.conf import settings
 
-from .querysets import ColloquialismQuerySet, TagQuerySet
+from .core import normalise_value
+from .querysets import ColloquialismQuerySet, ColloquialismStatsQuerySet, \
+    MinHashSignatureQuerySet, TagQuerySet, TokenPostingsQuerySet, \
+    get_minhash_settings
+from . import instrumentation, routing
 
 
 DEFAULT_LANGUAGE = settings.LANGUAGES[0][0]
+# number of tags parsed and inserted at a time by AbstractTranscript.parse
+PARSE_BATCH_SIZE = 1000
 OCCURRENCE_RELATED_NAME = "tags"
 TYPE_CHOICES = [t[:2] for t in settings.COLLOQUIAL_TYPES]
 
@@ -45,10 +54,9 @@ class Colloquialism(models.Model):
 
     @classmethod
     def normalise_value(cls, value, type):
-        """Normalise value string - currently just lowercase it so that all are
-           case-insensitive; in future some types may be case-sensitive. """
+        """Normalise value string, see core.normalise_value. """
 
-        return value.lower()
+        return normalise_value(value, type)
 
     def save(self, *args, **kwargs):
         self.normalised_value = self.normalise_value(self.value, self.type)
@@ -61,6 +69,78 @@ class Colloquialism(models.Model):
         return '%s: %s' % (self.get_type_display(), self.value)
 
 
+class ColloquialismStats(models.Model):
+    """Occurrence counters for a colloquialism across all tag models,
+       maintained as tags are saved and deleted through AbstractTranscript
+       (parse, clear_tags, deletion) and retagging, so that popularity and
+       IDF don't need a GROUP BY over the tag tables. Tags changed any
+       other way aren't counted; the recount_colloquialism_stats command
+       rebuilds the counters. """
+
+    colloquialism = models.OneToOneField(
+        Colloquialism, on_delete=models.CASCADE, primary_key=True,
+        related_name='stats')
+    occurrences = models.IntegerField(default=0)
+    # number of distinct transcripts with at least one occurrence
+    transcripts = models.IntegerField(default=0)
+    last_seen = models.DateTimeField(null=True, blank=True)
+
+    objects = ColloquialismStatsQuerySet.as_manager()
+
+    class Meta:
+        verbose_name_plural = 'colloquialism stats'
+
+    def __str__(self):
+        return '%s: %s occurrences in %s transcripts' % (
+            self.colloquialism_id, self.occurrences, self.transcripts)
+
+
+class TokenPostings(models.Model):
+    """Inverted index entry, holding the encoded postings (see index.py) of
+       one token in one transcript. Transcripts are identified by model
+       label and primary key, so any AbstractTranscript subclass may be
+       indexed. """
+
+    transcript_type = models.CharField(max_length=100)
+    transcript_id = models.BigIntegerField()
+    language = models.CharField(max_length=30, db_index=True)
+    token = models.CharField(max_length=100, db_index=True)
+    postings = models.BinaryField()
+
+    objects = TokenPostingsQuerySet.as_manager()
+
+    class Meta:
+        unique_together = ('transcript_type', 'transcript_id', 'token', )
+
+    def get_transcript(self):
+        return apps.get_model(self.transcript_type).objects.get(
+            pk=self.transcript_id)
+
+
+class MinHashSignature(models.Model):
+    """MinHash signature of the set of colloquialisms in one transcript,
+       for approximate similarity search (see minhash.py). Transcripts are
+       identified as for TokenPostings. """
+
+    transcript_type = models.CharField(max_length=100)
+    transcript_id = models.BigIntegerField()
+    signature = models.BinaryField()
+
+    objects = MinHashSignatureQuerySet.as_manager()
+
+    class Meta:
+        unique_together = ('transcript_type', 'transcript_id', )
+
+
+class MinHashBand(models.Model):
+    """LSH band value of a MinHashSignature, indexed to find candidate
+       similar transcripts. """
+
+    signature = models.ForeignKey(
+        MinHashSignature, on_delete=models.CASCADE, related_name='bands')
+    value = models.BigIntegerField(db_index=True)
+
+
 class AbstractTranscript(object):
     """Assumes one-to-many relationship with an AbstractTag subclass.
        Subclasses must define class method get_tag_cls, and instance
@@ -70,6 +150,9 @@ class AbstractTranscript(object):
     # TODO deduce this programmatically
     tag_rel = 'tags'
 
+    # colloquialism types used to auto-tag, or None for all types
+    auto_tag_types = None
+
     def related_colloquialisms(self):
         """Return a queryset of colloquialisms occurring in this transcript.
         """
@@ -114,55 +197,280 @@ class AbstractTranscript(object):
 
         assert self.get_transcript_file(), 'No transcript file'
 
+        from .cuecache import get_cached_result
         from .parser import auto_tag_file
 
-        tags = Colloquialism.objects.filter_auto().values('type', 'value')
+        from .vocabulary import get_matcher
+
+        def tag():
+            tags = get_matcher(self.get_language(), self.auto_tag_types)
+            return auto_tag_file(self.get_webvttfile(), tags,
+                                 StringIO()).getvalue()
 
         if output is None:
             output = StringIO()
 
-        return auto_tag_file(self.get_transcript_file(), tags, output)
+        # identical files are auto-tagged once
+        output.write(get_cached_result(
+            'tagged', self.get_transcript_hash(), self.get_result_key(),
+            tag))
+        return output
+
+    def get_result_key(self, *parts):
+        """Return what results derived from the transcript content depend
+           on, besides the content itself: its language, auto-tag types and
+           a digest of their vocabulary, and any extra parts. """
+
+        from .vocabulary import get_matcher
+
+        types = sorted(self.auto_tag_types) \
+            if self.auto_tag_types is not None else None
+        # changes in other languages' vocabularies don't affect the results
+        digest = get_matcher(self.get_language(), types).get_digest()
+        return (self.get_language(), types, digest) + parts
+
+    def get_tag_records(self, valid_types):
+        """Return (records, errors) for the tags of the auto-tagged
+           transcript: an iterator of parser.TagRecords, and a list of
+           errors which is complete once records is exhausted.
+
+           Records are streamed from the file, or if the cue cache is
+           enabled, parsed once for identical files and cached.
+        """
+
+        from .cuecache import get_cache, get_cached_result
+        from .parser import iter_tags
+
+        errors = []
+        max_length = Colloquialism._meta.get_field('value').max_length
+        if get_cache() is None or not self.get_transcript_hash():
+            return iter_tags(self.get_tagged_transcript(), valid_types,
+                             errors, max_length), errors
+
+        def parse():
+            return list(iter_tags(self.get_tagged_transcript(), valid_types,
+                                  errors, max_length)), errors
+
+        records, errors = get_cached_result(
+            'tags', self.get_transcript_hash(),
+            self.get_result_key(sorted(valid_types)), parse)
+        return iter(records), list(errors)
+
+    def get_webvttfile(self):
+        """Return a WebVTTFile of the transcript content, from the parsed
+           cue cache where possible (see cuecache.py). """
 
-    def parse(self, save=False):
+        from .cuecache import get_cached_webvttfile
+
+        return get_cached_webvttfile(self.get_transcript_file(),
+                                     self.get_transcript_hash())
+
+    def parse(self, save=False, batch_size=None):
         """Parse existing tags from a transcript file. Return
 
            (tags, errors)
 
            where tags is a list of Tag instances, and errors a list of strings
+
+           With save=True, tags are streamed from the file into the database
+           in batches of batch_size (PARSE_BATCH_SIZE by default) without
+           creating Tag instances, and tags is the number saved.
         """
 
         assert self.get_transcript_file(), 'No transcript file'
 
-        from .parser import parse_transcript
-
-        def get_colloquialism(value, language, type):
-            """Get colloquialism by normalised value. """
+        language = self.get_language()
+        valid_types = [t[0] for t in settings.COLLOQUIAL_TYPES]
+        tag_cls = self.get_tag_cls()
+
+        # colloquialisms by (language, type, normalised_value), fetched or
+        # created in bulk for each batch of tags
+        colloquialisms = {}
+
+        def with_colloquialisms(records):
+            keys = [(language, r.type,
+                     Colloquialism.normalise_value(r.value, r.type))
+                    for r in records]
+            values = {}
+            for key, record in zip(keys, records):
+                if key not in colloquialisms:
+                    values.setdefault(key, record.value)
+            if values:
+                colloquialisms.update(
+                    Colloquialism.objects.bulk_get_or_create(values))
+            return [(colloquialisms[key], record)
+                    for key, record in zip(keys, records)]
+
+        with instrumentation.stage('parse', count_queries=True,
+                                   transcript=self.get_metrics_label()):
+            records, errors = self.get_tag_records(valid_types)
+
+            if not save:
+                return [
+                    tag_cls(start=r.start, start_exact=r.start_exact,
+                            colloquialism=colloquialism)
+                    for colloquialism, r in with_colloquialisms(
+                        list(records))], errors
+
+            fields = ('colloquialism', 'start', 'start_exact',
+                      tag_cls.transcript_rel)
+            added = Counter()
+
+            with transaction.atomic(savepoint=False):
+                before = self.get_tags().get_counts()
+                while True:
+                    batch = with_colloquialisms(list(
+                        islice(records, batch_size or PARSE_BATCH_SIZE)))
+                    if not batch:
+                        break
+                    added.update(c.pk for c, r in batch)
+                    tag_cls.objects.bulk_insert(fields, (
+                        (colloquialism.pk, r.start, r.start_exact, self.pk)
+                        for colloquialism, r in batch))
+
+                after = Counter(before)
+                after.update(added)
+                self.update_stats(before, after)
+                self.index_similarity(
+                    pk for pk, count in after.items() if count > 0)
+
+            self.index_text()
+            count = sum(added.values())
+
+        instrumentation.count('parse.tags', count,
+                              transcript=self.get_metrics_label())
+
+        return count, errors
+
+    def update_stats(self, before, after):
+        """Update ColloquialismStats for a change in this transcript's tag
+           counts, from before to after (dicts as returned by get_counts).
+        """
 
-            return Colloquialism.objects.get_or_create(
-                language=language,
-                type=type,
-                normalised_value=Colloquialism.normalise_value(value, type),
-                defaults={
-                    'value': value
-                }
-            )[0]
+        deltas = {}
+        for pk in set(before) | set(after):
+            old, new = before.get(pk, 0), after.get(pk, 0)
+            deltas[pk] = (new - old, int(new > 0) - int(old > 0))
+        ColloquialismStats.objects.apply(deltas)
 
-        valid_types = [t[0] for t in settings.COLLOQUIAL_TYPES]
+    def clear_tags(self):
+        """Delete this transcript's tags, updating ColloquialismStats.
+           Returns the number deleted. """
 
-        tagged_transcript = self.get_tagged_transcript()
+        with transaction.atomic(savepoint=False):
+            counts = self.get_tags().get_counts()
+            deleted, __ = self.get_tags().delete()
+            self.update_stats(counts, {})
+            self.clear_similarity()
+        return deleted
 
-        tags, errors = parse_transcript(
-            tagged_transcript, self.get_language(),
-            valid_types=valid_types,
-            get_tag=self.get_tag_cls(),
-            get_colloquialism=get_colloquialism)
+    def index_text(self):
+        """Rebuild this transcript's entries in the TokenPostings inverted
+           index from the transcript file. """
 
-        if save:
-            for occ in tags:
-                setattr(occ, occ.transcript_rel, self)
-                occ.save()
+        assert self.get_transcript_file(), 'No transcript file'
 
-        return tags, errors
+        from .cuecache import get_cached_result
+        from .index import index_cues, encode_postings
+
+        def build():
+            index = index_cues((item.start.ordinal, item.text)
+                               for item in self.get_webvttfile())
+            return dict((token, encode_postings(postings))
+                        for token, postings in index.items()
+                        if len(token) <= 100)
+
+        # identical files are indexed once
+        index = get_cached_result('index', self.get_transcript_hash(), (),
+                                  build)
+
+        self.clear_index()
+        TokenPostings.objects.bulk_create(
+            (TokenPostings(
+                transcript_type=self._meta.label_lower,
+                transcript_id=self.pk,
+                language=self.get_language(),
+                token=token,
+                postings=postings)
+             for token, postings in index.items()),
+            batch_size=500)
+
+    def clear_index(self):
+        TokenPostings.objects.for_transcript(self).delete()
+
+    def index_similarity(self, colloquialisms=None, force=False):
+        """Update this transcript's MinHashSignature and LSH bands from the
+           pks of its colloquialisms, by default those of its tags. They're
+           only rewritten if the signature has changed, unless force. """
+
+        from .minhash import band_values, pack, signature
+
+        if colloquialisms is None:
+            colloquialisms = self.get_tags().get_counts()
+        permutations, bands = get_minhash_settings()
+        sig = signature(colloquialisms, permutations)
+        if sig is None:
+            self.clear_similarity()
+            return
+
+        data = pack(sig)
+        existing = MinHashSignature.objects.for_transcript(self).first()
+        if existing is not None and bytes(existing.signature) == data and \
+                not force:
+            return
+
+        with transaction.atomic(savepoint=False):
+            if existing is None:
+                existing = MinHashSignature.objects.create(
+                    transcript_type=self._meta.label_lower,
+                    transcript_id=self.pk, signature=data)
+            else:
+                existing.signature = data
+                existing.save(update_fields=('signature', ))
+                existing.bands.all().delete()
+            MinHashBand.objects.bulk_create(
+                MinHashBand(signature=existing, value=value)
+                for value in band_values(sig, bands))
+
+    def clear_similarity(self):
+        MinHashSignature.objects.for_transcript(self).delete()
+
+    def similar_transcripts(self, limit=10, min_bands=1, threshold=0.0):
+        """Return a list of up to limit (transcript, similarity) pairs, of
+           any transcript model, whose colloquialisms are estimated to be
+           similar to this transcript's, most similar first. See
+           MinHashSignatureQuerySet.similar for min_bands and threshold. """
+
+        from .minhash import unpack
+
+        own = MinHashSignature.objects.for_transcript(self).for_read() \
+            .values_list('signature', flat=True).first()
+        if own is None:
+            return []
+
+        matches = [
+            m for m in MinHashSignature.objects.for_read().similar(
+                unpack(own), limit + 1, min_bands, threshold)
+            if (m.transcript_type, m.transcript_id) !=
+            (self._meta.label_lower, self.pk)][:limit]
+
+        pks = defaultdict(list)
+        for match in matches:
+            pks[match.transcript_type].append(match.transcript_id)
+        transcripts = dict(
+            (label, apps.get_model(label)._default_manager.using(
+                routing.get_read_database()).in_bulk(ids))
+            for label, ids in pks.items())
+
+        return [(transcripts[m.transcript_type][m.transcript_id],
+                 m.similarity)
+                for m in matches
+                if m.transcript_id in transcripts[m.transcript_type]]
+
+    def get_metrics_label(self):
+        """Identify this transcript in instrumentation tags. """
+
+        return '%s:%s' % (self._meta.label_lower, self.pk)
 
     # subclasses to implement the following methods
 
@@ -184,6 +492,12 @@ class AbstractTranscript(object):
     def colloquialism_json(self, colloquialism):
         return {}
 
+    def get_transcript_hash(self):
+        """Return a hash of the transcript file's content, e.g. as stored by
+           fields.HashedFileField, to enable the parsed cue cache. """
+
+        return None
+
     # @classmethod
     # def get_tag_relation(cls):
     #     """Get the tag relation for this class - use the first if
@@ -238,7 +552,10 @@ class AbstractTag(models.Model):
     def get_transcript(self):
         return getattr(self, self.transcript_rel)
 
-    def to_json(self):
+    def to_json(self, own_transcript=False):
+        """own_transcript is True where the tag is listed under its own
+           transcript, rather than as a related occurrence. """
+
         return {
             'time': self.start_exact.total_seconds(),
         }
@@ -2,27 +2,22 @@
 from __future__ import unicode_literals
 
 import re
+from collections import namedtuple
 from datetime import timedelta
 import codecs
 
-from pyvtt import WebVTTFile
+from . import instrumentation
+from .tokenizer import strip
 
 # match accented vowels as well. Must be contained in a []
 EXTRA_WORD = 'āēīōū'
 MATCH_WORD = '\w%s' % EXTRA_WORD
 WORD_RE = re.compile('[%s]' % MATCH_WORD)
 
-# TODO write a proper parser, or use BeautifulSoup, instead of regexes
+# voice spans and tags are parsed by tokenizer.py; the regexes below are
+# used by wrap_tag
 # NOTE nested tags are not supported, but they shouldn't be nested anyway
 
-# regular voice spans <v NAME>...</v>
-VOICE_SPAN_RE = re.compile(
-    '<v ([%s]+)>(.+)</v>?' % MATCH_WORD, flags=re.IGNORECASE)
-
-# special-case voice span where it's at the start and not closed
-INITIAL_VOICE_SPAN_RE = re.compile(
-    '^<v ([%s]+)>\s*' % MATCH_WORD, flags=re.IGNORECASE)
-
 # tags - <c.TYPE>...</c>
 TAG_RE = re.compile(
     '<c\.(\w+)>([%s\s,]+)(</c>)?' % MATCH_WORD, flags=re.IGNORECASE)
@@ -31,19 +26,37 @@ TAG_RE = re.compile(
 TAG_RE_FULL = re.compile(
     '(<c\.\w+>[%s\s]+</c>)' % MATCH_WORD, flags=re.IGNORECASE)
 
-# match any text before the first closing tag
-TAG_CLOSE_RE = re.compile(r'^(.*)</c>')
+# any markup, e.g. <v NAME>, <c.TYPE> or a stray </c>
+MARKUP_RE = re.compile(r'<[^>]*>')
+
+# words, including macrons and other non-ascii letters
+TOKEN_RE = re.compile(r'\w+', flags=re.UNICODE)
+
+# a cue timing line, e.g. 00:01.000 --> 00:02.500 align:start
+TIMING_RE = re.compile(
+    r'^((?:\d{2,}:)?\d{2}:\d{2}\.\d{3})[ \t]+-->[ \t]+'
+    r'((?:\d{2,}:)?\d{2}:\d{2}\.\d{3})(?:[ \t]|$)')
+
+# a tag found by iter_tags; start and start_exact are timedeltas
+TagRecord = namedtuple('TagRecord', ('type', 'value', 'start', 'start_exact'))
 
-TAG_CLOSE_LEN = 4
+# longest tag value iter_tags accepts, as Colloquialism.value's max_length
+MAX_TAG_LENGTH = 200
 
 
 def strip_voice_spans(text):
-    return INITIAL_VOICE_SPAN_RE.sub(
-        '', VOICE_SPAN_RE.sub(lambda m: m.groups()[1].strip(), text))
+    return strip(text, tags=False).text
 
 
 def strip_tags(text):
-    return TAG_RE.sub(lambda m: m.groups()[1].strip(), text)
+    return strip(text, voice_spans=False).text
+
+
+def tokenise(text):
+    """Return a list of normalised (lowercase) words in text, ignoring any
+       markup. """
+
+    return TOKEN_RE.findall(MARKUP_RE.sub('', text).lower())
 
 
 def parse_tags(text):
@@ -56,22 +69,33 @@ def parse_tags(text):
        text with tags stripped, rounded to 5 decimal places
     """
 
-    text = strip_voice_spans(text)
+    return stripped_tags(strip(text))
 
-    stripped_len = len(strip_tags(text))
 
-    for match in TAG_RE.finditer(text):
-        # estimate position within the (stripped) string
-        previous_text = strip_tags(text[:match.start()])
-        pos = round(float(len(previous_text)) / stripped_len, 5)
+def stripped_tags(stripped):
+    """As parse_tags, for the result of tokenizer.strip. """
 
-        tag_type, value, closed = match.groups()
+    stripped_len = len(stripped.text)
 
-        yield tag_type, value, pos, bool(closed)
+    for span in stripped.tags:
+        if not span.type:
+            continue
+
+        # estimate position within the (stripped) string
+        pos = round(float(span.offset) / stripped_len, 5) \
+            if stripped_len else 0
+
+        yield span.type, span.value, pos, span.closed
 
 
 def get_webvttfile(file_obj):
-    """Get a WebVTTFile instance from a file-like object. """
+    """Get a WebVTTFile instance from a file-like object, or return file_obj
+       if it is already a WebVTTFile. """
+
+    from pyvtt import WebVTTFile
+
+    if isinstance(file_obj, WebVTTFile):
+        return file_obj
 
     file_obj.seek(0)
     contents = file_obj.read()
@@ -83,77 +107,172 @@ def get_webvttfile(file_obj):
     return WebVTTFile.from_string(contents)
 
 
-def parse_transcript(transcript_file, language, valid_types, get_tag,
-                     get_colloquialism):
-    """Process a transcript file, creating Colloquialism instances as needed,
-       and returning a list of Tag instances for review.
-       returns a tuple: (tags, errors)
+def timestamp_ms(timestamp):
+    """Return a WebVTT timestamp, [HH:]MM:SS.mmm, in milliseconds. """
 
-       get_colloquialism should return Colloquialism instance
-       get_tag should return a Tag instance
-    """
+    parts = timestamp.split(':')
+    seconds, ms = parts.pop().split('.')
+    minutes = int(parts.pop())
+    hours = int(parts.pop()) if parts else 0
+    return ((hours * 60 + minutes) * 60 + int(seconds)) * 1000 + int(ms)
 
-    webvttfile = get_webvttfile(transcript_file)
+
+def validate_webvtt(lines):
+    """Return a list of errors in WebVTT content given as an iterable of
+       lines (bytes), e.g. a file, reading it once without keeping it in
+       memory. Checks the header, encoding and cue timings, and that there
+       is at least one cue. """
 
     errors = []
-    tags = []
+    cues = 0
 
-    unclosed = None
+    for line_num, line in enumerate(lines, 1):
+        try:
+            line = line.decode('utf-8-sig' if line_num == 1 else 'utf-8')
+        except UnicodeDecodeError:
+            errors.append('Line %s is not valid UTF-8' % line_num)
+            continue
+        line = line.rstrip('\r\n')
 
-    def create_tag(tag_type, value, start, start_exact):
-        # create the colloquialism entry if it doesn't exist.
-        colloquialism = get_colloquialism(
-            value=value, language=language, type=tag_type)
+        if line_num == 1:
+            if line != 'WEBVTT' and not line.startswith(('WEBVTT ',
+                                                         'WEBVTT\t')):
+                errors.append('Missing WEBVTT header')
+            continue
+
+        if '-->' not in line:
+            continue
+
+        match = TIMING_RE.match(line)
+        if match is None:
+            errors.append('Invalid cue timing at line %s' % line_num)
+            continue
 
-        start_exact = start + timedelta(milliseconds=int(length * pos))
-        tag = get_tag(
-            start=start, start_exact=start_exact,
-            colloquialism=colloquialism)
-        tags.append(tag)
+        start, end = match.groups()
+        if timestamp_ms(end) < timestamp_ms(start):
+            errors.append('Cue ends before it starts at line %s' % line_num)
+        cues += 1
+
+    if not errors and not cues:
+        errors.append('No cues')
+    return errors
+
+
+def iter_tags(transcript_file, valid_types=None, errors=None,
+              max_length=MAX_TAG_LENGTH):
+    """Yield a TagRecord for each tag in a transcript file, in order,
+       without building a list. A tag left unclosed at the end of a cue is
+       continued through following cues without tags until the text before
+       a closing tag at the start of a cue, as long as its value stays
+       within max_length. Each cue is scanned once.
+
+       Tags with a type not in valid_types, never closed, or longer than
+       max_length are skipped, and a message appended to errors if it is a
+       list. valid_types may be None to accept any type.
+    """
+
+    def error(message, *args):
+        # TODO - log error
+        if errors is not None:
+            errors.append(message % args)
+
+    webvttfile = get_webvttfile(transcript_file)
+    unclosed = None
 
     for entry in webvttfile:
         # convert WebVTTTime to timedelta
         start = timedelta(milliseconds=entry.start.ordinal)
         length = entry.end.ordinal - entry.start.ordinal
+        stripped = strip(entry.text)
 
         # if there's a leftover unclosed tag, check if it's closed at the
-        # start of the next entry
+        # start of this entry, or continues through it
         if unclosed:
-            # get text preceding any other tags
-            pre_tag_text = TAG_RE.split(entry.text)[0]
-
-            # look for a closing tag, and capture any text before it
-            match = TAG_CLOSE_RE.match(pre_tag_text)
-
-            if match:
+            value = '%s %s' % (unclosed.value, stripped.leading) \
+                if stripped.leading else unclosed.value
+            if len(value) > max_length:
+                # most likely a missing </c>, so don't carry it further
+                error('Unclosed tag at %s - %s', unclosed.start,
+                      unclosed.value)
+                unclosed = None
+            elif stripped.leading_closed or not stripped.tags:
                 # append the extra content to the unclosed tag
-                unclosed['value'] = '%s %s' % (
-                    unclosed['value'], match.groups()[0])
+                unclosed = unclosed._replace(value=value)
+                if stripped.leading_closed:
+                    yield unclosed
+                    unclosed = None
+                else:
+                    continue
+            else:
+                error('Unclosed tag at %s - %s', unclosed.start,
+                      unclosed.value)
+                unclosed = None
+
+        for tag_type, value, pos, closed in stripped_tags(stripped):
+            if valid_types is not None and tag_type not in valid_types:
+                error('Invalid tag type at %s - %s', entry.start, tag_type)
+                continue
 
-                create_tag(**unclosed)
+            if unclosed:
+                error('Unclosed tag at %s - %s', unclosed.start,
+                      unclosed.value)
                 unclosed = None
 
-        for tag_type, value, pos, closed in parse_tags(entry.text):
-            if tag_type not in valid_types:
-                # TODO - log error
-                errors.append('Invalid tag type at %s - %s' % (
-                    entry.start, tag_type))
+            if len(value) > max_length:
+                error('Tag too long at %s - %s...', entry.start,
+                      value[:max_length])
                 continue
 
-            start_exact = start + timedelta(milliseconds=int(length * pos))
-            tag_details = {
-                'tag_type': tag_type,
-                'value': value,
-                'start': start,
-                'start_exact': start_exact,
-            }
+            record = TagRecord(
+                tag_type, value, start,
+                start + timedelta(milliseconds=int(length * pos)))
 
             if closed:
-                create_tag(**tag_details)
+                yield record
                 unclosed = None
             else:
-                # save the details for the next iteration of the outer loop
-                unclosed = tag_details
+                # save the details for the following entries
+                unclosed = record
+
+    if unclosed:
+        error('Unclosed tag at %s - %s', unclosed.start, unclosed.value)
+
+
+def parse_transcript(transcript_file, language, valid_types, get_tag,
+                     get_colloquialism):
+    """Process a transcript file, creating Colloquialism instances as needed,
+       and returning a list of Tag instances for review.
+       returns a tuple: (tags, errors)
+
+       get_colloquialism should return Colloquialism instance
+       get_tag should return a Tag instance
+       valid_types may be None to accept any type
+
+       See iter_tags to process tags one at a time instead.
+    """
+
+    with instrumentation.stage('parse_transcript.read', language=language):
+        webvttfile = get_webvttfile(transcript_file)
+
+    errors = []
+    tags = []
+
+    with instrumentation.stage('parse_transcript.tags', language=language):
+        for record in iter_tags(webvttfile, valid_types, errors):
+            # create the colloquialism entry if it doesn't exist.
+            colloquialism = get_colloquialism(
+                value=record.value, language=language, type=record.type)
+            tags.append(get_tag(
+                start=record.start, start_exact=record.start_exact,
+                colloquialism=colloquialism))
+
+    if instrumentation.enabled():
+        instrumentation.count('parse_transcript.cues', len(webvttfile),
+                              language=language)
+        instrumentation.count('parse_transcript.tags', len(tags),
+                              language=language)
+        instrumentation.count('parse_transcript.errors', len(errors),
+                              language=language)
 
     return tags, errors
 
@@ -203,7 +322,8 @@ def auto_tag_text(text, tags):
     """Find instances of tags in text, and wrap them in
         <c.tagtype>tag value</c>.
 
-       tags should be an iterable of dicts with 'type' and 'value' keys:
+       tags should be a matcher.Matcher, or an iterable of dicts with 'type'
+       and 'value' keys:
 
        [
            {'type': '...', 'value': '...'},
@@ -211,45 +331,40 @@ def auto_tag_text(text, tags):
        ]
     """
 
-    for info in tags:
-        text = wrap_tag(text, info['value'], info['type'])
+    from .matcher import Matcher
 
-    return text
+    if not isinstance(tags, Matcher):
+        tags = Matcher(tags)
+
+    return tags.tag_text(text)
 
 
 def auto_tag_file(file_obj, tags, output):
     """Find instances of tags in the content of a WebVTT file, and wrap them in
         <c.tagtype>tag value</c>.
 
-       tags should be an iterable of dicts as in auto_tag_text
+       tags should be a Matcher or an iterable of dicts as in auto_tag_text
 
        Writes content to output, which should be a file-like object"""
 
-    webvtt = get_webvttfile(file_obj)
-
-    previous = None
-    for item in webvtt:
-        item.text = auto_tag_text(item.text, tags)
-
-        # TODO check that the end of the previous item's text (after any tags)
-        # and the beginning of this one don't contain anything that should be
-        # auto tagged
-        if previous:
-            prev_split = TAG_RE_FULL.split(previous.text)
-            current_split = TAG_RE_FULL.split(item.text)
-            span = '%s %s' % (prev_split[-1], current_split[0])
-            tagged = auto_tag_text(span, tags)
-            if len(tagged) > len(span):
-                # assume only one item has been tagged, and determine where to
-                # split the text based on the lengths of the original text and
-                # the assumed addition of a closing tag to the second part
-                current_len = len(current_split[0]) + TAG_CLOSE_LEN
-                prev_split[-1] = tagged[:-current_len]
-                current_split[0] = tagged[-current_len:]
-                previous.text = ''.join(prev_split).strip()
-                item.text = ''.join(current_split).strip()
-
-        previous = item
-
-    webvtt.write_into(output, include_indexes=True)
+    from .matcher import Matcher
+
+    with instrumentation.stage('auto_tag_file.read'):
+        webvtt = get_webvttfile(file_obj)
+
+    if not isinstance(tags, Matcher):
+        tags = Matcher(tags)
+
+    with instrumentation.stage('auto_tag_file.tag'):
+        # one pass over all the cues, so that phrases split across cues are
+        # tagged
+        for item, text in zip(webvtt, tags.tag_cues(
+                [item.text for item in webvtt])):
+            item.text = text
+
+    if instrumentation.enabled():
+        instrumentation.count('auto_tag_file.cues', len(webvtt))
+
+    with instrumentation.stage('auto_tag_file.write'):
+        webvtt.write_into(output, include_indexes=True)
     return output
@@ -1,11 +1,77 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
-from django.db import models
+import math
+from collections import OrderedDict, defaultdict, namedtuple
+from datetime import timedelta
+
+from django.db import models, connections, transaction
 from django.conf import settings
+from django.utils import timezone
+
+
+# INSERT statements which skip rows violating a unique constraint, by
+# database vendor
+INSERT_IGNORE_SQL = {
+    'postgresql': 'INSERT INTO %(table)s (%(columns)s) VALUES %(values)s '
+                  'ON CONFLICT DO NOTHING',
+    'sqlite': 'INSERT OR IGNORE INTO %(table)s (%(columns)s) '
+              'VALUES %(values)s',
+    'mysql': 'INSERT IGNORE INTO %(table)s (%(columns)s) VALUES %(values)s',
+}
+
+# maximum rows in a multi-row INSERT, where the database doesn't limit it
+MAX_INSERT_BATCH = 500
+
+INSERT_SQL = 'INSERT INTO %(table)s (%(columns)s) VALUES %(values)s'
+
+# SQL returning the planner's row estimate for a table, by database vendor
+ESTIMATE_SQL = {
+    'postgresql': 'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+    'mysql': 'SELECT table_rows FROM information_schema.tables '
+             'WHERE table_schema = DATABASE() AND table_name = %s',
+}
+
+
+def insert_rows(queryset, fields, rows, sql=INSERT_SQL):
+    """Insert rows, tuples of values for fields, in one multi-row INSERT
+       statement without instantiating models. sql is a template as in
+       INSERT_SQL. Returns the number of rows inserted. """
+
+    connection = connections[queryset.db]
+    params = []
+    for row in rows:
+        params.extend(field.get_db_prep_save(value, connection)
+                      for field, value in zip(fields, row))
+
+    placeholders = '(%s)' % ', '.join(['%s'] * len(fields))
+    with connection.cursor() as cursor:
+        cursor.execute(sql % {
+            'table': connection.ops.quote_name(
+                queryset.model._meta.db_table),
+            'columns': ', '.join(
+                connection.ops.quote_name(f.column) for f in fields),
+            'values': ', '.join([placeholders] * len(rows)),
+        }, params)
+        return cursor.rowcount
+
+
+class ReadQuerySet(models.QuerySet):
+    """QuerySet with for_read, see routing.py. """
 
+    def for_read(self):
+        """Return the queryset on the read database, if one is configured
+           and the queryset isn't already bound to a database. """
 
-class ColloquialismQuerySet(models.QuerySet):
+        from .routing import get_read_database
+
+        alias = get_read_database()
+        if alias is None or self._db is not None:
+            return self
+        return self.using(alias)
+
+
+class ColloquialismQuerySet(ReadQuerySet):
     """QuerySet for Colloquialism models.  """
 
     def filter_auto(self):
@@ -21,15 +87,235 @@ class ColloquialismQuerySet(models.QuerySet):
         return self.filter(type__in=auto_types, allow_auto_tag=True) \
             .exclude(normalised_value__in=duplicates)
 
+    def bulk_get_or_create(self, values, batch_size=None):
+        """Get or create colloquialisms in bulk, safely under concurrent
+           use. values should be a dict of
+
+               (language, type, normalised_value): value
+
+           where value is used for colloquialisms which don't yet exist.
+           Returns a dict of the same keys to Colloquialism instances.
+           See insert_missing.
+        """
+
+        found, created = self.insert_missing(
+            OrderedDict((key, (value, '', True))
+                        for key, value in values.items()),
+            batch_size)
+        return found
+
+    def create_missing(self, colloquialisms, batch_size=None):
+        """Create those of colloquialisms, unsaved Colloquialism instances,
+           which don't already exist. Instances are normalised here; the
+           first of several with the same key is used. Returns the list of
+           created colloquialisms. See insert_missing.
+        """
+
+        rows = OrderedDict()
+        for colloquialism in colloquialisms:
+            normalised_value = self.model.normalise_value(
+                colloquialism.value, colloquialism.type)
+            rows.setdefault(
+                (colloquialism.language, colloquialism.type,
+                 normalised_value),
+                (colloquialism.value, colloquialism.meaning,
+                 colloquialism.allow_auto_tag))
+
+        found, created = self.insert_missing(rows, batch_size)
+        return [found[key] for key in created]
+
+    def insert_missing(self, rows, batch_size=None):
+        """Insert colloquialisms which don't yet exist, safely under
+           concurrent use. rows should be a dict of
+
+               (language, type, normalised_value): (value, meaning,
+                                                    allow_auto_tag)
+
+           Returns a dict of the same keys to Colloquialism instances, and
+           the list of keys created.
+
+           Rows are inserted with the database's insert-or-ignore statement,
+           so that conflicting inserts from other processes (or the admin)
+           are skipped rather than raising IntegrityError, then selected.
+           Databases without one fall back to get_or_create for each row.
+           Signals aren't sent, so the vocabulary is invalidated here, and
+           created colloquialisms are retagged on commit if
+           COLLOQUIAL_RETAG_ON_SAVE is set.
+        """
+
+        from .signals import retag_created
+        from .vocabulary import invalidate
+
+        connection = connections[self.db]
+        sql = INSERT_IGNORE_SQL.get(connection.vendor)
+        keys = list(rows)
+
+        found = {}
+        created = []
+        if sql is None:
+            for key in keys:
+                value, meaning, allow_auto_tag = rows[key]
+                found[key], is_new = self.get_or_create(
+                    language=key[0], type=key[1], normalised_value=key[2],
+                    defaults={'value': value, 'meaning': meaning,
+                              'allow_auto_tag': allow_auto_tag})
+                if is_new:
+                    created.append(key)
+            # post_save was sent
+            return found, created
+
+        fields = [self.model._meta.get_field(name) for name in (
+            'type', 'language', 'allow_auto_tag', 'value',
+            'normalised_value', 'meaning', 'created', 'updated')]
+        batch_size = batch_size or max(
+            connection.ops.bulk_batch_size(fields, keys), 1)
+        now = timezone.now()
+
+        for i in range(0, len(keys), batch_size):
+            batch = set(keys[i:i + batch_size])
+            values = []
+            for language, type, normalised_value in batch:
+                value, meaning, allow_auto_tag = rows[
+                    (language, type, normalised_value)]
+                values.append((type, language, allow_auto_tag, value,
+                               normalised_value, meaning, now, now))
+            inserted = insert_rows(self, fields, values, sql) > 0
+
+            for colloquialism in self.filter(
+                    normalised_value__in=set(key[2] for key in batch)):
+                key = (colloquialism.language, colloquialism.type,
+                       colloquialism.normalised_value)
+                # other keys with the same value are in other batches
+                if key in batch:
+                    found[key] = colloquialism
+                    # rows inserted by other processes have their own time
+                    if inserted and colloquialism.created == now:
+                        created.append(key)
+
+        if created:
+            # raw inserts don't send post_save
+            invalidate()
+            retag_created(created)
+
+        return found, created
+
+
+class ColloquialismStatsQuerySet(ReadQuerySet):
+    """QuerySet for ColloquialismStats. """
+
+    def popular(self):
+        return self.order_by('-occurrences', '-transcripts')
+
+    def apply(self, deltas, seen=None):
+        """Add changes to the counters, creating rows as needed. deltas
+           should be a dict of
+
+               colloquialism pk: (occurrences, transcripts)
+
+           Colloquialisms whose occurrences increase are marked as seen at
+           seen, defaulting to now. Makes one insert-or-ignore per batch of
+           colloquialisms and one update per distinct change.
+        """
+
+        deltas = dict((pk, delta) for pk, delta in deltas.items()
+                      if delta != (0, 0))
+        if not deltas:
+            return
+
+        connection = connections[self.db]
+        sql = INSERT_IGNORE_SQL.get(connection.vendor)
+        pks = list(deltas)
+        batch_size = max(connection.ops.bulk_batch_size(['pk'], pks), 1)
+
+        for i in range(0, len(pks), batch_size):
+            batch = pks[i:i + batch_size]
+            if sql is None:
+                for pk in batch:
+                    self.get_or_create(colloquialism_id=pk)
+            else:
+                fields = [self.model._meta.get_field(name) for name in (
+                    'colloquialism', 'occurrences', 'transcripts')]
+                insert_rows(self, fields, [(pk, 0, 0) for pk in batch], sql)
+
+        changes = defaultdict(list)
+        for pk, delta in deltas.items():
+            changes[delta].append(pk)
+
+        seen = seen or timezone.now()
+        for (occurrences, transcripts), pks in changes.items():
+            update = {
+                'occurrences': models.F('occurrences') + occurrences,
+                'transcripts': models.F('transcripts') + transcripts,
+            }
+            if occurrences > 0:
+                update['last_seen'] = seen
+            for i in range(0, len(pks), batch_size):
+                self.filter(colloquialism__in=pks[i:i + batch_size]) \
+                    .update(**update)
+
+    def recount(self, pks=None):
+        """Rebuild all counters from the tag tables, or only those of the
+           colloquialisms with pks, keeping last_seen. Returns the number
+           of colloquialisms with tags. """
+
+        from .registry import get_tag_models
+
+        stats = self.all()
+        counts = defaultdict(lambda: [0, 0])
+        for model in get_tag_models():
+            tags = model.objects.all()
+            if pks is not None:
+                tags = tags.filter(colloquialism__in=pks)
+            for pk, occurrences, transcripts in tags \
+                    .values('colloquialism').order_by('colloquialism') \
+                    .annotate(occurrences=models.Count('pk'),
+                              transcripts=models.Count(
+                                  model.transcript_rel, distinct=True)) \
+                    .values_list('colloquialism', 'occurrences',
+                                 'transcripts'):
+                counts[pk][0] += occurrences
+                counts[pk][1] += transcripts
+
+        if pks is not None:
+            stats = stats.filter(colloquialism__in=pks)
 
-class TranscriptQuerySet(models.QuerySet):
+        with transaction.atomic(using=self.db):
+            last_seen = dict(stats.values_list('colloquialism', 'last_seen'))
+            stats.delete()
+            self.bulk_create([
+                self.model(colloquialism_id=pk, occurrences=occurrences,
+                           transcripts=transcripts,
+                           last_seen=last_seen.get(pk))
+                for pk, (occurrences, transcripts) in counts.items()])
+
+        return len(counts)
+
+    def idf(self, total=None):
+        """Return a dict of colloquialism pk to inverse document frequency,
+           i.e. how distinctive the colloquialism is of the transcripts it
+           occurs in. total is the number of transcripts, by default those
+           of all transcript models. """
+
+        from .registry import get_transcript_models
+
+        if total is None:
+            total = sum(model.objects.count()
+                        for model in get_transcript_models())
+
+        return dict(
+            (pk, math.log((1.0 + total) / (1.0 + transcripts)) + 1)
+            for pk, transcripts in self.values_list(
+                'colloquialism', 'transcripts'))
+
+
+class TranscriptQuerySet(ReadQuerySet):
     """QuerySet for Transcript models. Assumed to have a one-to-many
        relationship with an AbstractTag model. """
 
     pass
 
 
-class TagQuerySet(models.QuerySet):
+class TagQuerySet(ReadQuerySet):
     """QuerySet for Tag models. Assumed to have a foreign key to
        a transcript model. """
 
@@ -39,6 +325,32 @@ class TagQuerySet(models.QuerySet):
     def with_transcript(self):
         return self.select_related(self.model.transcript_rel)
 
+    def bulk_insert(self, field_names, rows, batch_size=None):
+        """Insert rows, tuples of values for field_names (foreign keys
+           given as primary keys), in batches without instantiating models.
+           rows may be any iterable, and is consumed a batch at a time.
+           Returns the number of rows inserted. """
+
+        connection = connections[self.db]
+        fields = [self.model._meta.get_field(name) for name in field_names]
+        # bulk_batch_size only uses the length of its objs argument
+        batch_size = batch_size or max(connection.ops.bulk_batch_size(
+            fields, range(MAX_INSERT_BATCH)), 1)
+
+        inserted = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == batch_size:
+                insert_rows(self, fields, batch)
+                inserted += len(batch)
+                batch = []
+        if batch:
+            insert_rows(self, fields, batch)
+            inserted += len(batch)
+
+        return inserted
+
     def get_counts(self):
         """Get a dict of counts, grouped by colloquialism id. """
 
@@ -47,3 +359,158 @@ class TagQuerySet(models.QuerySet):
             .values_list('colloquialism', 'count')
 
         return dict(counts)
+
+    def estimated_count(self, threshold=100000):
+        """Return the number of rows, using the database's table statistics
+           rather than a full COUNT(*) where the queryset is unfiltered and
+           the estimate is at least threshold. Falls back to count() for
+           filtered querysets, small tables and unsupported databases. """
+
+        if self.query.where:
+            return self.count()
+
+        connection = connections[self.db]
+        sql = ESTIMATE_SQL.get(connection.vendor)
+        if sql is None:
+            return self.count()
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [self.model._meta.db_table])
+            row = cursor.fetchone()
+
+        if not row or row[0] is None or row[0] < threshold:
+            return self.count()
+
+        return int(row[0])
+
+
+PhraseMatch = namedtuple(
+    'PhraseMatch', ('transcript_type', 'transcript_id', 'start'))
+
+
+class TokenPostingsQuerySet(models.QuerySet):
+    """QuerySet for the TokenPostings inverted index. """
+
+    def for_transcript(self, transcript):
+        return self.filter(transcript_type=transcript._meta.label_lower,
+                           transcript_id=transcript.pk)
+
+    def search(self, phrase, language=None, span_cues=False):
+        """Return a list of PhraseMatch tuples for each cue in which phrase
+           is spoken, ordered by transcript and start time. Matching is
+           case-insensitive and ignores punctuation. With span_cues, cues in
+           which phrase starts and continues into the next cue are included
+           too. """
+
+        from .index import match_phrase, match_phrase_spans
+        from .parser import tokenise
+
+        tokens = tokenise(phrase)
+        match = match_phrase_spans if span_cues else match_phrase
+
+        matches = []
+        for key, by_token in sorted(self.phrase_postings(tokens, language)
+                                    .items()):
+            for start in match([by_token[t] for t in tokens]):
+                matches.append(PhraseMatch(
+                    key[0], key[1], timedelta(milliseconds=start)))
+
+        return matches
+
+    def phrase_postings(self, tokens, language=None):
+        """Return a dict of (transcript_type, transcript_id) to a dict of
+           token to decoded postings, for the transcripts containing all of
+           tokens. """
+
+        from .index import decode_postings
+
+        if not tokens:
+            return {}
+
+        qs = self
+        if language:
+            qs = qs.filter(language=language)
+
+        # find the token occurring in fewest transcripts, and only fetch
+        # postings for transcripts containing it, of the same type
+        frequencies = defaultdict(int)
+        types = defaultdict(set)
+        for token, transcript_type, count in qs.filter(
+                token__in=set(tokens)) \
+                .values('token', 'transcript_type') \
+                .order_by('token', 'transcript_type') \
+                .annotate(count=models.Count('pk')) \
+                .values_list('token', 'transcript_type', 'count'):
+            frequencies[token] += count
+            types[token].add(transcript_type)
+        if len(frequencies) < len(set(tokens)):
+            return {}
+        rarest = min(frequencies, key=frequencies.get)
+
+        candidates = models.Q()
+        for transcript_type in sorted(types[rarest]):
+            candidates |= models.Q(
+                transcript_type=transcript_type,
+                transcript_id__in=qs.filter(
+                    token=rarest, transcript_type=transcript_type)
+                .values('transcript_id'))
+        rows = qs.filter(candidates, token__in=set(tokens)) \
+            .values_list('transcript_type', 'transcript_id', 'token',
+                         'postings')
+
+        postings = defaultdict(dict)
+        for transcript_type, transcript_id, token, data in rows:
+            postings[(transcript_type, transcript_id)][token] = \
+                decode_postings(data)
+
+        return dict((key, by_token) for key, by_token in postings.items()
+                    if len(by_token) == len(frequencies))
+
+
+SimilarMatch = namedtuple(
+    'SimilarMatch', ('transcript_type', 'transcript_id', 'similarity'))
+
+
+def get_minhash_settings():
+    """Return (permutations, bands) for MinHash signatures, where bands is
+       the number of bands, each of permutations / bands rows. """
+
+    return (getattr(settings, 'COLLOQUIAL_MINHASH_PERMUTATIONS', 64),
+            getattr(settings, 'COLLOQUIAL_MINHASH_BANDS', 16))
+
+
+class MinHashSignatureQuerySet(ReadQuerySet):
+    """QuerySet for the MinHashSignature similarity index. """
+
+    def for_transcript(self, transcript):
+        return self.filter(transcript_type=transcript._meta.label_lower,
+                           transcript_id=transcript.pk)
+
+    def similar(self, sig, limit=10, min_bands=1, threshold=0.0):
+        """Return a list of up to limit SimilarMatch tuples for the
+           signatures sharing at least min_bands LSH bands with sig (see
+           minhash.py), with an estimated similarity of at least threshold,
+           most similar first. Takes one query, using the band index. """
+
+        from .minhash import band_values, similarity, unpack
+        from .models import MinHashBand
+
+        permutations, bands = get_minhash_settings()
+        candidates = MinHashBand.objects.filter(
+            value__in=band_values(sig, bands)) \
+            .values('signature').order_by('signature') \
+            .annotate(matches=models.Count('pk')) \
+            .filter(matches__gte=min_bands).values('signature')
+
+        matches = []
+        for transcript_type, transcript_id, data in self.filter(
+                pk__in=candidates).values_list(
+                    'transcript_type', 'transcript_id', 'signature'):
+            score = similarity(sig, unpack(data))
+            if score >= threshold:
+                matches.append(
+                    SimilarMatch(transcript_type, transcript_id, score))
+
+        matches.sort(key=lambda m: (-m.similarity, m.transcript_type,
+                                    m.transcript_id))
+        return matches[:limit]
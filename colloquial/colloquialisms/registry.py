@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""Registry of the installed transcript and tag models, i.e. concrete
+   subclasses of AbstractTranscript and AbstractTag, in app registry order.
+"""
+from __future__ import unicode_literals
+
+from django.apps import apps
+
+
+def get_transcript_models():
+    from .models import AbstractTranscript
+
+    return [model for model in apps.get_models()
+            if issubclass(model, AbstractTranscript)]
+
+
+def get_tag_models():
+    from .models import AbstractTag
+
+    return [model for model in apps.get_models()
+            if issubclass(model, AbstractTag)]
+
+
+def get_tag_model(label):
+    """Return the tag model with label, e.g. 'transcripts.tag', or raise
+       LookupError if it isn't a registered tag model. """
+
+    for model in get_tag_models():
+        if model._meta.label_lower == label.lower():
+            return model
+    raise LookupError('%s is not a tag model' % label)
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""Related tag lookups across every registered tag model.
+
+   AbstractTranscript.related_tags only finds tags of the transcript's own
+   tag model. related_tags here finds the tags of any transcript model
+   which share a colloquialism with the transcript, with one UNION ALL
+   query over the tag tables, rather than one query per model.
+"""
+from __future__ import unicode_literals
+
+from django.db import connections, router
+
+from .registry import get_tag_models
+from .routing import get_read_database
+
+
+SELECT_SQL = ('SELECT %%s, %(id)s, %(transcript)s, %(colloquialism)s, '
+              '%(start)s, %(start_exact)s FROM %(table)s '
+              'WHERE %(colloquialism)s IN (%(colloquialisms)s)')
+
+COLLOQUIALISMS_SQL = 'SELECT %(colloquialism)s FROM %(table)s ' \
+    'WHERE %(transcript)s = %%s'
+
+# by model, then transcript, then time, so limits are stable
+ORDER_SQL = ' ORDER BY 1, 3, 5, 2'
+
+FIELDS = ('id', 'transcript', 'colloquialism', 'start', 'start_exact')
+
+
+def get_columns(model, connection):
+    qn = connection.ops.quote_name
+    columns = dict(
+        (name, qn(model._meta.get_field(
+            model.transcript_rel if name == 'transcript' else name).column))
+        for name in FIELDS)
+    columns['table'] = qn(model._meta.db_table)
+    return columns
+
+
+def related_tags(transcript, limit=None, tag_models=None):
+    """Return a list of tags, of any of tag_models (by default all tag
+       models), related to transcript by colloquialism, excluding its own.
+       Tags are ordered by model, transcript and start, and limited to the
+       first limit tags if given. Only the tag fields are loaded; the
+       transcript and colloquialism are not. """
+
+    own_model = transcript.get_tag_cls()
+    if tag_models is None:
+        tag_models = get_tag_models()
+    tag_models = list(tag_models)
+    if not tag_models:
+        return []
+
+    connection = connections[
+        get_read_database() or router.db_for_read(own_model)]
+    own = get_columns(own_model, connection)
+    colloquialisms = COLLOQUIALISMS_SQL % own
+
+    selects = []
+    params = []
+    for model in tag_models:
+        columns = get_columns(model, connection)
+        columns['colloquialisms'] = colloquialisms
+        sql = SELECT_SQL % columns
+        params.extend([model._meta.label_lower, transcript.pk])
+        if model is own_model:
+            sql += ' AND %(transcript)s <> %%s' % columns
+            params.append(transcript.pk)
+        selects.append(sql)
+
+    sql = ' UNION ALL '.join(selects) + ORDER_SQL
+    if limit is not None:
+        sql += ' LIMIT %s'
+        params.append(limit)
+
+    models = dict((model._meta.label_lower, model) for model in tag_models)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    return [load_tag(models[row[0]], row[1:], connection) for row in rows]
+
+
+def load_tag(model, row, connection):
+    """Return an instance of model from row, values of FIELDS. """
+
+    values = {}
+    for name, value in zip(FIELDS, row):
+        field = model._meta.get_field(
+            model.transcript_rel if name == 'transcript' else name)
+        # e.g. durations are stored as microseconds on sqlite
+        for converter in field.get_db_converters(connection):
+            value = converter(value, field, connection, {})
+        values[field.attname] = value
+
+    # from_db takes values in field order
+    attnames = [field.attname for field in model._meta.concrete_fields
+                if field.attname in values]
+    return model.from_db(connection.alias, attnames,
+                         [values[attname] for attname in attnames])
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""Re-normalisation of colloquialism values, after changing
+   core.normalise_value.
+
+   Colloquialisms are processed in chunks by primary key, each in its own
+   transaction, so a large table can be re-normalised incrementally and
+   the job resumed from the last chunk (see the renormalise_colloquialisms
+   command). Colloquialisms whose new normalised values collide, i.e.
+   share a language, type and normalised value, are merged into the one
+   with the lowest primary key: their tags are repointed to it in bulk,
+   its occurrence counters recounted and the similarity index of the
+   affected transcripts updated.
+"""
+from __future__ import unicode_literals
+
+from collections import defaultdict, namedtuple
+
+from django.db import connections, models, transaction
+
+from .models import Colloquialism, ColloquialismStats
+from .registry import get_tag_models
+
+
+# colloquialisms merged into survivor, a Colloquialism instance
+Merge = namedtuple('Merge', ('survivor', 'merged'))
+
+# the result of renormalise_chunk: last_pk is None if there were no
+# colloquialisms left
+Chunk = namedtuple('Chunk', ('last_pk', 'count', 'changed', 'merges'))
+
+# prefix for temporary normalised values, so rows can swap values
+TEMPORARY_PREFIX = '\x1f'
+
+# maximum number of rows per UPDATE ... CASE statement
+UPDATE_BATCH_SIZE = 200
+
+
+def batches(items, size):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def normalise(colloquialism):
+    return Colloquialism.normalise_value(colloquialism.value,
+                                         colloquialism.type)
+
+
+def set_normalised_values(values):
+    """Update normalised_value from values, a dict by pk, with one query
+       per UPDATE_BATCH_SIZE rows. """
+
+    for batch in batches(values.items(), UPDATE_BATCH_SIZE):
+        Colloquialism.objects.filter(pk__in=[pk for pk, value in batch]) \
+            .update(normalised_value=models.Case(
+                *[models.When(pk=pk, then=models.Value(value))
+                  for pk, value in batch],
+                output_field=models.CharField()))
+
+
+def find_holders(values, exclude):
+    """Return the colloquialisms, other than those with pks in exclude,
+       whose current normalised values are in values. """
+
+    values = list(values)
+    batch_size = max(connections[Colloquialism.objects.db].ops
+                     .bulk_batch_size(['normalised_value'], values), 1)
+    return [colloquialism
+            for batch in batches(values, batch_size)
+            for colloquialism in Colloquialism.objects.filter(
+                normalised_value__in=batch)
+            if colloquialism.pk not in exclude]
+
+
+def merge(survivor, merged):
+    """Repoint the tags of merged colloquialisms to survivor, keeping the
+       first meaning found and the latest last_seen, and delete them. The
+       similarity index of the transcripts of those tags is updated. """
+
+    pks = [colloquialism.pk for colloquialism in merged]
+    transcripts = []
+    for model in get_tag_models():
+        tags = model.objects.filter(colloquialism__in=pks)
+        transcript_cls = model._meta.get_field(model.transcript_rel) \
+            .related_model
+        transcripts.extend(transcript_cls._default_manager.filter(
+            pk__in=tags.values(model.transcript_rel)))
+        tags.update(colloquialism=survivor.pk)
+
+    if not survivor.meaning:
+        meanings = [c.meaning for c in merged if c.meaning]
+        if meanings:
+            survivor.meaning = meanings[0]
+            Colloquialism.objects.filter(pk=survivor.pk) \
+                .update(meaning=survivor.meaning)
+
+    last_seen = ColloquialismStats.objects.filter(
+        colloquialism__in=pks + [survivor.pk]) \
+        .aggregate(last_seen=models.Max('last_seen'))['last_seen']
+
+    Colloquialism.objects.filter(pk__in=pks).delete()
+    ColloquialismStats.objects.recount([survivor.pk])
+    ColloquialismStats.objects.filter(colloquialism=survivor.pk) \
+        .update(last_seen=last_seen)
+
+    # their sets of colloquialisms have changed
+    for transcript in transcripts:
+        transcript.index_similarity()
+
+
+def renormalise_chunk(after_pk=None, chunk_size=500, dry_run=False):
+    """Re-normalise up to chunk_size colloquialisms with pk above after_pk,
+       in one transaction, rolled back if dry_run. Returns a Chunk.
+
+       Other colloquialisms holding the chunk's new normalised values are
+       re-normalised with it, since they either collide with it or must
+       move first.
+    """
+
+    qs = Colloquialism.objects.order_by('pk')
+    if after_pk is not None:
+        qs = qs.filter(pk__gt=after_pk)
+    chunk = list(qs[:chunk_size])
+    if not chunk:
+        return Chunk(None, 0, 0, [])
+
+    with transaction.atomic():
+        rows = dict((c.pk, c) for c in chunk)
+        new = dict((c.pk, normalise(c)) for c in chunk)
+
+        lookup = set(new[c.pk] for c in chunk
+                     if new[c.pk] != c.normalised_value)
+        while lookup:
+            holders = find_holders(lookup, rows)
+            lookup = set()
+            for colloquialism in holders:
+                rows[colloquialism.pk] = colloquialism
+                new[colloquialism.pk] = normalise(colloquialism)
+                if new[colloquialism.pk] != colloquialism.normalised_value:
+                    lookup.add(new[colloquialism.pk])
+
+        groups = defaultdict(list)
+        for pk in sorted(rows):
+            colloquialism = rows[pk]
+            groups[(colloquialism.language, colloquialism.type,
+                    new[pk])].append(colloquialism)
+
+        merges = [Merge(group[0], group[1:])
+                  for key, group in sorted(groups.items())
+                  if len(group) > 1]
+        merged_pks = set(c.pk for m in merges for c in m.merged)
+
+        # merge first, so the survivors' values are free
+        for survivor, merged in merges:
+            merge(survivor, merged)
+
+        changed = dict((pk, value) for pk, value in new.items()
+                       if pk not in merged_pks and
+                       value != rows[pk].normalised_value)
+        if set(changed.values()) & set(
+                rows[pk].normalised_value for pk in changed):
+            # some rows take others' current values
+            set_normalised_values(dict(
+                (pk, '%s%s' % (TEMPORARY_PREFIX, pk)) for pk in changed))
+        set_normalised_values(changed)
+
+        for pk, value in changed.items():
+            rows[pk].normalised_value = value
+
+        if dry_run:
+            transaction.set_rollback(True)
+        elif changed or merges:
+            # updates don't send post_save
+            from .vocabulary import invalidate
+            invalidate()
+
+    return Chunk(chunk[-1].pk, len(chunk), len(changed), merges)
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""Incremental re-tagging for newly added or enabled colloquialisms.
+
+   Rather than auto-tagging and re-parsing every transcript, the inverted
+   index (see index.py) is used to find the cues in which the colloquialism
+   is spoken, or starts and continues into the next cue, and only those
+   cues and their neighbours are tagged and parsed. They're tagged with the
+   transcript's whole auto-tag vocabulary, as by a full parse, so longer
+   phrases are preferred in the same way. Transcripts must have been
+   indexed, i.e. parsed with save=True, to be found.
+"""
+from __future__ import unicode_literals
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.apps import apps
+from django.db import transaction
+
+from .models import Colloquialism, TokenPostings
+from .parser import iter_tags
+
+
+def find_cues(colloquialism):
+    """Return a dict of transcript model label to a dict of transcript pk
+       to the set of cue starts (in milliseconds) at which the
+       colloquialism's value starts. """
+
+    cues = defaultdict(lambda: defaultdict(set))
+    for match in TokenPostings.objects.search(
+            colloquialism.value, language=colloquialism.language,
+            span_cues=True):
+        start = int(match.start.total_seconds() * 1000)
+        cues[match.transcript_type][match.transcript_id].add(start)
+    return cues
+
+
+def get_runs(indexes, count):
+    """Return lists of consecutive indexes, of the given indexes and their
+       neighbours, below count. """
+
+    window = sorted(set(
+        i + offset for i in indexes for offset in (-1, 0, 1)
+        if 0 <= i + offset < count))
+    runs = []
+    for i in window:
+        if runs and runs[-1][-1] == i - 1:
+            runs[-1].append(i)
+        else:
+            runs.append([i])
+    return runs
+
+
+def retag_transcript(transcript, colloquialism, starts):
+    """Replace the colloquialism's tags in the cues of transcript starting
+       at starts (in milliseconds), and their neighbours. Returns the
+       number of tags created. """
+
+    from pyvtt import WebVTTFile
+
+    from .vocabulary import get_matcher
+
+    tag_cls = transcript.get_tag_cls()
+    matcher = get_matcher(transcript.get_language(),
+                          transcript.auto_tag_types)
+    items = list(transcript.get_webvttfile())
+
+    runs = get_runs([i for i, item in enumerate(items)
+                     if item.start.ordinal in starts], len(items))
+    tags = []
+    for run in runs:
+        cues = [items[i] for i in run]
+        for item, text in zip(cues, matcher.tag_cues(
+                [item.text for item in cues])):
+            item.text = text
+
+        for record in iter_tags(WebVTTFile(cues)):
+            if record.type != colloquialism.type or \
+                    Colloquialism.normalise_value(record.value, record.type) \
+                    != colloquialism.normalised_value:
+                continue
+
+            tag = tag_cls(colloquialism=colloquialism, start=record.start,
+                          start_exact=record.start_exact)
+            setattr(tag, tag_cls.transcript_rel, transcript)
+            tags.append(tag)
+
+    window = [timedelta(milliseconds=items[i].start.ordinal)
+              for run in runs for i in run]
+    with transaction.atomic():
+        before = transcript.get_tags().filter(
+            colloquialism=colloquialism).get_counts()
+        deleted, __ = transcript.get_tags().filter(
+            colloquialism=colloquialism, start__in=window).delete()
+        tag_cls.objects.bulk_create(tags)
+        after = before.get(colloquialism.pk, 0) - deleted + len(tags)
+        transcript.update_stats(before, {colloquialism.pk: after})
+        if bool(before) != bool(after):
+            # the transcript's set of colloquialisms has changed
+            transcript.index_similarity()
+
+    return len(tags)
+
+
+def retag_colloquialism(colloquialism):
+    """Tag occurrences of colloquialism in all indexed transcripts, if it
+       may be used to auto-tag. Returns the number of tags created. """
+
+    # as the auto-tag vocabulary of its language
+    if not Colloquialism.objects.filter(language=colloquialism.language) \
+            .filter_auto().filter(pk=colloquialism.pk).exists():
+        return 0
+
+    created = 0
+    for label, transcripts in find_cues(colloquialism).items():
+        model = apps.get_model(label)
+        for transcript in model.objects.filter(pk__in=transcripts.keys()):
+            created += retag_transcript(
+                transcript, colloquialism, transcripts[transcript.pk])
+
+    return created
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""Read replica routing for the read-heavy query paths.
+
+   Set COLLOQUIAL_READ_DATABASE to a database alias, e.g. a replica, to
+   send the tags view's queries and other for_read() querysets there
+   rather than to the primary. Writes, and the reads they depend on, are
+   unaffected.
+
+   A replica may lag behind the primary, so code which reads its own
+   writes, e.g. the tags of a transcript parsed earlier in the same
+   request, should do so within a primary() block. Nothing is pinned to
+   the primary implicitly.
+"""
+from __future__ import unicode_literals
+
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+
+_local = threading.local()
+
+
+def get_read_database():
+    """Return the database alias for reads, or None to use the default
+       routing, i.e. when COLLOQUIAL_READ_DATABASE isn't set or within a
+       primary() block. """
+
+    alias = getattr(settings, 'COLLOQUIAL_READ_DATABASE', None)
+    if alias and not getattr(_local, 'primary', 0):
+        return alias
+    return None
+
+
+@contextmanager
+def primary():
+    """Send for_read() queries in the current thread to the primary within
+       the block. Blocks may be nested. """
+
+    _local.primary = getattr(_local, 'primary', 0) + 1
+    try:
+        yield
+    finally:
+        _local.primary -= 1
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import transaction
+from django.dispatch import Signal
+
+from .instrumentation import MetricsSink
+
+
+# sent with name, seconds and tags for each instrumented stage
+stage_timed = Signal(providing_args=['name', 'seconds', 'tags'])
+
+# sent with name, value and tags for each instrumented counter
+counted = Signal(providing_args=['name', 'value', 'tags'])
+
+
+def clear_transcript_index(sender, instance, **kwargs):
+    """post_delete receiver removing a deleted transcript from the inverted
+       index. """
+
+    instance.clear_index()
+
+
+def clear_transcript_similarity(sender, instance, **kwargs):
+    """post_delete receiver removing a deleted transcript from the
+       similarity index. """
+
+    instance.clear_similarity()
+
+
+def clear_transcript_stats(sender, instance, **kwargs):
+    """pre_delete receiver removing a transcript's tags, which are about to
+       be deleted with it, from ColloquialismStats. """
+
+    instance.update_stats(instance.get_tags().get_counts(), {})
+
+
+def check_retag(sender, instance, **kwargs):
+    """pre_save receiver for Colloquialism, noting whether the save adds or
+       enables an auto-taggable colloquialism. """
+
+    instance._retag = instance.allow_auto_tag and (
+        instance.pk is None or not sender.objects.filter(
+            pk=instance.pk, allow_auto_tag=True).exists())
+
+
+def retag_on_save(sender, instance, **kwargs):
+    """post_save receiver for Colloquialism, tagging its occurrences in
+       indexed transcripts once the save is committed. """
+
+    from .retag import retag_colloquialism
+
+    if getattr(instance, '_retag', False):
+        instance._retag = False
+        transaction.on_commit(lambda: retag_colloquialism(instance))
+
+
+def retag_created(keys):
+    """As retag_on_save, for colloquialisms created in bulk, which doesn't
+       send post_save. keys should be their (language, type,
+       normalised_value) tuples. Does nothing unless
+       COLLOQUIAL_RETAG_ON_SAVE is set. """
+
+    from .models import Colloquialism
+    from .retag import retag_colloquialism
+    from .vocabulary import invalidate
+
+    if not keys or not getattr(settings, 'COLLOQUIAL_RETAG_ON_SAVE', False):
+        return
+
+    def retag():
+        # retagging uses the vocabulary, which must include them
+        invalidate()
+        for language, type, normalised_value in keys:
+            try:
+                colloquialism = Colloquialism.objects.get(
+                    language=language, type=type,
+                    normalised_value=normalised_value)
+            except Colloquialism.DoesNotExist:
+                continue
+            retag_colloquialism(colloquialism)
+
+    transaction.on_commit(retag)
+
+
+class SignalSink(MetricsSink):
+    """Metrics sink which sends stage_timed and counted signals, for
+       receivers to forward to a metrics pipeline. """
+
+    def timing(self, name, seconds, tags):
+        stage_timed.send(sender=self.__class__, name=name, seconds=seconds,
+                         tags=tags)
+
+    def count(self, name, value, tags):
+        counted.send(sender=self.__class__, name=name, value=value,
+                     tags=tags)
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""Cache of tags view payloads (see views.get_tags_data), keyed by a
+   fingerprint of the transcript's tags and related tags, so a payload is
+   rebuilt only when they change.
+
+   Set COLLOQUIAL_TAGS_CACHE to the alias of a configured Django cache to
+   enable it. The warm_tags_cache command fills it ahead of visitors, e.g.
+   after a bulk re-parse, or writes the payloads as static JSON files.
+
+   The fingerprint is built from aggregates over the tag tables: the
+   number and highest id of the transcript's tags and related tags, and
+   when its colloquialisms were last updated. Changes to the details of
+   related transcripts (to_json) aren't detected; rebuild everything with
+   warm_tags_cache --all after changing those.
+"""
+from __future__ import unicode_literals
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import models
+
+from .registry import get_tag_models
+
+
+KEY_PREFIX = 'colloquial:tags:'
+
+# payloads are cached indefinitely, since the key changes with the tags
+TIMEOUT = None
+
+
+def get_cache():
+    alias = getattr(settings, 'COLLOQUIAL_TAGS_CACHE', None)
+    return caches[alias] if alias else None
+
+
+def get_fingerprint(item, all_collections=False, related_limit=None):
+    """Return a hex digest which changes when the tags view payload of item
+       may have changed. Takes one query for item's own tags and one for
+       each tag model searched for related tags. """
+
+    own = item.get_tags().for_read().aggregate(
+        count=models.Count('pk'), last=models.Max('pk'),
+        updated=models.Max('colloquialism__updated'))
+    parts = [item._meta.label_lower, item.pk, all_collections, related_limit,
+             own['count'], own['last'], own['updated']]
+
+    if own['count']:
+        own_model = item.get_tag_cls()
+        tag_models = get_tag_models() if all_collections else [own_model]
+        for model in tag_models:
+            if model is own_model:
+                related = item.related_tags()
+            else:
+                related = model.objects.filter(
+                    colloquialism__in=item.related_colloquialisms())
+            related = related.for_read().aggregate(
+                count=models.Count('pk'), last=models.Max('pk'))
+            parts.extend([model._meta.label_lower, related['count'],
+                          related['last']])
+
+    return hashlib.md5(
+        '|'.join('%s' % part for part in parts).encode('utf-8')).hexdigest()
+
+
+def get_key(item, fingerprint):
+    return '%s%s:%s:%s' % (KEY_PREFIX, item._meta.label_lower, item.pk,
+                           fingerprint)
+
+
+def get_tags_data(item, all_collections=False, related_limit=None,
+                  cache=None):
+    """As views.get_tags_data, using cache (by default the configured
+       cache) if any. """
+
+    from .views import get_tags_data
+
+    if cache is None:
+        cache = get_cache()
+    if cache is None:
+        return get_tags_data(item, all_collections, related_limit)
+
+    key = get_key(item, get_fingerprint(item, all_collections, related_limit))
+    data = cache.get(key)
+    if data is None:
+        data = get_tags_data(item, all_collections, related_limit)
+        cache.set(key, data, TIMEOUT)
+    return data
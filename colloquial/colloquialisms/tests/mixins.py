@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import shutil
+import tempfile
+
+from django.test import override_settings
+
+
+class MediaRootMixin(object):
+    """Test case mixin storing files in a temporary MEDIA_ROOT, which is
+       removed after each test. Subclasses overriding setUp or tearDown
+       must call super(). """
+
+    def setUp(self):
+        super(MediaRootMixin, self).setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.media_root_override = override_settings(
+            MEDIA_ROOT=self.media_root)
+        self.media_root_override.enable()
+
+    def tearDown(self):
+        self.media_root_override.disable()
+        shutil.rmtree(self.media_root)
+        super(MediaRootMixin, self).tearDown()
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import json
+
+from django.test import TestCase, RequestFactory
+
+from .. import autocomplete as autocomplete_module
+from ..autocomplete import PrefixTrie, complete
+from ..models import Colloquialism
+from ..views import autocomplete
+from ..vocabulary import invalidate
+
+
+class PrefixTrieTestCase(TestCase):
+    def test_complete(self):
+        trie = PrefixTrie((key, key.upper()) for key in (
+            'te rārawa', 'te', 'tipene', 'te arawa', 'hohepa'))
+
+        self.assertEqual(len(trie), 5)
+        self.assertEqual(trie.complete('t'),
+                         ['TE', 'TE ARAWA', 'TE RĀRAWA', 'TIPENE'])
+        self.assertEqual(trie.complete('te '), ['TE ARAWA', 'TE RĀRAWA'])
+        self.assertEqual(trie.complete('t', 2), ['TE', 'TE ARAWA'])
+        self.assertEqual(trie.complete('x'), [])
+        self.assertEqual(len(trie.complete('')), 5)
+
+
+class AutocompleteTestCase(TestCase):
+    def setUp(self):
+        invalidate()
+        for type, value, language in (
+                ('type_1', 'Te Rārawa', 'en'),
+                ('type_2', 'Te Arawa', 'en'),
+                ('type_no_auto', 'Te Aupōuri', 'en'),
+                ('type_2', 'Tūhoe', 'en'),
+                ('type_1', 'Te Atiawa', 'mi')):
+            Colloquialism.objects.create(type=type, value=value,
+                                         language=language)
+
+    def values(self, results):
+        return [info['value'] for info in results]
+
+    def test_complete(self):
+        self.assertEqual(self.values(complete('te', 'en')),
+                         ['Te Arawa', 'Te Aupōuri', 'Te Rārawa'])
+        self.assertEqual(self.values(complete('TE A', 'en')),
+                         ['Te Arawa', 'Te Aupōuri'])
+        self.assertEqual(self.values(complete('te', 'en', limit=1)),
+                         ['Te Arawa'])
+        self.assertEqual(
+            self.values(complete('t', 'en', types=['type_1', 'type_2'])),
+            ['Te Arawa', 'Te Rārawa', 'Tūhoe'])
+        self.assertEqual(self.values(complete('te', 'mi')), ['Te Atiawa'])
+        self.assertEqual(complete('te', 'de'), [])
+
+    def test_no_queries(self):
+        complete('te', 'en')
+        with self.assertNumQueries(0):
+            complete('tū', 'en')
+
+    def test_cleared_concurrently(self):
+        class ClearedDict(dict):
+            # as if another thread found a new version as soon as the tries
+            # are stored
+            def __setitem__(self, key, value):
+                super(ClearedDict, self).__setitem__(key, value)
+                self.clear()
+
+        tries = autocomplete_module._tries
+        autocomplete_module._tries = ClearedDict()
+        try:
+            self.assertEqual(self.values(complete('tū', 'en')), ['Tūhoe'])
+        finally:
+            autocomplete_module._tries = tries
+
+    def test_invalidate(self):
+        self.assertEqual(self.values(complete('ngā', 'en')), [])
+        Colloquialism.objects.create(type='type_1', value='Ngāpuhi',
+                                     language='en')
+        self.assertEqual(self.values(complete('ngā', 'en')), ['Ngāpuhi'])
+
+    def test_view(self):
+        factory = RequestFactory()
+
+        response = autocomplete(factory.get('/', {
+            'q': 'te', 'language': 'en', 'type': 'type_2'}))
+        results = json.loads(response.content.decode('utf-8'))['results']
+        self.assertEqual(results, [{
+            'id': Colloquialism.objects.get(value='Te Arawa').pk,
+            'type': 'type_2',
+            'value': 'Te Arawa',
+            'normalised_value': 'te arawa',
+        }])
+
+        response = autocomplete(factory.get('/', {'q': 'te'}))
+        self.assertEqual(response.status_code, 400)
+        response = autocomplete(factory.get('/', {
+            'q': 'te', 'language': 'en', 'limit': 'x'}))
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import os
+import subprocess
+import sys
+from datetime import timedelta
+
+from django.test import SimpleTestCase
+
+from ..core import auto_tag, parse
+from .test_parser import file_content_plain, file_content_tagged, \
+    file_content_span_cues_plain, first_item_tags, second_item_tags, \
+    process_tag_list
+
+
+IMPORT_CHECK = """
+import sys
+import colloquial.colloquialisms.core
+assert 'django' not in sys.modules, 'django imported'
+assert 'pyvtt' not in sys.modules, 'pyvtt imported'
+"""
+
+
+class CoreTestCase(SimpleTestCase):
+    vocabulary = process_tag_list(first_item_tags + second_item_tags)
+
+    def test_import_footprint(self):
+        root = os.path.dirname(os.path.dirname(os.path.dirname(
+            os.path.dirname(os.path.abspath(__file__)))))
+        env = dict(os.environ)
+        env.pop('DJANGO_SETTINGS_MODULE', None)
+        subprocess.check_call([sys.executable, '-c', IMPORT_CHECK],
+                              cwd=root, env=env)
+
+    def test_auto_tag(self):
+        self.assertEqual(
+            auto_tag(file_content_plain.encode('utf-8'),
+                     self.vocabulary).strip(),
+            file_content_tagged.strip())
+
+    def test_parse(self):
+        tags, errors = parse(file_content_tagged.encode('utf-8'), 'mi',
+                             valid_types=('tangata', 'kainga'))
+
+        self.assertEqual([(t['type'], t['normalised_value'], t['start'])
+                          for t in tags], [
+            ('tangata', 'hohepa tipene', timedelta(milliseconds=92)),
+            ('kainga', 'panguru', timedelta(milliseconds=10681)),
+        ])
+        self.assertEqual(len(errors), 1)
+
+    def test_parse_with_vocabulary(self):
+        tags, errors = parse(file_content_span_cues_plain.encode('utf-8'),
+                             'mi', self.vocabulary)
+
+        self.assertEqual([(t['value'], t['language']) for t in tags], [
+            ('Panguru', 'mi'),
+            ('Hohepa Tipene', 'mi'),
+            ('Te Rārawa', 'mi'),
+        ])
+        self.assertEqual(errors, [])
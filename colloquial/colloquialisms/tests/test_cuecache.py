@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import hashlib
+import os
+from StringIO import StringIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from ..cuecache import serialise, deserialise
+from ..models import Colloquialism, TokenPostings
+from ..parser import get_webvttfile
+from ..vocabulary import invalidate
+from ...transcripts.models import Transcript
+from .mixins import MediaRootMixin
+from .test_parser import file_content_tagged, file_content_span_cues
+
+
+@override_settings(COLLOQUIAL_CUE_CACHE='default')
+class CueCacheTestCase(MediaRootMixin, TestCase):
+    def setUp(self):
+        super(CueCacheTestCase, self).setUp()
+
+        self.content = file_content_tagged.encode('utf-8')
+        self.transcript = Transcript.objects.create(language='en')
+        self.transcript.transcript_file.save(
+            'test.vtt', ContentFile(self.content))
+
+    def tearDown(self):
+        cache.clear()
+        super(CueCacheTestCase, self).tearDown()
+
+    def test_serialise(self):
+        for content in (file_content_tagged, file_content_span_cues):
+            webvttfile = get_webvttfile(StringIO(content))
+            original, restored = StringIO(), StringIO()
+            webvttfile.write_into(original, include_indexes=True)
+            deserialise(serialise(webvttfile)).write_into(
+                restored, include_indexes=True)
+
+            self.assertEqual(restored.getvalue(), original.getvalue())
+
+    def test_hash(self):
+        self.assertEqual(self.transcript.transcript_hash,
+                         hashlib.sha256(self.content).hexdigest())
+
+        self.transcript.transcript_file.delete()
+        self.assertEqual(self.transcript.transcript_hash, '')
+
+    def test_cached(self):
+        first = self.transcript.get_webvttfile()
+
+        # remove the file from storage; a fresh instance still gets the
+        # cached cues
+        self.transcript.get_transcript_file().storage.delete(
+            self.transcript.get_transcript_file().name)
+        second = Transcript.objects.get(pk=self.transcript.pk) \
+            .get_webvttfile()
+
+        self.assertIsNot(first, second)
+        self.assertEqual([(i.start, i.end, i.text) for i in first],
+                         [(i.start, i.end, i.text) for i in second])
+
+    @override_settings(COLLOQUIAL_CUE_CACHE=None)
+    def test_disabled(self):
+        self.transcript.get_webvttfile()
+        self.transcript.get_transcript_file().storage.delete(
+            self.transcript.get_transcript_file().name)
+
+        with self.assertRaises(IOError):
+            Transcript.objects.get(pk=self.transcript.pk).get_webvttfile()
+
+    def test_content_addressed(self):
+        other = Transcript.objects.create(language='en')
+        other.transcript_file.save('other.VTT', ContentFile(self.content))
+
+        # identical content is stored once, named by its hash
+        name = self.transcript.transcript_file.name
+        self.assertEqual(
+            name, 'transcripts/%s.vtt' % self.transcript.transcript_hash)
+        self.assertEqual(other.transcript_file.name, name)
+        storage = other.transcript_file.storage
+        self.assertEqual(storage.listdir('transcripts')[1],
+                         [os.path.basename(name)])
+
+        # and deleted with the last transcript using it
+        other.transcript_file.delete()
+        self.assertFalse(other.transcript_file)
+        self.assertTrue(storage.exists(name))
+        self.transcript.transcript_file.delete()
+        self.assertFalse(storage.exists(name))
+
+    def test_delete_race(self):
+        other = Transcript.objects.create(language='en')
+        storage = other.transcript_file.storage
+        name = self.transcript.transcript_file.name
+        save = other.save
+
+        # the last transcript using the file deletes it after store()
+        # found it, before the other is saved
+        def delete_and_save(*args, **kwargs):
+            del other.save
+            self.transcript.transcript_file.delete()
+            save(*args, **kwargs)
+
+        other.save = delete_and_save
+        other.transcript_file.save('other.vtt', ContentFile(self.content))
+        self.assertEqual(other.transcript_file.name, name)
+        self.assertTrue(storage.exists(name))
+        with storage.open(name) as f:
+            self.assertEqual(f.read(), self.content)
+
+    def test_store_race(self):
+        field = Transcript._meta.get_field('transcript_file')
+        name = self.transcript.transcript_file.name
+
+        # identical content is stored by another thread after the check
+        checks = []
+
+        def exists(name):
+            checks.append(name)
+            return len(checks) > 1 and \
+                os.path.exists(field.storage.path(name))
+
+        field.storage.exists = exists
+        try:
+            self.assertEqual(
+                field.store(None, 'other.vtt', ContentFile(self.content)),
+                name)
+        finally:
+            del field.storage.exists
+        self.assertEqual(field.storage.listdir('transcripts')[1],
+                         [os.path.basename(name)])
+
+    @override_settings(COLLOQUIAL_TYPES=(
+        ('tangata', 'tangata', True),
+        ('iwihapu', 'iwihapu', True),
+        ('kainga', 'kainga', False),
+    ))
+    def test_cached_results(self):
+        invalidate()
+        # the first parse creates colloquialisms, changing the vocabulary
+        self.transcript.parse()
+        self.assertEqual(self.transcript.parse(save=True)[0], 3)
+
+        def get_webvttfile():
+            raise AssertionError('transcript read')
+
+        # an identical upload isn't read, auto-tagged or parsed again
+        other = Transcript.objects.create(language='en')
+        other.transcript_file.save('other.vtt', ContentFile(self.content))
+        other.get_webvttfile = get_webvttfile
+        self.assertEqual(
+            other.get_tagged_transcript().getvalue(),
+            self.transcript.get_tagged_transcript().getvalue())
+        self.assertEqual(other.parse(save=True)[0], 3)
+        self.assertEqual(
+            [(t.colloquialism, t.start_exact) for t in other.get_tags()],
+            [(t.colloquialism, t.start_exact)
+             for t in self.transcript.get_tags()])
+        self.assertEqual(
+            TokenPostings.objects.for_transcript(other).count(),
+            TokenPostings.objects.for_transcript(self.transcript).count())
+
+        # nor when the vocabulary of another language changes
+        Colloquialism.objects.create(
+            type='tangata', value='kaumatua', language='fr')
+        self.assertEqual(len(other.parse()[0]), 3)
+
+        # until its own vocabulary changes
+        Colloquialism.objects.create(
+            type='tangata', value='kaumatua', language='en')
+        with self.assertRaises(AssertionError):
+            other.parse()
+        del other.get_webvttfile
+        self.assertEqual(len(other.parse()[0]), 4)
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils.six import StringIO
+
+from ..autocomplete import complete
+from ..models import Colloquialism
+from ..vocabulary import invalidate
+
+
+CSV_CONTENT = """﻿Value,type,meaning,allow_auto_tag
+Te Rārawa,type_1,An iwi,
+te rārawa,type_1,Duplicate,
+Hohepa Tipene,type_2,,no
+Te Arawa,type_2,,1
+,type_1,,
+Ngāti Kahu,bad_type,,
+"""
+
+
+class ImportColloquialismsTestCase(TestCase):
+    def setUp(self):
+        invalidate()
+        self.directory = tempfile.mkdtemp()
+        Colloquialism.objects.create(type='type_2', value='TE ARAWA',
+                                     language='en', meaning='Existing')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'wb') as f:
+            f.write(content.encode('utf-8'))
+        return path
+
+    def import_file(self, path, **options):
+        stdout, stderr = StringIO(), StringIO()
+        call_command('import_colloquialisms', path, stdout=stdout,
+                     stderr=stderr, **options)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_csv(self):
+        path = self.write('vocabulary.csv', CSV_CONTENT)
+        complete('te', 'en')
+
+        with self.assertNumQueries(4):
+            stdout, stderr = self.import_file(path, chunk_size=4,
+                                              language='en')
+
+        self.assertIn('6 rows read, 2 colloquialisms created, '
+                      '2 skipped as existing or duplicate, 2 invalid',
+                      stdout)
+        self.assertEqual(stderr.splitlines(), [
+            'Line 6: no value',
+            'Line 7: invalid type bad_type',
+        ])
+
+        self.assertEqual(
+            sorted(Colloquialism.objects.values_list(
+                'value', 'normalised_value', 'meaning', 'allow_auto_tag')),
+            [('Hohepa Tipene', 'hohepa tipene', '', False),
+             ('TE ARAWA', 'te arawa', 'Existing', True),
+             ('Te Rārawa', 'te rārawa', 'An iwi', True)])
+
+        # the vocabulary is invalidated
+        self.assertEqual([info['value'] for info in complete('te', 'en')],
+                         ['TE ARAWA', 'Te Rārawa'])
+
+        stdout, stderr = self.import_file(path, language='en')
+        self.assertIn('0 colloquialisms created', stdout)
+
+    def test_jsonl(self):
+        path = self.write('vocabulary.jsonl', '\n'.join([
+            json.dumps({'value': 'Te Rārawa', 'type': 'type_1',
+                        'language': 'fr'}),
+            json.dumps({'value': 'Te Arawa'}),
+            '{',
+            '',
+            json.dumps({'value': 'Tūhoe', 'allow_auto_tag': False}),
+        ]))
+
+        stdout, stderr = self.import_file(path, type='type_2', language='en')
+
+        self.assertIn('4 rows read, 2 colloquialisms created', stdout)
+        self.assertTrue(stderr.startswith('Line 3: '))
+        self.assertEqual(
+            sorted(Colloquialism.objects.values_list(
+                'value', 'type', 'language', 'allow_auto_tag')),
+            [('TE ARAWA', 'type_2', 'en', True),
+             ('Te Rārawa', 'type_1', 'fr', True),
+             ('Tūhoe', 'type_2', 'en', False)])
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from .. import index
+from ..index import encode_postings, decode_postings, index_cues, \
+    match_phrase, match_phrase_spans
+from ..models import TokenPostings
+from ...transcripts.models import Transcript
+from .mixins import MediaRootMixin
+from .test_parser import file_content_tagged
+
+
+class IndexTestCase(SimpleTestCase):
+    def test_postings_round_trip(self):
+        postings = [(0, 0), (0, 5), (92, 1), (10681, 300), (10681000, 2)]
+        encoded = encode_postings(postings)
+
+        self.assertEqual(decode_postings(encoded), postings)
+        self.assertEqual(decode_postings(memoryview(encoded)), postings)
+        # small deltas take a byte each
+        self.assertEqual(len(encode_postings([(0, 0), (5, 1)])), 4)
+
+    def test_index_cues(self):
+        index = index_cues([
+            (0, '<v Rukuwai> Ko <c.tangata>Hohepa Tipene</c> te kaikorero'),
+            (1000, 'Nō hea tērā? Hohepa'),
+        ])
+
+        self.assertEqual(index['hohepa'], [(0, 1), (1000, 3)])
+        self.assertEqual(index['nō'], [(1000, 0)])
+        self.assertNotIn('c', index)
+        self.assertNotIn('rukuwai', index)
+
+    def test_match_phrase(self):
+        index = index_cues([
+            (0, 'Hohepa Tipene, Tipene Hohepa'),
+            (1000, 'Hohepa ki a Tipene'),
+            (2000, 'ko hohepa tipene'),
+        ])
+
+        self.assertEqual(
+            match_phrase([index['hohepa'], index['tipene']]), [0, 2000])
+        self.assertEqual(
+            match_phrase([index['tipene'], index['hohepa']]), [0])
+
+    def test_match_phrase_spans(self):
+        index = index_cues([
+            (0, 'Ko Hohepa'),
+            (1000, 'Tipene tōku ingoa'),
+            (2000, 'Hohepa Tipene'),
+            (3000, 'ko Hohepa'),
+            (4000, 'Kei hea a Tipene?'),
+        ])
+        postings = [index['hohepa'], index['tipene']]
+
+        self.assertEqual(match_phrase(postings), [2000])
+        self.assertEqual(match_phrase_spans(postings), [0, 2000])
+
+
+@override_settings(COLLOQUIAL_TYPES=(
+    ('tangata', 'tangata', True),
+    ('iwihapu', 'iwihapu', True),
+    ('kainga', 'kainga', True),
+))
+class SearchTestCase(MediaRootMixin, TestCase):
+    def setUp(self):
+        super(SearchTestCase, self).setUp()
+
+        self.transcript = Transcript.objects.create(language='en')
+        self.transcript.transcript_file.save(
+            'test.vtt', ContentFile(file_content_tagged.encode('utf-8')))
+
+    def test_search(self):
+        self.transcript.parse(save=True)
+
+        matches = TokenPostings.objects.search('te Rārawa. I tupu')
+        self.assertEqual(matches, [
+            ('transcripts.transcript', self.transcript.pk,
+             timedelta(milliseconds=92)),
+        ])
+        self.assertEqual(len(TokenPostings.objects.search('te')), 1)
+
+        # postings of another transcript model with the same id, without
+        # the rarest token, aren't fetched
+        TokenPostings.objects.create(
+            transcript_type='other.transcript',
+            transcript_id=self.transcript.pk, language='en', token='te',
+            postings=encode_postings([(92, 7)]))
+        decoded = []
+
+        def decode(data):
+            decoded.append(data)
+            return decode_postings(data)
+
+        index.decode_postings = decode
+        try:
+            with self.assertNumQueries(2):
+                self.assertEqual(
+                    len(TokenPostings.objects.search('te Rārawa')), 1)
+        finally:
+            index.decode_postings = decode_postings
+        self.assertEqual(len(decoded), 2)
+        self.assertEqual(TokenPostings.objects.search('Panguru te'), [])
+        self.assertEqual(
+            TokenPostings.objects.search('Panguru', language='mi'), [])
+
+    def test_delete(self):
+        self.transcript.parse(save=True)
+        self.transcript.delete()
+
+        self.assertFalse(TokenPostings.objects.exists())
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils.six import StringIO
+
+from ..cuecache import content_hash
+from ..models import ColloquialismStats
+from ...transcripts.models import Transcript
+from .mixins import MediaRootMixin
+from .test_parser import file_content_tagged
+
+
+@override_settings(COLLOQUIAL_TYPES=(
+    ('tangata', 'tangata', True),
+    ('iwihapu', 'iwihapu', True),
+    ('kainga', 'kainga', False),
+))
+class IngestTranscriptsTestCase(MediaRootMixin, TestCase):
+    def setUp(self):
+        super(IngestTranscriptsTestCase, self).setUp()
+
+        self.directory = tempfile.mkdtemp()
+        self.write('one.vtt', file_content_tagged)
+        self.write('archive/two.VTT', file_content_tagged)
+        self.write('archive/2017/three.vtt', file_content_tagged)
+        self.write('archive/notes.txt', 'Not a transcript')
+        self.write('archive/bad.vtt', 'WEBVTT\n\n00:01.000 --> 00:00.500\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super(IngestTranscriptsTestCase, self).tearDown()
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'wb') as f:
+            f.write(content.encode('utf-8'))
+
+    def ingest(self, *args, **options):
+        stdout, stderr = StringIO(), StringIO()
+        call_command('ingest_transcripts', self.directory, *args,
+                     stdout=stdout, stderr=stderr, **options)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_ingest(self):
+        stdout, stderr = self.ingest(batch_size=2, language='en')
+
+        self.assertIn('3 transcripts created, 1 invalid files', stdout)
+        self.assertIn('bad.vtt: Cue ends before it starts at line 3',
+                      stderr)
+
+        transcripts = Transcript.objects.order_by('title')
+        self.assertEqual([t.title for t in transcripts],
+                         ['one', 'three', 'two'])
+        for transcript in transcripts:
+            self.assertEqual(transcript.language, 'en')
+            self.assertTrue(transcript.transcript_file.name.startswith(
+                'transcripts/'))
+            self.assertEqual(transcript.transcript_hash,
+                             content_hash(transcript.transcript_file))
+            self.assertEqual(transcript.transcript_file.read(),
+                             file_content_tagged.encode('utf-8'))
+            self.assertEqual(transcript.get_tags().count(), 0)
+
+        # identical files are stored once
+        self.assertEqual(
+            len(set(t.transcript_file.name for t in transcripts)), 1)
+
+    def test_parse(self):
+        stdout, stderr = self.ingest('--parse', workers=2)
+
+        self.assertIn('3 transcripts created', stdout)
+        self.assertIn('9 tags parsed', stdout)
+        for transcript in Transcript.objects.all():
+            self.assertEqual(transcript.get_tags().count(), 3)
+        self.assertEqual(ColloquialismStats.objects.get(
+            colloquialism__value='Panguru').transcripts, 3)
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from StringIO import StringIO
+
+from django.db import connections
+from django.test import SimpleTestCase, TestCase
+
+from .. import instrumentation
+from ..instrumentation import MetricsSink
+from ..parser import parse_transcript, auto_tag_file
+from ..signals import SignalSink, stage_timed, counted
+from .test_parser import file_content_tagged, file_content_plain, \
+    first_item_tags, process_tag_list
+
+
+class ListSink(MetricsSink):
+    def __init__(self):
+        self.timings = []
+        self.counts = {}
+
+    def timing(self, name, seconds, tags):
+        self.timings.append(name)
+
+    def count(self, name, value, tags):
+        self.counts[name] = value
+
+
+def parse(content):
+    return parse_transcript(
+        StringIO(content), 'en', ['tangata', 'iwihapu', 'kainga'],
+        lambda **kwargs: kwargs, lambda **kwargs: kwargs['value'])
+
+
+class InstrumentationTestCase(SimpleTestCase):
+    def setUp(self):
+        self.sink = ListSink()
+        instrumentation.add_sink(self.sink)
+
+    def tearDown(self):
+        instrumentation.remove_sink(self.sink)
+
+    def test_disabled(self):
+        instrumentation.remove_sink(self.sink)
+
+        parse(file_content_tagged)
+        self.assertEqual(self.sink.timings, [])
+        self.assertEqual(self.sink.counts, {})
+
+    def test_parse_transcript(self):
+        parse(file_content_tagged)
+
+        self.assertEqual(self.sink.timings, [
+            'parse_transcript.read', 'parse_transcript.tags'])
+        self.assertEqual(self.sink.counts, {
+            'parse_transcript.cues': 3,
+            'parse_transcript.tags': 3,
+            'parse_transcript.errors': 0,
+        })
+
+    def test_auto_tag_file(self):
+        tags = process_tag_list(first_item_tags)
+        auto_tag_file(StringIO(file_content_plain), tags, StringIO())
+
+        self.assertEqual(self.sink.timings, [
+            'auto_tag_file.read', 'auto_tag_file.tag', 'auto_tag_file.write'])
+        # each word and punctuation character of the cues' text is scanned
+        # once
+        self.assertEqual(self.sink.counts, {
+            'auto_tag_file.cues': 3,
+            'auto_tag.tokens': 43,
+        })
+
+    def test_signal_sink(self):
+        received = []
+
+        def receiver(sender, name, **kwargs):
+            received.append(name)
+
+        stage_timed.connect(receiver)
+        counted.connect(receiver)
+        sink = SignalSink()
+        instrumentation.add_sink(sink)
+        try:
+            with instrumentation.stage('test'):
+                instrumentation.count('test.items', 2)
+        finally:
+            instrumentation.remove_sink(sink)
+            stage_timed.disconnect(receiver)
+            counted.disconnect(receiver)
+
+        self.assertEqual(received, ['test.items', 'test'])
+
+
+class QueryCountTestCase(TestCase):
+    multi_db = True
+
+    def setUp(self):
+        self.sink = ListSink()
+        instrumentation.add_sink(self.sink)
+
+    def tearDown(self):
+        instrumentation.remove_sink(self.sink)
+
+    def run_queries(self, alias, count):
+        with connections[alias].cursor() as cursor:
+            for i in range(count):
+                cursor.execute('SELECT 1')
+
+    def test_many_queries(self):
+        # more than the debug query log keeps
+        with instrumentation.stage('test', count_queries=True):
+            self.run_queries('default', 9001)
+        self.assertEqual(self.sink.counts['test.queries'], 9001)
+
+        with instrumentation.stage('test', count_queries=True):
+            self.run_queries('default', 2)
+        self.assertEqual(self.sink.counts['test.queries'], 2)
+
+    def test_replica(self):
+        with instrumentation.stage('test', count_queries=True):
+            self.run_queries('replica', 3)
+            self.run_queries('default', 1)
+        self.assertEqual(self.sink.counts['test.queries'], 4)
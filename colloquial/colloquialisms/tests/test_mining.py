@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import csv
+import os
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils.encoding import force_bytes
+from django.utils.six import StringIO
+
+from ..mining import CandidateCounter, CountMinSketch, count_transcript, \
+    ngrams
+from ..models import Colloquialism
+from ...transcripts.models import Transcript
+from .mixins import MediaRootMixin
+
+
+def make_file(*cues):
+    return 'WEBVTT\n\n%s' % ''.join(
+        '%s\n00:00:%02d.000 --> 00:00:%02d.000\n%s\n\n' % (
+            i, i, i + 1, text)
+        for i, text in enumerate(cues, 1))
+
+
+class MiningTestCase(TestCase):
+    def test_ngrams(self):
+        self.assertEqual(list(ngrams(['a', 'b', 'c'], 2, 3)),
+                         ['a b', 'b c', 'a b c'])
+        self.assertEqual(list(ngrams(['a'], 2, 3)), [])
+
+    def test_count_transcript(self):
+        data = make_file(
+            '<v Rukuwai>Kei te pēhea <c.iwihapu>Te Rārawa</c>?',
+            'Kei te pēhea koe?</v>').encode('utf-8')
+        counts = count_transcript((data, 2, 3))
+        self.assertEqual(counts['kei te'], 2)
+        self.assertEqual(counts['kei te pēhea'], 2)
+        self.assertEqual(counts['pēhea te rārawa'], 1)
+        # n-grams don't span cues, and markup is removed
+        self.assertNotIn('rārawa kei', counts)
+        self.assertNotIn('v rukuwai', counts)
+        self.assertNotIn('rukuwai kei', counts)
+
+    def test_count_min_sketch(self):
+        sketch = CountMinSketch(width=16, depth=3)
+        for i in range(100):
+            sketch.add('key %s' % i, i)
+        # estimates are never less than the true count
+        for i in range(100):
+            self.assertGreaterEqual(sketch['key %s' % i], i)
+        self.assertEqual(CountMinSketch(width=16)['missing'], 0)
+
+    def test_candidate_counter(self):
+        counter = CandidateCounter(min_transcripts=2, max_candidates=2,
+                                   exclude=set(['te reo']))
+        counter.add({'kia ora': 2, 'te reo': 1, 'ka pai': 1})
+        counter.add({'kia ora': 1, 'te reo': 1, 'ka pai': 3})
+        counter.add({'kia ora': 1, 'once': 1})
+        self.assertEqual(counter.count, 3)
+        self.assertEqual(
+            [tuple(c) for c in counter.most_common()],
+            [('kia ora', 3, 4), ('ka pai', 2, 4)])
+        self.assertEqual(
+            [c.phrase for c in counter.most_common(1)], ['kia ora'])
+
+
+class MineColloquialismsTestCase(MediaRootMixin, TestCase):
+    def setUp(self):
+        super(MineColloquialismsTestCase, self).setUp()
+
+        Colloquialism.objects.create(
+            type='type_1', value='Kei te pēhea', language='en')
+        self.create_transcript('en', 'Kia ora, kei te pēhea koe?',
+                               'Ka pai, <c.tangata>Ka pai rawa atu</c>.')
+        self.create_transcript('en', 'Kia ora koutou. Kei te pēhea koe?')
+        self.create_transcript('fr', 'Kia ora koutou. Kia ora koutou.')
+
+    def create_transcript(self, language, *cues):
+        transcript = Transcript.objects.create(language=language)
+        transcript.transcript_file.save(
+            'test.vtt', ContentFile(make_file(*cues).encode('utf-8')))
+
+    def mine(self, **options):
+        out = StringIO()
+        err = StringIO()
+        call_command('mine_colloquialisms', stdout=out, stderr=err,
+                     **options)
+        rows = list(csv.reader(
+            force_bytes(out.getvalue()).splitlines()))
+        return [[value.decode('utf-8') for value in row]
+                for row in rows], err.getvalue()
+
+    def test_mine(self):
+        rows, err = self.mine(language='en', workers=1, type='type_1')
+        self.assertEqual(rows[0], [
+            'value', 'type', 'language', 'meaning', 'allow_auto_tag',
+            'transcripts', 'occurrences'])
+        # kei te pēhea is excluded, but not the phrases containing it
+        self.assertEqual(rows[1], ['kei te', 'type_1', 'en', '', '', '2', '2'])
+        self.assertEqual([row[0] for row in rows[1:]], [
+            'kei te', 'kei te pēhea koe', 'kia ora', 'pēhea koe', 'te pēhea',
+            'te pēhea koe'])
+        self.assertIn('2 transcripts mined, 6 candidates listed', err)
+
+        rows, err = self.mine(language='fr', workers=1, min_words=3,
+                              max_words=3, min_transcripts=1)
+        self.assertEqual(
+            [row[0] for row in rows[1:]],
+            ['kia ora koutou', 'koutou kia ora', 'ora koutou kia'])
+
+    def test_workers(self):
+        path = os.path.join(self.media_root, 'candidates.csv')
+        call_command('mine_colloquialisms', language='en', workers=2,
+                     limit=1, output=path, stdout=StringIO(),
+                     stderr=StringIO())
+        with open(path, 'rb') as f:
+            self.assertEqual(list(csv.reader(f))[1:],
+                             [[b'kei te', b'', b'en', b'', b'', b'2', b'2']])
+
+        # the output can be imported once the type is filled in
+        call_command('import_colloquialisms', path, type='type_1',
+                     stdout=StringIO(), stderr=StringIO())
+        self.assertTrue(Colloquialism.objects.filter(
+            normalised_value='kei te', language='en').exists())
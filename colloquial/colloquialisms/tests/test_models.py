@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
+from datetime import timedelta
+
 from django.test import TestCase, override_settings
 
 from ..models import Colloquialism
@@ -52,3 +54,70 @@ class ModelsTestCase(TestCase):
 
     def test_normalisation(self):
         self.assertEqual(self.col_1.normalised_value, 'colloquialism 1')
+
+    def test_bulk_get_or_create(self):
+        values = {
+            ('en', 'type_1', 'colloquialism 1'): 'COLLOQUIALISM 1',
+            ('en', 'type_1', 'new'): 'New',
+            ('en', 'type_2', 'new'): 'NEW',
+        }
+
+        # one insert and one select
+        with self.assertNumQueries(2):
+            found = Colloquialism.objects.bulk_get_or_create(values)
+
+        self.assertEqual(set(found), set(values))
+        self.assertEqual(found[('en', 'type_1', 'colloquialism 1')],
+                         self.col_1)
+        self.assertEqual(found[('en', 'type_1', 'colloquialism 1')].value,
+                         'Colloquialism 1')
+        self.assertEqual(found[('en', 'type_2', 'new')].value, 'NEW')
+        self.assertIsNotNone(found[('en', 'type_2', 'new')].created)
+
+        # repeating doesn't create duplicates, in batches of any size
+        again = Colloquialism.objects.bulk_get_or_create(values, batch_size=1)
+        self.assertEqual(again, found)
+        self.assertEqual(Colloquialism.objects.count(), 7)
+
+    def test_create_missing(self):
+        # an existing row, e.g. one just created by parse(), is skipped
+        # rather than raising IntegrityError
+        with self.assertNumQueries(2):
+            created = Colloquialism.objects.create_missing([
+                Colloquialism(type='type_1', value='COLLOQUIALISM 1',
+                              language='en'),
+                Colloquialism(type='type_2', value='New', language='en',
+                              meaning='Meaning', allow_auto_tag=False),
+                Colloquialism(type='type_2', value='NEW', language='en')])
+
+        self.assertEqual(len(created), 1)
+        self.assertIsNotNone(created[0].pk)
+        self.assertEqual(
+            (created[0].value, created[0].normalised_value,
+             created[0].meaning, created[0].allow_auto_tag),
+            ('New', 'new', 'Meaning', False))
+        self.assertEqual(Colloquialism.objects.create_missing(
+            [Colloquialism(type='type_2', value='new', language='en')]), [])
+
+
+class TagQuerySetTestCase(TestCase):
+    def setUp(self):
+        from ...transcripts.models import Transcript, Tag
+
+        self.transcript = Transcript.objects.create(title='Transcript')
+        colloquialism = Colloquialism.objects.create(
+            type='type_1', value='Colloquialism')
+        for seconds in range(3):
+            Tag.objects.create(
+                transcript=self.transcript, colloquialism=colloquialism,
+                start=timedelta(seconds=seconds),
+                start_exact=timedelta(seconds=seconds))
+
+        self.tag_cls = Tag
+
+    def test_estimated_count(self):
+        # sqlite has no table statistics, so falls back to an exact count
+        self.assertEqual(self.tag_cls.objects.estimated_count(), 3)
+        self.assertEqual(
+            self.tag_cls.objects.filter(start__gt=timedelta(0))
+                .estimated_count(threshold=0), 2)
@@ -1,12 +1,16 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
+from io import BytesIO
 from StringIO import StringIO
+from datetime import timedelta
+
 from django.test import TestCase, override_settings
 from pyvtt import WebVTTFile
 
 from ..parser import strip_tags, parse_tags, strip_voice_spans, \
-    get_webvttfile, wrap_tag, auto_tag_text, auto_tag_file, parse_transcript
+    get_webvttfile, wrap_tag, auto_tag_text, auto_tag_file, parse_transcript, \
+    iter_tags, TagRecord, validate_webvtt, MAX_TAG_LENGTH
 
 
 test_settings = {
@@ -193,6 +197,62 @@ class ParserTestCase(TestCase):
             (u'Panguru', 681000)
         ])
 
+    def test_iter_tags(self):
+        errors = []
+        tags = iter_tags(StringIO(file_content_span_cues), ('ingoatupuna', ),
+                         errors)
+
+        self.assertEqual(next(tags), TagRecord(
+            'ingoatupuna', 'Ngārama Te Maru', timedelta(0),
+            timedelta(milliseconds=1800)))
+        self.assertEqual([(t.value, t.start.seconds) for t in tags], [
+            ('Matire Rapihana', 0),
+            ('Ngārama Te Maru', 21),
+        ])
+        # two invalid types, and the tag left open at the end of cue 2
+        self.assertEqual(len(errors), 3)
+
+    def test_iter_tags_multi_cue(self):
+        content = '''WEBVTT
+
+1
+00:00:01.000 --> 00:00:02.000
+Ko <c.tangata>Hohepa
+
+2
+00:00:02.000 --> 00:00:03.000
+<v Rukuwai>Te
+
+3
+00:00:03.000 --> 00:00:04.000
+Tipene</c> <c.kainga>Panguru'''
+        errors = []
+        tags = list(iter_tags(StringIO(content), errors=errors))
+
+        self.assertEqual([(t.value, t.start.seconds) for t in tags],
+                         [('Hohepa Te Tipene', 1)])
+        self.assertEqual(len(errors), 1)
+
+    def test_iter_tags_missing_closer(self):
+        cues = ['Ko <c.tangata>Hohepa'] + \
+            ['He kaumatua no roto o Te Rārawa'] * 60 + ['Tipene</c> ']
+        content = 'WEBVTT\n\n%s' % ''.join(
+            '%s\n%02d:00:00.000 --> %02d:00:01.000\n%s\n\n' % (
+                i, i, i, text) for i, text in enumerate(cues))
+        errors = []
+        tags = list(iter_tags(StringIO(content), errors=errors))
+
+        # the tag isn't carried beyond a value of MAX_TAG_LENGTH
+        self.assertEqual(tags, [])
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(errors[0].startswith('Unclosed tag at 0:00:00 - '))
+        self.assertLessEqual(len(errors[0]), MAX_TAG_LENGTH + 30)
+
+        errors = []
+        tags = list(iter_tags(StringIO(content), errors=errors,
+                              max_length=2000))
+        self.assertEqual(len(tags[0].value), 1933)
+
     def test_parse_transcript_span_cues(self):
         file_obj = StringIO(file_content_span_cues)
         valid_types = [t[0] for t in test_settings['COLLOQUIAL_TYPES']]
@@ -351,3 +411,26 @@ class ParserTestCase(TestCase):
         tags = [t[1] for t in parse_tags(text)]
         self.assertEqual(tags, ['ko pēnei atu au ki a koutou',
                                 'nā tōku hē, nā tōku hē rawa'])
+
+    def test_validate_webvtt(self):
+        def validate(content):
+            return validate_webvtt(
+                BytesIO(content.encode('utf-8')).readlines())
+
+        self.assertEqual(validate(file_content_tagged), [])
+        self.assertEqual(validate('\ufeffWEBVTT - title\r\n\r\n'
+                                  '01:00:00.000 --> 01:00:01.000 line:0\r\n'
+                                  'Kia ora\r\n'), [])
+        self.assertEqual(validate(''), ['No cues'])
+        self.assertEqual(validate('WEBVTT\n\nKia ora\n'), ['No cues'])
+        self.assertEqual(validate(file_content_tagged[6:]),
+                         ['Missing WEBVTT header'])
+        self.assertEqual(
+            validate('WEBVTT\n\n00:01.000 --> 00:02\nKia ora\n'
+                     '00:02.000 --> 00:01.000\n'),
+            ['Invalid cue timing at line 3',
+             'Cue ends before it starts at line 5'])
+        self.assertEqual(
+            validate_webvtt([b'WEBVTT\n', b'\n', b'00:01.000 --> 00:02.000\n',
+                             b'Kia \xff\n']),
+            ['Line 4 is not valid UTF-8'])
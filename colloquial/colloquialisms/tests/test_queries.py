@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""Query budgets for the database-backed paths, so that N+1 regressions
+   fail the build. Each test checks the query count stays the same as the
+   number of tags grows. """
+from __future__ import unicode_literals
+
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.db.models.signals import post_init
+from django.test import TestCase
+
+from ..models import Colloquialism
+from ..views import tags_data
+from ...transcripts.models import Transcript, Tag
+from .mixins import MediaRootMixin
+
+
+CUE = """{index}
+00:00:{index:02d}.000 --> 00:00:{index:02d}.500
+Ko <c.type_1>Hohepa Tipene</c> te kaikorero, no <c.type_2>Te Rārawa</c>.
+"""
+
+
+def make_file(cues):
+    content = 'WEBVTT\n\n' + '\n'.join(
+        CUE.format(index=i) for i in range(1, cues + 1))
+    return ContentFile(content.encode('utf-8'))
+
+
+class QueryBudgetTestCase(MediaRootMixin, TestCase):
+    def setUp(self):
+        super(QueryBudgetTestCase, self).setUp()
+
+        self.colloquialisms = [
+            Colloquialism.objects.create(
+                type='type_1', value='Hohepa Tipene', language='en'),
+            Colloquialism.objects.create(
+                type='type_2', value='Te Rārawa', language='en'),
+        ]
+        self.transcript = Transcript.objects.create(language='en')
+        self.others = [Transcript.objects.create(language='en')
+                       for i in range(3)]
+
+    def add_tags(self, transcript, count):
+        Tag.objects.bulk_create(
+            Tag(transcript=transcript,
+                colloquialism=self.colloquialisms[i % 2],
+                start=timedelta(seconds=i), start_exact=timedelta(seconds=i))
+            for i in range(count))
+
+    def test_parse_save(self):
+        # the first parse builds the vocabulary matcher with filter_auto,
+        # later ones reuse it
+        for cues, queries in ((2, 12), (20, 11)):
+            transcript = Transcript.objects.create(language='en')
+            transcript.transcript_file.save('test.vtt', make_file(cues))
+
+            # counting existing tags, inserting and selecting colloquialisms,
+            # inserting tags, updating colloquialism stats, writing the
+            # similarity signature and bands, and replacing the transcript's
+            # index entries
+            with self.assertNumQueries(queries):
+                count, errors = transcript.parse(save=True)
+
+            self.assertEqual(count, cues * 2)
+            self.assertEqual(transcript.get_tags().count(), cues * 2)
+
+    def test_parse_save_batches(self):
+        transcript = Transcript.objects.create(language='en')
+        transcript.transcript_file.save('test.vtt', make_file(20))
+        instances = []
+
+        def receiver(sender, instance, **kwargs):
+            instances.append(instance)
+
+        post_init.connect(receiver, sender=Tag)
+        try:
+            # filter_auto, colloquialisms for the first batch only, one
+            # insert per batch of 15 tags, stats, the similarity signature
+            # and the index entries
+            with self.assertNumQueries(14):
+                count, errors = transcript.parse(save=True, batch_size=15)
+        finally:
+            post_init.disconnect(receiver, sender=Tag)
+
+        self.assertEqual(count, 40)
+        self.assertEqual(instances, [])
+        self.assertEqual(
+            list(transcript.get_tags().values_list('start', flat=True)),
+            [timedelta(seconds=i // 2 + 1) for i in range(40)])
+
+    def test_filter_auto(self):
+        with self.assertNumQueries(1):
+            list(Colloquialism.objects.filter_auto())
+
+    def test_get_counts(self):
+        self.add_tags(self.transcript, 10)
+
+        with self.assertNumQueries(1):
+            self.transcript.get_tags().get_counts()
+
+    def test_related_tags(self):
+        for count in (2, 20):
+            for other in self.others:
+                self.add_tags(other, count)
+            self.add_tags(self.transcript, count)
+
+            with self.assertNumQueries(1):
+                related = list(self.transcript.related_tags()
+                               .with_colloquialism().with_transcript())
+                for tag in related:
+                    tag.colloquialism.type
+                    tag.get_transcript().to_json()
+
+    def test_tags_data(self):
+        for count in (2, 20):
+            for other in self.others:
+                self.add_tags(other, count)
+            self.add_tags(self.transcript, count)
+
+            # counts, occurrence times, own tags and related tags
+            with self.assertNumQueries(4):
+                tags_data(self.transcript)
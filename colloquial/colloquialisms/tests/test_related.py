@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from datetime import timedelta
+
+from django.test import TestCase
+
+from ..models import Colloquialism
+from ..registry import get_tag_model, get_tag_models, get_transcript_models
+from ..related import related_tags
+from ..views import get_tags_data
+from ...transcripts.models import Transcript, Tag
+
+
+class RelatedTestCase(TestCase):
+    def setUp(self):
+        self.colloquialisms = [
+            Colloquialism.objects.create(
+                type='type_1', value='Hohepa Tipene', language='en'),
+            Colloquialism.objects.create(
+                type='type_2', value='Te Rārawa', language='en'),
+            Colloquialism.objects.create(
+                type='type_2', value='Ngāti Kahu', language='en'),
+        ]
+        self.transcript = Transcript.objects.create(language='en')
+        self.others = [Transcript.objects.create(language='en')
+                       for i in range(2)]
+
+        self.add_tag(self.transcript, 0, 1)
+        self.add_tag(self.transcript, 1, 2)
+        self.add_tag(self.others[1], 1, 3)
+        self.add_tag(self.others[1], 0, 1.5)
+        self.add_tag(self.others[0], 1, 4)
+        # not in self.transcript
+        self.add_tag(self.others[0], 2, 5)
+
+    def add_tag(self, transcript, index, seconds):
+        Tag.objects.create(
+            transcript=transcript, colloquialism=self.colloquialisms[index],
+            start=timedelta(seconds=int(seconds)),
+            start_exact=timedelta(seconds=seconds))
+
+    def test_registry(self):
+        self.assertEqual(get_tag_models(), [Tag])
+        self.assertEqual(get_transcript_models(), [Transcript])
+        self.assertIs(get_tag_model('transcripts.Tag'), Tag)
+        with self.assertRaises(LookupError):
+            get_tag_model('transcripts.transcript')
+
+    def test_related_tags(self):
+        with self.assertNumQueries(1):
+            tags = related_tags(self.transcript)
+
+        self.assertEqual(
+            [(type(tag), tag.transcript_id, tag.colloquialism_id,
+              tag.start_exact) for tag in tags],
+            [(Tag, self.others[0].pk, self.colloquialisms[1].pk,
+              timedelta(seconds=4)),
+             (Tag, self.others[1].pk, self.colloquialisms[0].pk,
+              timedelta(seconds=1.5)),
+             (Tag, self.others[1].pk, self.colloquialisms[1].pk,
+              timedelta(seconds=3))])
+        self.assertEqual(
+            set(tag.pk for tag in tags),
+            set(self.transcript.related_tags().values_list('pk', flat=True)))
+
+        self.assertEqual(
+            [tag.pk for tag in related_tags(self.transcript, limit=2)],
+            [tag.pk for tag in tags[:2]])
+        self.assertEqual(related_tags(self.transcript, tag_models=[]), [])
+
+    def test_tags_data(self):
+        data = get_tags_data(self.transcript)
+
+        with self.assertNumQueries(5):
+            all_data = get_tags_data(self.transcript, all_collections=True)
+
+        related = all_data['type_2']['items']['te rārawa']['related']
+        self.assertEqual(sorted(related), [
+            'transcripts.transcript:%s' % self.others[0].pk,
+            'transcripts.transcript:%s' % self.others[1].pk,
+        ])
+        self.assertEqual(
+            related['transcripts.transcript:%s' % self.others[1].pk],
+            data['type_2']['items']['te rārawa']['related'][
+                self.others[1].pk])
+
+        limited = get_tags_data(self.transcript, all_collections=True,
+                                related_limit=1)
+        self.assertEqual(
+            limited['type_1']['items']['hohepa tipene']['related'], {})
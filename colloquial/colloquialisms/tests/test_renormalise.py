@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from django.utils.encoding import force_text
+from django.utils.six import StringIO
+
+from .. import models
+from ..minhash import pack, signature
+from ..models import Colloquialism, ColloquialismStats, MinHashSignature
+from ..renormalise import renormalise_chunk
+from ...transcripts.models import Transcript, Tag
+
+
+MACRONS = dict(zip(map(ord, 'āēīōū'), 'aeiou'))
+
+
+def fold_macrons(value, type):
+    return value.lower().translate(MACRONS)
+
+
+class RenormaliseTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+        self.colloquialisms = [
+            Colloquialism.objects.create(
+                type='type_1', value=value, language='en', meaning=meaning)
+            for value, meaning in (
+                ('Te Rarawa', ''),
+                ('Tūhoe', ''),
+                ('Te Rārawa', 'An iwi'),
+                ('Te Rarawā', ''),
+                ('Ngāti Kahu', ''))]
+
+        self.transcripts = transcripts = [
+            Transcript.objects.create(language='en') for i in range(2)]
+        for i, colloquialism in enumerate(self.colloquialisms):
+            Tag.objects.create(
+                transcript=transcripts[i % 2], colloquialism=colloquialism,
+                start=timedelta(seconds=i), start_exact=timedelta(seconds=i))
+        ColloquialismStats.objects.recount()
+        ColloquialismStats.objects.filter(
+            colloquialism=self.colloquialisms[2]).update(
+                last_seen=timezone.now())
+
+        # patched, since Colloquialism.normalise_value calls it
+        self.normalise_value = models.normalise_value
+        models.normalise_value = fold_macrons
+
+    def tearDown(self):
+        models.normalise_value = self.normalise_value
+        shutil.rmtree(self.directory)
+
+    def test_renormalise_chunk(self):
+        first = self.colloquialisms[0]
+
+        chunk = renormalise_chunk(chunk_size=3)
+
+        self.assertEqual(chunk.last_pk, self.colloquialisms[2].pk)
+        self.assertEqual((chunk.count, chunk.changed), (3, 1))
+        self.assertEqual(len(chunk.merges), 1)
+        self.assertEqual(chunk.merges[0].survivor.pk, first.pk)
+        self.assertEqual([c.pk for c in chunk.merges[0].merged],
+                         [self.colloquialisms[2].pk])
+        self.assertEqual(
+            sorted(Colloquialism.objects.values_list(
+                'value', 'normalised_value', 'meaning')),
+            [('Ngāti Kahu', 'ngāti kahu', ''),
+             ('Te Rarawa', 'te rarawa', 'An iwi'),
+             ('Te Rarawā', 'te rarawā', ''),
+             ('Tūhoe', 'tuhoe', '')])
+
+        # merged into a survivor from an earlier chunk
+        chunk = renormalise_chunk(chunk.last_pk, chunk_size=3)
+        self.assertEqual((chunk.count, chunk.changed), (2, 1))
+        self.assertEqual(chunk.merges[0].survivor.pk, first.pk)
+        self.assertIsNone(renormalise_chunk(chunk.last_pk).last_pk)
+
+        self.assertEqual(
+            sorted(Colloquialism.objects.values_list(
+                'value', 'normalised_value')),
+            [('Ngāti Kahu', 'ngati kahu'),
+             ('Te Rarawa', 'te rarawa'),
+             ('Tūhoe', 'tuhoe')])
+        self.assertEqual(Tag.objects.filter(colloquialism=first).count(), 3)
+
+        stats = ColloquialismStats.objects.get(colloquialism=first)
+        self.assertEqual((stats.occurrences, stats.transcripts), (3, 2))
+        self.assertIsNotNone(stats.last_seen)
+
+    def test_similarity(self):
+        for transcript in self.transcripts:
+            transcript.index_similarity()
+        renormalise_chunk(chunk_size=10)
+
+        first = self.colloquialisms[0].pk
+        for transcript, pks in zip(self.transcripts, (
+                [first, self.colloquialisms[4].pk],
+                [first, self.colloquialisms[1].pk])):
+            self.assertEqual(
+                bytes(MinHashSignature.objects.for_transcript(transcript)
+                      .get().signature),
+                pack(signature(pks, 64)))
+
+    def test_dry_run(self):
+        chunk = renormalise_chunk(chunk_size=10, dry_run=True)
+        self.assertEqual((chunk.count, chunk.changed), (5, 2))
+        self.assertEqual(len(chunk.merges[0].merged), 2)
+        self.assertEqual(Colloquialism.objects.count(), 5)
+
+    def test_swap(self):
+        # values which take each other's current normalised values
+        models.normalise_value = lambda value, type: {
+            'te rarawa': 'tūhoe', 'tūhoe': 'te rarawa'}.get(
+                value.lower(), value.lower())
+        renormalise_chunk(chunk_size=1)
+        self.assertEqual(
+            Colloquialism.objects.get(pk=self.colloquialisms[0].pk)
+            .normalised_value, 'tūhoe')
+        self.assertEqual(
+            Colloquialism.objects.get(pk=self.colloquialisms[1].pk)
+            .normalised_value, 'te rarawa')
+
+    def test_command(self):
+        path = os.path.join(self.directory, 'state.json')
+        stdout = StringIO()
+        call_command('renormalise_colloquialisms', state=path,
+                     chunk_size=2, stdout=stdout)
+        output = force_text(stdout.getvalue())
+
+        self.assertIn('Merged %s (Te Rārawa), %s (Te Rarawā) into %s '
+                      '(Te Rarawa): te rarawa' % (
+                          self.colloquialisms[2].pk,
+                          self.colloquialisms[3].pk,
+                          self.colloquialisms[0].pk), output)
+        self.assertIn('5 colloquialisms processed, 2 re-normalised, '
+                      '2 merged', output)
+        self.assertEqual(Colloquialism.objects.count(), 3)
+        self.assertEqual(Tag.objects.filter(
+            colloquialism=self.colloquialisms[0]).count(), 3)
+
+        # resuming finds nothing left
+        stdout = StringIO()
+        call_command('renormalise_colloquialisms', state=path,
+                     stdout=stdout)
+        self.assertIn('Resuming after %s' % self.colloquialisms[4].pk,
+                      stdout.getvalue())
+        self.assertIn('5 colloquialisms processed', stdout.getvalue())
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from StringIO import StringIO
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from ..models import Colloquialism
+from ..retag import retag_colloquialism
+from ..vocabulary import invalidate
+from ...transcripts.models import Transcript
+from .mixins import MediaRootMixin
+from .test_parser import file_content_plain
+
+
+@override_settings(COLLOQUIAL_TYPES=(
+    ('tangata', 'tangata', True),
+    ('iwihapu', 'iwihapu', True),
+    ('kainga', 'kainga', False),
+))
+class RetagTestCase(MediaRootMixin, TestCase):
+    def setUp(self):
+        super(RetagTestCase, self).setUp()
+        invalidate()
+
+        self.transcript = Transcript.objects.create(language='en')
+        self.transcript.transcript_file.save(
+            'test.vtt', ContentFile(file_content_plain.encode('utf-8')))
+        self.transcript.parse(save=True)
+
+        self.other = self.create_transcript(
+            'Kei hea a Hohepa?', 'Kei Te Rārawa ia.')
+
+    def create_transcript(self, *cues):
+        transcript = Transcript.objects.create(language='en')
+        transcript.transcript_file.save('other.vtt', ContentFile(
+            ('WEBVTT\n\n%s' % ''.join(
+                '%s\n00:00:%02d.000 --> 00:00:%02d.000\n%s\n\n' % (
+                    i, i, i + 1, text)
+                for i, text in enumerate(cues, 1))).encode('utf-8')))
+        transcript.parse(save=True)
+        return transcript
+
+    def test_retag(self):
+        colloquialism = Colloquialism.objects.create(
+            type='tangata', value='Hohepa Tipene', language='en')
+
+        # the other transcript contains Hohepa, but not the full value; the
+        # transcript's similarity signature is rebuilt with its new
+        # colloquialism, and the vocabulary is loaded once
+        with self.assertNumQueries(16):
+            self.assertEqual(retag_colloquialism(colloquialism), 1)
+
+        # matches the result of a full parse
+        parsed, errors = self.transcript.parse()
+        self.assertEqual(
+            [(t.colloquialism, t.start, t.start_exact)
+             for t in self.transcript.get_tags()],
+            [(t.colloquialism, t.start, t.start_exact) for t in parsed])
+        self.assertFalse(self.other.get_tags().filter(
+            colloquialism=colloquialism).exists())
+
+        # retagging replaces rather than duplicates
+        self.assertEqual(retag_colloquialism(colloquialism), 1)
+        self.assertEqual(self.transcript.get_tags().count(), 1)
+
+    def test_longest_match(self):
+        Colloquialism.objects.create(
+            type='tangata', value='Hohepa Tipene', language='en')
+        colloquialism = Colloquialism.objects.create(
+            type='tangata', value='Hohepa', language='en')
+
+        # Hohepa Tipene is preferred, as in a full parse
+        self.assertEqual(retag_colloquialism(colloquialism), 1)
+        self.assertFalse(self.transcript.get_tags().filter(
+            colloquialism=colloquialism).exists())
+        self.assertEqual(self.other.get_tags().get().colloquialism,
+                         colloquialism)
+
+    def test_span_cues(self):
+        transcript = self.create_transcript(
+            'Ko Hohepa', 'Tipene tōku ingoa.', 'Tēnā koe Hohepa.')
+        colloquialism = Colloquialism.objects.create(
+            type='tangata', value='Hohepa Tipene', language='en')
+
+        self.assertEqual(retag_colloquialism(colloquialism), 2)
+        parsed, errors = transcript.parse()
+        self.assertEqual(
+            [(t.colloquialism, t.start, t.start_exact)
+             for t in transcript.get_tags()],
+            [(t.colloquialism, t.start, t.start_exact) for t in parsed])
+        self.assertEqual(len(parsed), 1)
+
+    def test_language(self):
+        # a duplicate value in another language doesn't prevent auto-tagging
+        Colloquialism.objects.create(
+            type='tangata', value='Hohepa Tipene', language='fr')
+        colloquialism = Colloquialism.objects.create(
+            type='iwihapu', value='Hohepa Tipene', language='en')
+        self.assertEqual(retag_colloquialism(colloquialism), 1)
+
+    def test_no_auto_tag(self):
+        colloquialism = Colloquialism.objects.create(
+            type='kainga', value='Panguru', language='en')
+        self.assertEqual(retag_colloquialism(colloquialism), 0)
+
+        colloquialism = Colloquialism.objects.create(
+            type='iwihapu', value='Te Rārawa', language='en',
+            allow_auto_tag=False)
+        self.assertEqual(retag_colloquialism(colloquialism), 0)
+
+    def test_command(self):
+        colloquialism = Colloquialism.objects.create(
+            type='iwihapu', value='Te Rārawa', language='en')
+        output = StringIO()
+
+        call_command('retag_colloquialisms', colloquialism.pk, stdout=output)
+        self.assertEqual(self.transcript.get_tags().count(), 1)
+
+
+@override_settings(COLLOQUIAL_TYPES=(
+    ('tangata', 'tangata', True),
+    ('iwihapu', 'iwihapu', True),
+), COLLOQUIAL_RETAG_ON_SAVE=True)
+class RetagCreatedTestCase(MediaRootMixin, TransactionTestCase):
+    def setUp(self):
+        super(RetagCreatedTestCase, self).setUp()
+        invalidate()
+
+        self.transcript = Transcript.objects.create(language='en')
+        self.transcript.transcript_file.save('test.vtt', ContentFile(
+            b'WEBVTT\n\n1\n00:00:01.000 --> 00:00:02.000\n'
+            b'Kei hea a Hohepa? Kei Te R\xc4\x81rawa.\n'))
+        self.transcript.parse(save=True)
+
+    def test_bulk_get_or_create(self):
+        key = ('en', 'tangata', Colloquialism.normalise_value(
+            'Hohepa', 'tangata'))
+        Colloquialism.objects.bulk_get_or_create({key: 'Hohepa'})
+        self.assertEqual(self.transcript.get_tags().get().colloquialism.value,
+                         'Hohepa')
+
+        # existing colloquialisms aren't retagged
+        self.transcript.clear_tags()
+        Colloquialism.objects.bulk_get_or_create({key: 'Hohepa'})
+        self.assertFalse(self.transcript.get_tags().exists())
+
+    def test_create_missing(self):
+        Colloquialism.objects.create_missing([Colloquialism(
+            type='iwihapu', value='Te Rārawa', language='en')])
+        self.assertEqual(self.transcript.get_tags().get().colloquialism.value,
+                         'Te Rārawa')
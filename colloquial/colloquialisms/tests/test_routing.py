@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.test import TransactionTestCase, override_settings
+
+from .. import routing
+from ..models import Colloquialism
+from ..views import get_tags_data
+from ..vocabulary import invalidate
+from ...transcripts.models import Transcript, Tag
+from .mixins import MediaRootMixin
+from .test_parser import file_content_tagged
+
+
+@override_settings(COLLOQUIAL_READ_DATABASE='replica', COLLOQUIAL_TYPES=(
+    ('tangata', 'tangata', True),
+    ('iwihapu', 'iwihapu', True),
+    ('kainga', 'kainga', False),
+))
+class RoutingTestCase(MediaRootMixin, TransactionTestCase):
+    # the replica alias mirrors the default database in tests, so it sees
+    # committed data
+    def setUp(self):
+        super(RoutingTestCase, self).setUp()
+        invalidate()
+
+        colloquialism = Colloquialism.objects.create(
+            type='tangata', value='Hohepa Tipene', language='en')
+        self.transcript = Transcript.objects.create(language='en')
+        self.other = Transcript.objects.create(language='en')
+        for transcript in (self.transcript, self.other):
+            Tag.objects.create(
+                transcript=transcript, colloquialism=colloquialism,
+                start=timedelta(seconds=1), start_exact=timedelta(seconds=1))
+
+    def test_for_read(self):
+        self.assertEqual(Tag.objects.for_read().db, 'replica')
+        self.assertEqual(Tag.objects.using('default').for_read().db,
+                         'default')
+        with override_settings(COLLOQUIAL_READ_DATABASE=None):
+            self.assertEqual(Tag.objects.for_read().db, 'default')
+
+    def test_tags_data(self):
+        with self.assertNumQueries(0, using='default'), \
+                self.assertNumQueries(4, using='replica'):
+            data = get_tags_data(self.transcript)
+        self.assertEqual(
+            len(data['tangata']['items']['hohepa tipene']['related']), 1)
+
+        with self.assertNumQueries(0, using='default'), \
+                self.assertNumQueries(5, using='replica'):
+            get_tags_data(self.transcript, all_collections=True)
+
+    def test_parse(self):
+        self.transcript.transcript_file.save('test.vtt', ContentFile(
+            file_content_tagged.encode('utf-8')))
+        self.transcript.parse(save=True)
+
+        # parsing doesn't change where reads go
+        self.assertEqual(routing.get_read_database(), 'replica')
+        with routing.primary():
+            with self.assertNumQueries(0, using='replica'):
+                data = get_tags_data(self.transcript)
+        self.assertEqual(sorted(data), ['iwihapu', 'kainga', 'tangata'])
+
+    def test_primary(self):
+        with routing.primary():
+            self.assertEqual(Tag.objects.for_read().db, 'default')
+            with routing.primary():
+                self.assertIsNone(routing.get_read_database())
+            self.assertEqual(Tag.objects.for_read().db, 'default')
+        self.assertEqual(Tag.objects.for_read().db, 'replica')
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import json
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import TestCase, RequestFactory, override_settings
+from django.utils.six import StringIO
+
+from ..minhash import band_values, pack, signature, similarity, unpack
+from ..models import Colloquialism, MinHashBand, MinHashSignature
+from ..views import similar
+from ...transcripts.models import Transcript, Tag
+
+
+class MinHashTestCase(TestCase):
+    def test_signature(self):
+        self.assertIsNone(signature([], 16))
+        sig = signature([1, 2, 3], 16)
+        self.assertEqual(len(sig), 16)
+        self.assertEqual(sig, signature([3, 2, 1, 1], 16))
+        self.assertEqual(unpack(pack(sig)), sig)
+
+    def test_similarity(self):
+        a = signature(range(100), 128)
+        self.assertEqual(similarity(a, a), 1.0)
+        self.assertEqual(similarity(a, signature(range(100, 200), 128)), 0.0)
+        # the Jaccard similarity is 0.5
+        self.assertAlmostEqual(
+            similarity(a, signature(range(33, 133), 128)), 0.5, delta=0.15)
+        self.assertEqual(similarity(a, a[:64]), 0.0)
+
+    def test_band_values(self):
+        sig = signature([1, 2, 3], 16)
+        values = band_values(sig, 4)
+        self.assertEqual(len(values), 4)
+        self.assertEqual(values, band_values(list(sig), 4))
+        # equal rows in different bands give different values
+        self.assertEqual(len(set(band_values([7] * 16, 4))), 4)
+        with self.assertRaises(ValueError):
+            band_values(sig, 5)
+
+
+# bands of two rows, so the far transcript (similarity 0.4) is likely found
+@override_settings(COLLOQUIAL_MINHASH_PERMUTATIONS=64,
+                   COLLOQUIAL_MINHASH_BANDS=32)
+class SimilarTestCase(TestCase):
+    def setUp(self):
+        self.colloquialisms = [
+            Colloquialism.objects.create(
+                type='type_1', value='value %s' % i, language='en')
+            for i in range(10)]
+        self.transcript = self.create_transcript('Transcript', range(8))
+        self.close = self.create_transcript('Close', range(7))
+        self.far = self.create_transcript('Far', range(4, 10))
+        self.unrelated = self.create_transcript('Unrelated', [])
+
+    def create_transcript(self, title, indexes):
+        transcript = Transcript.objects.create(title=title, language='en')
+        for index in indexes:
+            Tag.objects.create(
+                transcript=transcript,
+                colloquialism=self.colloquialisms[index],
+                start=timedelta(seconds=index),
+                start_exact=timedelta(seconds=index))
+        transcript.index_similarity()
+        return transcript
+
+    def test_index_similarity(self):
+        self.assertEqual(MinHashSignature.objects.count(), 3)
+        self.assertFalse(
+            MinHashSignature.objects.for_transcript(self.unrelated).exists())
+        self.assertEqual(MinHashBand.objects.count(), 3 * 32)
+
+        # unchanged signatures aren't rewritten
+        with self.assertNumQueries(2):
+            self.transcript.index_similarity()
+
+    def test_similar_transcripts(self):
+        results = self.transcript.similar_transcripts()
+        self.assertEqual([t for t, s in results], [self.close, self.far])
+        self.assertGreater(results[0][1], results[1][1])
+
+        self.assertEqual(
+            [t for t, s in self.transcript.similar_transcripts(limit=1)],
+            [self.close])
+        self.assertEqual(
+            [t for t, s in self.transcript.similar_transcripts(
+                threshold=0.6)],
+            [self.close])
+        self.assertEqual(self.unrelated.similar_transcripts(), [])
+
+    def test_clear(self):
+        self.close.clear_tags()
+        self.assertFalse(
+            MinHashSignature.objects.for_transcript(self.close).exists())
+
+        self.far.delete()
+        self.assertEqual(MinHashSignature.objects.count(), 1)
+        self.assertEqual(MinHashBand.objects.count(), 32)
+        self.assertEqual(self.transcript.similar_transcripts(), [])
+
+    def test_view(self):
+        factory = RequestFactory()
+        response = similar(factory.get('/', {'limit': '1'}), Transcript,
+                           self.transcript.pk)
+        self.assertEqual(response.status_code, 200)
+        results = json.loads(response.content.decode('utf-8'))['results']
+        self.assertEqual(
+            [(r['type'], r['id'], r['title']) for r in results],
+            [('transcripts.transcript', self.close.pk, 'Close')])
+
+        response = similar(factory.get('/', {'limit': 'x'}), Transcript,
+                           self.transcript.pk)
+        self.assertEqual(response.status_code, 400)
+
+    def test_rebuild_similarity_index(self):
+        MinHashSignature.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_similarity_index', stdout=out)
+        self.assertIn('4 transcripts indexed', out.getvalue())
+        self.assertEqual(MinHashSignature.objects.count(), 3)
+        self.assertEqual(
+            [t for t, s in self.transcript.similar_transcripts()],
+            [self.close, self.far])
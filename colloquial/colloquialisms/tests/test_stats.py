@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils.six import StringIO
+
+from ..models import Colloquialism, ColloquialismStats
+from ..retag import retag_colloquialism
+from ..vocabulary import invalidate
+from ...transcripts.models import Transcript
+from .mixins import MediaRootMixin
+from .test_parser import file_content_tagged
+
+
+@override_settings(COLLOQUIAL_TYPES=(
+    ('tangata', 'tangata', True),
+    ('iwihapu', 'iwihapu', True),
+    ('kainga', 'kainga', False),
+))
+class StatsTestCase(MediaRootMixin, TestCase):
+    def setUp(self):
+        super(StatsTestCase, self).setUp()
+        invalidate()
+
+        self.transcripts = []
+        for i in range(2):
+            transcript = Transcript.objects.create(language='en')
+            transcript.transcript_file.save('test.vtt', ContentFile(
+                file_content_tagged.encode('utf-8')))
+            transcript.parse(save=True)
+            self.transcripts.append(transcript)
+
+    def get_stats(self):
+        return dict(
+            (stats.colloquialism.normalised_value,
+             (stats.occurrences, stats.transcripts))
+            for stats in ColloquialismStats.objects.select_related(
+                'colloquialism'))
+
+    def test_parse(self):
+        self.assertEqual(self.get_stats(), {
+            'hohepa tipene': (2, 2),
+            'te rārawa': (2, 2),
+            'panguru': (2, 2),
+        })
+        self.assertTrue(all(
+            stats.last_seen for stats in ColloquialismStats.objects.all()))
+
+        # parsing again adds occurrences, but not transcripts
+        self.transcripts[0].parse(save=True)
+        self.assertEqual(self.get_stats()['panguru'], (3, 2))
+
+    def test_clear_and_delete(self):
+        self.assertEqual(self.transcripts[0].clear_tags(), 3)
+        self.assertEqual(self.get_stats()['panguru'], (1, 1))
+
+        self.transcripts[1].delete()
+        self.assertEqual(self.get_stats()['panguru'], (0, 0))
+
+    def test_retag(self):
+        colloquialism = Colloquialism.objects.create(
+            type='tangata', value='Hohepa', language='en')
+        # only tagged where it isn't already part of a longer tag
+        retag_colloquialism(colloquialism)
+        self.assertNotIn('hohepa', self.get_stats())
+
+        colloquialism = Colloquialism.objects.create(
+            type='iwihapu', value='kaikorero', language='en')
+        self.assertEqual(retag_colloquialism(colloquialism), 2)
+        self.assertEqual(self.get_stats()['kaikorero'], (2, 2))
+
+    def test_recount(self):
+        stats = self.get_stats()
+        ColloquialismStats.objects.update(occurrences=0, transcripts=5)
+
+        call_command('recount_colloquialism_stats', stdout=StringIO())
+        self.assertEqual(self.get_stats(), stats)
+
+    def test_idf(self):
+        other = Transcript.objects.create(language='en')
+        other.transcript_file.save('other.vtt', ContentFile(
+            b'WEBVTT\n\n1\n00:00:01.000 --> 00:00:02.000\n'
+            b'<c.kainga>Panguru</c>\n'))
+        other.parse(save=True)
+
+        idf = ColloquialismStats.objects.idf()
+        panguru = Colloquialism.objects.get(value='Panguru')
+        rarawa = Colloquialism.objects.get(value='Te Rārawa')
+        self.assertLess(idf[panguru.pk], idf[rarawa.pk])
+        self.assertEqual(
+            ColloquialismStats.objects.popular()[0].colloquialism, panguru)
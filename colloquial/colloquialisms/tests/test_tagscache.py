@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.core.cache import caches
+from django.core.management import call_command, CommandError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils.six import StringIO
+
+from .. import tagscache
+from ..models import Colloquialism
+from ..views import get_tags_data, tags_data
+from ...transcripts.models import Transcript, Tag
+
+
+@override_settings(
+    COLLOQUIAL_TAGS_CACHE='tags',
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'tags': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'colloquial-tags-test'},
+    })
+class TagsCacheTestCase(TestCase):
+    def setUp(self):
+        caches['tags'].clear()
+        self.output = tempfile.mkdtemp()
+
+        self.colloquialisms = [
+            Colloquialism.objects.create(
+                type='type_1', value='Hohepa Tipene', language='en'),
+            Colloquialism.objects.create(
+                type='type_2', value='Te Rārawa', language='en'),
+        ]
+        self.transcripts = [Transcript.objects.create(language='en')
+                            for i in range(3)]
+        self.add_tag(self.transcripts[0], 0)
+        self.add_tag(self.transcripts[1], 0)
+        self.add_tag(self.transcripts[2], 1)
+
+    def tearDown(self):
+        shutil.rmtree(self.output)
+
+    def add_tag(self, transcript, index, seconds=1):
+        Tag.objects.create(
+            transcript=transcript, colloquialism=self.colloquialisms[index],
+            start=timedelta(seconds=seconds),
+            start_exact=timedelta(seconds=seconds))
+
+    def warm(self, *args, **options):
+        stdout = StringIO()
+        call_command('warm_tags_cache', *args, stdout=stdout, workers=1,
+                     **options)
+        return stdout.getvalue().strip()
+
+    def test_fingerprint(self):
+        fingerprints = [tagscache.get_fingerprint(t)
+                        for t in self.transcripts]
+        self.assertEqual(len(set(fingerprints)), 3)
+
+        # a related tag changes the fingerprint, an unrelated one doesn't
+        self.add_tag(self.transcripts[1], 0, 2)
+        self.assertNotEqual(tagscache.get_fingerprint(self.transcripts[0]),
+                            fingerprints[0])
+        self.assertEqual(tagscache.get_fingerprint(self.transcripts[2]),
+                         fingerprints[2])
+
+        self.assertNotEqual(
+            tagscache.get_fingerprint(self.transcripts[2],
+                                      all_collections=True),
+            fingerprints[2])
+
+        self.colloquialisms[1].meaning = 'An iwi'
+        self.colloquialisms[1].save()
+        self.assertNotEqual(tagscache.get_fingerprint(self.transcripts[2]),
+                            fingerprints[2])
+
+    def test_view(self):
+        transcript = self.transcripts[0]
+        response = tags_data(transcript)
+
+        # fingerprint only
+        with self.assertNumQueries(2):
+            self.assertEqual(tags_data(transcript).content, response.content)
+
+        self.add_tag(self.transcripts[1], 0, 2)
+        data = json.loads(tags_data(transcript).content.decode('utf-8'))
+        related = data['type_1']['items']['hohepa tipene']['related']
+        self.assertEqual(
+            len(related['%s' % self.transcripts[1].pk]['occurrences']), 2)
+
+    def test_warm_cache(self):
+        self.assertEqual(self.warm(), '3 payloads built, 0 unchanged, '
+                                      '0 removed')
+        with self.assertNumQueries(2):
+            tagscache.get_tags_data(self.transcripts[0])
+
+        self.add_tag(self.transcripts[1], 0, 2)
+        self.assertEqual(self.warm(), '2 payloads built, 1 unchanged, '
+                                      '0 removed')
+        self.assertEqual(self.warm('--all'), '3 payloads built, '
+                                             '0 unchanged, 0 removed')
+
+    def test_warm_output(self):
+        self.assertEqual(self.warm(output=self.output),
+                         '3 payloads built, 0 unchanged, 0 removed')
+
+        path = os.path.join(self.output, 'transcripts.transcript',
+                            '%s.json' % self.transcripts[2].pk)
+        with open(path, 'rb') as f:
+            self.assertEqual(json.loads(f.read().decode('utf-8')),
+                             get_tags_data(self.transcripts[2]))
+
+        self.transcripts[2].delete()
+        self.assertEqual(self.warm(output=self.output),
+                         '0 payloads built, 2 unchanged, 1 removed')
+        self.assertFalse(os.path.exists(path))
+        with open(os.path.join(self.output, 'manifest.json'), 'rb') as f:
+            self.assertEqual(len(json.loads(f.read().decode('utf-8'))), 2)
+
+    @override_settings(COLLOQUIAL_TAGS_CACHE=None)
+    def test_no_cache(self):
+        with self.assertRaises(CommandError):
+            self.warm()
+
+
+class WarmTagsCacheThreadsTestCase(TransactionTestCase):
+    def setUp(self):
+        self.output = tempfile.mkdtemp()
+        colloquialism = Colloquialism.objects.create(
+            type='type_1', value='Hohepa Tipene', language='en')
+        for i in range(4):
+            Tag.objects.create(
+                transcript=Transcript.objects.create(language='en'),
+                colloquialism=colloquialism, start=timedelta(seconds=i),
+                start_exact=timedelta(seconds=i))
+
+    def tearDown(self):
+        shutil.rmtree(self.output)
+
+    def test_workers(self):
+        stdout = StringIO()
+        call_command('warm_tags_cache', output=self.output, workers=2,
+                     stdout=stdout)
+        self.assertIn('4 payloads built', stdout.getvalue())
+        self.assertEqual(len(os.listdir(os.path.join(
+            self.output, 'transcripts.transcript'))), 4)
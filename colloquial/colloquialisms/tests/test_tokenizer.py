@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import random
+import time
+
+from django.test import SimpleTestCase
+
+from ..parser import parse_tags
+from ..tokenizer import scan, strip, closing_text, Span, TEXT, VOICE, \
+    END_VOICE, TAG, END_TAG, MARKUP
+
+
+# fragments for generating malformed cue text
+FRAGMENTS = ['<', '>', '/', '<v ', '<v Hohepa>', '</v>', '</v', '<c.', '<c',
+             '<c.tangata>', '<C.kainga>', '</c>', '</c', '<i>', '</i>', 'c.',
+             ' ', '\n', ',', '.', 'Te', 'Rārawa', 'ā', 'kōrero']
+
+
+class TokenizerTestCase(SimpleTestCase):
+    def test_scan(self):
+        self.assertEqual(
+            [(t.kind, t.value) for t in scan(
+                '<v Hohepa Tipene>Ko <C.tangata>Hohepa</c> <i>a</i></v> <3')],
+            [(VOICE, 'Hohepa Tipene'), (TEXT, 'Ko '), (TAG, 'tangata'),
+             (TEXT, 'Hohepa'), (END_TAG, ''), (TEXT, ' '), (MARKUP, 'i'),
+             (TEXT, 'a'), (MARKUP, '/i'), (END_VOICE, ''), (TEXT, ' <3')])
+
+    def test_strip(self):
+        stripped = strip(
+            '<v A> Ko <c.tangata> Hohepa </c> te </v> <v B>kōrero, '
+            '<c.iwihapu>Te <i>Rārawa</i>')
+
+        self.assertEqual(stripped.text,
+                         'Ko Hohepa te kōrero, Te <i>Rārawa</i>')
+        self.assertEqual(stripped.tags, [
+            Span('tangata', 'Hohepa', 3, True),
+            Span('iwihapu', 'Te Rārawa', 21, False),
+        ])
+        self.assertTrue(stripped.unclosed_voice)
+
+    def test_several_voice_spans(self):
+        self.assertEqual(strip('<v A>Kia ora</v> <v B>Kia ora</v>').text,
+                         'Kia ora Kia ora')
+
+    def test_unclosed_tags(self):
+        self.assertEqual(list(parse_tags('<c.a>Hohepa <c.b>Tipene</c>')), [
+            ('a', 'Hohepa', 0.0, False),
+            ('b', 'Tipene', 0.5, True),
+        ])
+
+    def test_closing_text(self):
+        self.assertEqual(closing_text('Tipene </c>, i tuku'), 'Tipene')
+        self.assertEqual(closing_text('<i>Tipene</i></c>'), 'Tipene')
+        self.assertEqual(closing_text('Tipene <c.a>Te</c>'), None)
+        self.assertEqual(closing_text('Tipene'), None)
+
+    def test_fuzz(self):
+        rng = random.Random(0)
+
+        for i in range(2000):
+            text = ''.join(rng.choice(FRAGMENTS)
+                           for j in range(rng.randint(0, 30)))
+
+            # tokens cover the text exactly
+            self.assertEqual(''.join(t.raw for t in scan(text)), text)
+
+            # no tags are left in the stripped text or tag values
+            stripped = strip(text)
+            for value in [stripped.text] + [s.value for s in stripped.tags]:
+                self.assertFalse([t for t in scan(value)
+                                  if t.kind in (TAG, END_TAG)])
+            for span in stripped.tags:
+                self.assertTrue(0 <= span.offset <= len(stripped.text))
+
+            for tag_type, value, pos, closed in parse_tags(text):
+                self.assertTrue(0 <= pos <= 1)
+                self.assertEqual(value, value.strip())
+
+    def test_linear_time(self):
+        # inputs which make backtracking regexes take quadratic time
+        def timed(size):
+            texts = ['<v a>' * size, '<c.a>' * size, '<' * size,
+                     '<c.a>' + 'a ' * size, '<v a>' + '</v' * size]
+            start = time.time()
+            for text in texts:
+                list(parse_tags(text))
+                strip(text)
+            return time.time() - start
+
+        small = timed(2000)
+        large = timed(32000)
+        # 16 times the input, allowing generous slack for timer noise
+        self.assertLess(large, max(small, 0.01) * 64)
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils.six import StringIO
+
+from .. import vocabulary
+from ..matcher import Matcher
+from ..models import Colloquialism
+from ..vocabfile import VocabularyFile, VocabularyFileError, \
+    write_vocabulary_file
+from ..vocabulary import get_matcher, invalidate
+from .test_models import TEST_SETTINGS
+
+
+class MatcherTestCase(SimpleTestCase):
+    def setUp(self):
+        self.matcher = Matcher([
+            {'type': 'place', 'value': 'Te Rārawa'},
+            {'type': 'person', 'value': 'Hohepa'},
+            {'type': 'person', 'value': 'Hohepa Tipene'},
+            {'type': 'place', 'value': 'hohepa'},
+        ])
+
+    def test_longest_match(self):
+        self.assertEqual(
+            self.matcher.tag_text('Ko Hohepa Tipene, no te rārawa.'),
+            'Ko <c.person>Hohepa Tipene</c>, no <c.place>te rārawa</c>.')
+        self.assertEqual(self.matcher.tag_text('Ko Hohepa\nTipene'),
+                         'Ko <c.person>Hohepa\nTipene</c>')
+
+    def test_word_boundaries(self):
+        self.assertEqual(self.matcher.tag_text('Hohepas Te Rārawai'),
+                         'Hohepas Te Rārawai')
+
+    def test_existing_tags(self):
+        self.assertEqual(
+            self.matcher.tag_text(
+                '<v Hohepa>Ko <c.place>Hohepa</c> Hohepa'),
+            '<v Hohepa>Ko <c.place>Hohepa</c> <c.person>Hohepa</c>')
+        # continued from the previous cue
+        self.assertEqual(self.matcher.tag_text('Hohepa</c> Hohepa'),
+                         'Hohepa</c> <c.person>Hohepa</c>')
+
+    def test_tag_cues(self):
+        matcher = Matcher([{'type': 'place', 'value': 'Te Rārawa o Hokianga'}])
+
+        self.assertEqual(matcher.tag_cues(['no Te', 'Rārawa o', 'Hokianga.']),
+                         ['no <c.place>Te', 'Rārawa o', 'Hokianga</c>.'])
+        # phrases don't continue across markup or existing tags
+        self.assertEqual(
+            matcher.tag_cues(['no Te</v>', 'Rārawa o Hokianga']),
+            ['no Te</v>', 'Rārawa o Hokianga'])
+        self.assertEqual(
+            matcher.tag_cues(['<c.place>Te', 'Rārawa o</c> Hokianga']),
+            ['<c.place>Te', 'Rārawa o</c> Hokianga'])
+
+    def test_digest(self):
+        # independent of order and of values with the same tokens
+        matcher = Matcher([
+            {'type': 'place', 'value': 'hohepa'},
+            {'type': 'person', 'value': 'Hohepa Tipene'},
+            {'type': 'person', 'value': 'HOHEPA'},
+            {'type': 'place', 'value': 'te rarawa'},
+        ])
+        self.assertNotEqual(matcher.get_digest(),
+                            self.matcher.get_digest())
+        self.assertEqual(
+            Matcher([
+                {'type': 'place', 'value': 'te  rarawa'},
+                {'type': 'place', 'value': 'Hohepa'},
+                {'type': 'person', 'value': 'Hohepa Tipene'},
+            ]).get_digest(),
+            matcher.get_digest())
+
+
+@override_settings(**TEST_SETTINGS)
+class VocabularyTestCase(TestCase):
+    def setUp(self):
+        Colloquialism.objects.create(
+            type='type_1', value='Kia ora', language='mi')
+        Colloquialism.objects.create(
+            type='type_2', value='Haere mai', language='mi')
+        Colloquialism.objects.create(
+            type='type_1', value='Gidday', language='en')
+
+    def test_partitions(self):
+        self.assertEqual(
+            get_matcher('mi').tag_text('Kia ora, haere mai. Gidday'),
+            '<c.type_1>Kia ora</c>, <c.type_2>haere mai</c>. Gidday')
+        self.assertEqual(
+            get_matcher('mi', ('type_2', )).tag_text('Kia ora, haere mai'),
+            'Kia ora, <c.type_2>haere mai</c>')
+        self.assertEqual(len(get_matcher('en')), 1)
+
+    def test_duplicates_per_language(self):
+        # a duplicate in another language doesn't disable auto-tagging
+        Colloquialism.objects.create(
+            type='type_2', value='Kia ora', language='en')
+
+        self.assertEqual(len(get_matcher('mi')), 2)
+        self.assertEqual(len(get_matcher('en')), 2)
+
+    def test_cleared_concurrently(self):
+        class ClearedDict(dict):
+            # as if another thread found a new version as soon as the
+            # matcher is stored
+            def __setitem__(self, key, value):
+                super(ClearedDict, self).__setitem__(key, value)
+                self.clear()
+
+        invalidate()
+        matchers = vocabulary._matchers
+        vocabulary._matchers = ClearedDict()
+        try:
+            self.assertEqual(len(get_matcher('mi')), 2)
+        finally:
+            vocabulary._matchers = matchers
+
+    def test_invalidation(self):
+        matcher = get_matcher('mi')
+        with self.assertNumQueries(0):
+            self.assertIs(get_matcher('mi'), matcher)
+
+        colloquialism = Colloquialism.objects.create(
+            type='type_1', value='Ka kite', language='mi')
+        self.assertEqual(len(get_matcher('mi')), 3)
+
+        colloquialism.delete()
+        self.assertEqual(len(get_matcher('mi')), 2)
+
+        Colloquialism.objects.bulk_get_or_create({
+            ('mi', 'type_1', 'mōrena'): 'Mōrena'})
+        self.assertEqual(len(get_matcher('mi')), 3)
+
+        # queryset updates don't send signals
+        Colloquialism.objects.filter(language='mi').update(
+            allow_auto_tag=False)
+        invalidate()
+        self.assertEqual(len(get_matcher('mi')), 0)
+
+
+class VocabularyFileTestCase(SimpleTestCase):
+    vocabulary = [
+        {'language': 'mi', 'type': 'place', 'value': 'Te Rārawa'},
+        {'language': 'mi', 'type': 'person', 'value': 'Hohepa Tipene'},
+        {'language': 'mi', 'type': 'person', 'value': 'Hohepa'},
+        {'language': 'mi', 'type': 'place', 'value': 'hohepa'},
+        {'language': 'en', 'type': 'place', 'value': 'Tipene'},
+        {'language': 'eng', 'type': 'place', 'value': 'Rārawa'},
+    ]
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'vocabulary.bin')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        version = write_vocabulary_file(self.path, self.vocabulary)
+        vocabulary_file = VocabularyFile(self.path)
+        self.assertEqual(vocabulary_file.version, version)
+
+        text = 'Ko <c.place>Te Rārawa</c> te iwi o Hohepa Tipene, ' \
+               'Hohepa rānei, Te Rārawa'
+        matcher = Matcher(
+            info for info in self.vocabulary if info['language'] == 'mi')
+        mapped = vocabulary_file.get_matcher('mi')
+        self.assertEqual(len(mapped), 3)
+        self.assertEqual(mapped.tag_text(text), matcher.tag_text(text))
+
+        self.assertEqual(
+            vocabulary_file.get_matcher('mi', ('place', )).tag_text(text),
+            'Ko <c.place>Te Rārawa</c> te iwi o Hohepa Tipene, '
+            'Hohepa rānei, <c.place>Te Rārawa</c>')
+        self.assertEqual(vocabulary_file.get_matcher('en').tag_text(text),
+                         text.replace('Tipene', '<c.place>Tipene</c>'))
+        self.assertEqual(len(vocabulary_file.get_matcher('fr')), 0)
+        self.assertNotEqual(vocabulary_file.get_matcher('en').get_digest(),
+                            mapped.get_digest())
+
+    def test_invalid(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'WEBVTT\n\n' * 10)
+        with self.assertRaises(VocabularyFileError):
+            VocabularyFile(self.path)
+
+
+@override_settings(**TEST_SETTINGS)
+class ExportVocabularyTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'vocabulary.bin')
+
+        Colloquialism.objects.create(
+            type='type_1', value='Kia ora', language='mi')
+        Colloquialism.objects.create(
+            type='type_no_auto', value='Haere mai', language='mi')
+        Colloquialism.objects.create(
+            type='type_1', value='Gidday', language='en')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_export(self):
+        call_command('export_vocabulary', self.path, stdout=StringIO())
+
+        with self.settings(COLLOQUIAL_VOCABULARY_FILE=self.path):
+            with self.assertNumQueries(0):
+                matcher = get_matcher('mi')
+                self.assertEqual(
+                    matcher.tag_text('Kia ora, haere mai. Gidday'),
+                    '<c.type_1>Kia ora</c>, haere mai. Gidday')
+
+            # not reflected until exported again
+            Colloquialism.objects.create(
+                type='type_1', value='Ka kite', language='mi')
+            self.assertEqual(len(get_matcher('mi')), 1)
+
+            call_command('export_vocabulary', stdout=StringIO())
+            self.assertEqual(len(get_matcher('mi')), 2)
+            self.assertEqual(len(get_matcher('en')), 1)
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""Single-pass tokenizer for cue text.
+
+   Cue text is split into text and markup tokens by scanning for '<' and
+   '>' with str.find, so each character is looked at a bounded number of
+   times whatever the input and there's no backtracking. Markup is
+   classified as a voice span (<v NAME>, </v>), a colloquialism tag
+   (<c.TYPE>, </c>) or other markup (<i>, timestamps etc.), ignoring case.
+   A '<' without a following '>' is treated as text.
+"""
+from __future__ import unicode_literals
+
+from collections import namedtuple
+
+
+TEXT = 'text'
+VOICE = 'voice'
+END_VOICE = 'end_voice'
+TAG = 'tag'
+END_TAG = 'end_tag'
+MARKUP = 'markup'
+
+# value is the text, voice name or tag type; raw is the source text
+Token = namedtuple('Token', ('kind', 'value', 'raw'))
+
+# a tag found by strip; offset is its position in the stripped text
+Span = namedtuple('Span', ('type', 'value', 'offset', 'closed'))
+
+# the result of strip: unclosed_voice is True if a voice span was left open,
+# leading is the plain text before the first tag or closing tag, and
+# leading_closed is True if that was a stray </c>, i.e. leading is the end
+# of a tag continued from the previous cue
+Stripped = namedtuple('Stripped', ('text', 'tags', 'unclosed_voice',
+                                   'leading', 'leading_closed'))
+
+
+def classify(raw):
+    """Return the Token for markup raw, including the angle brackets. """
+
+    inner = raw[1:-1]
+    lower = inner.lower()
+
+    if lower == '/v':
+        return Token(END_VOICE, '', raw)
+    if lower == '/c':
+        return Token(END_TAG, '', raw)
+    if lower == 'v' or lower[:1] == 'v' and lower[1:2] in ' \t\n.':
+        # the name follows any classes, after whitespace
+        parts = inner.split(None, 1)
+        return Token(VOICE, parts[1].strip() if len(parts) > 1 else '', raw)
+    if lower[:2] == 'c.':
+        return Token(TAG, inner[2:], raw)
+    return Token(MARKUP, inner, raw)
+
+
+def scan(text):
+    """Yield the Tokens of text, in order. """
+
+    pos = 0
+    length = len(text)
+
+    while pos < length:
+        start = text.find('<', pos)
+        if start == -1:
+            yield Token(TEXT, text[pos:], text[pos:])
+            return
+
+        end = text.find('>', start + 1)
+        if end == -1:
+            # no more markup
+            yield Token(TEXT, text[pos:], text[pos:])
+            return
+
+        if start > pos:
+            yield Token(TEXT, text[pos:start], text[pos:start])
+        yield classify(text[start:end + 1])
+        pos = end + 1
+
+
+def strip(text, voice_spans=True, tags=True):
+    """Remove voice spans and/or colloquialism tags from text in one pass,
+       returning a Stripped tuple. Whitespace inside removed spans and tags
+       is trimmed, as is whitespace after an unclosed voice span. Stray
+       </v> closing tags are kept; stray </c> closing tags are removed when
+       tags are.
+
+       Stripped.tags lists a Span for each tag, if tags is True. A tag is
+       unclosed if the text ends, or another tag starts, before its </c>.
+    """
+
+    parts = []
+    length = 0
+    # whether the last part is text which may be trimmed
+    trim = False
+    lstrip_next = False
+
+    spans = []
+    voice_open = False
+    current = None
+
+    leading = []
+    # whether a tag or closing tag has been seen, and whether it was </c>
+    seen_tag = False
+    leading_closed = False
+
+    def rstrip_last():
+        if trim and parts:
+            stripped = parts[-1].rstrip()
+            removed = len(parts[-1]) - len(stripped)
+            parts[-1] = stripped
+            if current is not None and current[1]:
+                current[1][-1] = current[1][-1][:len(
+                    current[1][-1]) - removed]
+            return removed
+        return 0
+
+    def end_tag(closed):
+        spans.append(Span(current[0], ''.join(current[1]).strip(),
+                          current[2], closed))
+
+    for token in scan(text):
+        kind = token.kind
+
+        if kind == TEXT:
+            value = token.value
+            if lstrip_next:
+                value = value.lstrip()
+                lstrip_next = False
+            parts.append(value)
+            length += len(value)
+            trim = True
+            if current is not None:
+                current[1].append(value)
+            if not seen_tag:
+                leading.append(token.value)
+            continue
+
+        if not seen_tag and kind in (TAG, END_TAG):
+            seen_tag = True
+            leading_closed = kind == END_TAG
+
+        if voice_spans and kind == VOICE:
+            voice_open = True
+            lstrip_next = True
+            continue
+
+        if voice_spans and kind == END_VOICE and voice_open:
+            length -= rstrip_last()
+            voice_open = False
+            lstrip_next = False
+            continue
+
+        if tags and kind == TAG:
+            if current is not None:
+                length -= rstrip_last()
+                end_tag(False)
+            current = [token.value, [], length]
+            lstrip_next = True
+            trim = False
+            continue
+
+        if tags and kind == END_TAG:
+            if current is not None:
+                length -= rstrip_last()
+                end_tag(True)
+                current = None
+            lstrip_next = False
+            continue
+
+        parts.append(token.raw)
+        length += len(token.raw)
+        trim = False
+        lstrip_next = False
+
+    if current is not None:
+        length -= rstrip_last()
+        end_tag(False)
+
+    return Stripped(''.join(parts), spans, voice_open,
+                    ''.join(leading).strip(), leading_closed)
+
+
+def closing_text(text):
+    """Return the text before a </c> at the start of text, i.e. the end of
+       a tag continued from the previous cue, or None if another tag opens
+       first or there is no </c>. Other markup is ignored. """
+
+    stripped = strip(text)
+    return stripped.leading if stripped.leading_closed else None
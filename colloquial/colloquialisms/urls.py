@@ -0,0 +1,8 @@
+from django.conf.urls import url
+
+from .views import autocomplete
+
+
+urlpatterns = [
+    url(r'^autocomplete/$', autocomplete, name='autocomplete'),
+]
@@ -2,11 +2,23 @@
 from __future__ import unicode_literals
 
 import math
+from collections import defaultdict
 
 from django.conf import settings
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponseBadRequest
 from django.shortcuts import get_object_or_404
 
+from . import instrumentation, tagscache
+
+
+# default and maximum number of autocomplete suggestions
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+
+# default and maximum number of similar transcripts
+SIMILAR_LIMIT = 10
+SIMILAR_MAX_LIMIT = 50
+
 
 def render_json(data):
     json_dumps_params = {}
@@ -16,20 +28,89 @@ def render_json(data):
     return JsonResponse(data, json_dumps_params=json_dumps_params)
 
 
-def tags(request, item_cls, item_pk):
+def autocomplete(request):
+    """Suggest colloquialisms whose normalised value starts with the q
+       parameter, in the language parameter, optionally restricted to one or
+       more type parameters. limit sets the number of suggestions. """
+
+    from .autocomplete import complete
+
+    prefix = request.GET.get('q', '')
+    language = request.GET.get('language')
+    types = request.GET.getlist('type') or None
+    try:
+        limit = min(int(request.GET.get('limit', AUTOCOMPLETE_LIMIT)),
+                    AUTOCOMPLETE_MAX_LIMIT)
+    except ValueError:
+        return HttpResponseBadRequest('Invalid limit')
+
+    if not language:
+        return HttpResponseBadRequest('language is required')
+    if not prefix.strip():
+        return render_json({'results': []})
+
+    return render_json({
+        'results': complete(prefix, language, types, max(limit, 0)),
+    })
+
+
+def tags(request, item_cls, item_pk, all_collections=False,
+         related_limit=None):
     """Get tag data, with related items based on common colloquialisms.
        item_cls should be a Transcript model class or queryset, with item_pk
-       the primary key of an instance of that class.
+       the primary key of an instance of that class. See get_tags_data for
+       all_collections and related_limit.
 
        https://3.basecamp.com/3685530/buckets/3803543/messages/578905579
     """
     item = get_object_or_404(item_cls, pk=item_pk)
-    return tags_data(item)
+    return tags_data(item, all_collections, related_limit)
+
+
+def similar(request, item_cls, item_pk, min_bands=1, threshold=0.0):
+    """Get transcripts, of any transcript model, estimated to have similar
+       colloquialisms to the item, most similar first. The limit parameter
+       sets the number returned. See AbstractTranscript.similar_transcripts
+       for min_bands and threshold. """
+
+    item = get_object_or_404(item_cls, pk=item_pk)
+    try:
+        limit = min(int(request.GET.get('limit', SIMILAR_LIMIT)),
+                    SIMILAR_MAX_LIMIT)
+    except ValueError:
+        return HttpResponseBadRequest('Invalid limit')
+
+    results = []
+    for transcript, similarity in item.similar_transcripts(
+            max(limit, 0), min_bands, threshold):
+        data = transcript.to_json()
+        data.update({
+            'type': transcript._meta.label_lower,
+            'id': transcript.pk,
+            'similarity': similarity,
+        })
+        results.append(data)
+
+    return render_json({'results': results})
+
+
+def tags_data(item, all_collections=False, related_limit=None):
+    """Get a JSON response of tag data, with related items based on common
+       colloquialisms, for an item instance. Uses the tags cache, if
+       configured (see tagscache.py). """
+
+    with instrumentation.stage('tags_data', count_queries=True,
+                               transcript=item.get_metrics_label()):
+        data = tagscache.get_tags_data(item, all_collections, related_limit)
+
+    return render_json(data)
 
 
-def tags_data(item):
+def get_tags_data(item, all_collections=False, related_limit=None):
     """Get tag data, with related items based on common colloquialisms, for an
-       item instance. """
+       item instance. If all_collections, related items are found among all
+       transcript models, keyed by '<app_label>.<model_name>:<pk>', and
+       related_limit limits the number of related tags. """
 
     # loop through tags, building up a nested dict of information as
     # we go. Note, using select_related like this means only one query,
@@ -39,7 +120,7 @@ def tags_data(item):
     data = {}
 
     # add info on each tag that appears in the transcript
-    tags = item.get_tags()
+    tags = item.get_tags().for_read()
 
     # get tag count by colloquialism id
     tag_counts = tags.get_counts()
@@ -105,8 +186,11 @@ def tags_data(item):
         uniqueness = 1.0 / count * (1 - 1 / math.exp(x / coefficient))
         return uniqueness
 
+    colloquialisms = {}
+
     for tag in tags.with_colloquialism():
         colloquialism = tag.colloquialism
+        colloquialisms[colloquialism.pk] = colloquialism
 
         # add type details the first time the type is encountered
         if colloquialism.type not in data:
@@ -132,23 +216,72 @@ def tags_data(item):
 
     # add in related tag info. Assume that the tag info is already in the data,
     # this code just adds the related information
-    related = item.related_tags()
-
-    for tag in related.with_colloquialism().with_transcript():
+    if all_collections:
+        related = get_all_related_tags(item, colloquialisms, related_limit)
+    else:
+        related = item.related_tags().for_read().with_colloquialism() \
+            .with_transcript()
+    related_count = 0
+
+    for tag in related:
+        related_count += 1
         colloquialism = tag.colloquialism
         transcript = tag.get_transcript()
         items = data[colloquialism.type]['items']
         related = items[colloquialism.normalised_value]['related']
 
+        if all_collections:
+            key = '%s:%s' % (transcript._meta.label_lower, transcript.pk)
+        else:
+            key = transcript.pk
+
         # add transcript details the first time it appears
-        if transcript.pk not in related:
-            related[transcript.pk] = transcript.to_json()
-            related[transcript.pk]['occurrences'] = []
+        if key not in related:
+            related[key] = transcript.to_json()
+            related[key]['occurrences'] = []
 
         # append tag details
-        related[transcript.pk]['occurrences'].append(tag.to_json())
+        related[key]['occurrences'].append(tag.to_json())
 
-    return render_json(data)
+    if instrumentation.enabled():
+        label = item.get_metrics_label()
+        instrumentation.count('tags_data.tags', len(occ_times),
+                              transcript=label)
+        instrumentation.count('tags_data.related', related_count,
+                              transcript=label)
+
+    return data
+
+
+def get_all_related_tags(item, colloquialisms, limit=None):
+    """Return the tags of any transcript model related to item, with
+       colloquialisms (a dict by pk, of those in item) and transcripts set.
+       Takes one query for the tags, then one per transcript model. """
+
+    from .related import related_tags
+    from .routing import get_read_database
+
+    tags = related_tags(item, limit)
+
+    pks = defaultdict(set)
+    for tag in tags:
+        pks[type(tag)].add(getattr(tag, tag._meta.get_field(
+            tag.transcript_rel).attname))
+
+    transcripts = {}
+    for tag_cls, transcript_pks in pks.items():
+        transcript_cls = tag_cls._meta.get_field(
+            tag_cls.transcript_rel).related_model
+        transcripts[tag_cls] = transcript_cls._default_manager.using(
+            get_read_database()).in_bulk(list(transcript_pks))
+
+    for tag in tags:
+        field = tag._meta.get_field(tag.transcript_rel)
+        tag.colloquialism = colloquialisms[tag.colloquialism_id]
+        setattr(tag, tag.transcript_rel,
+                transcripts[type(tag)][getattr(tag, field.attname)])
+
+    return tags
 
 
 """
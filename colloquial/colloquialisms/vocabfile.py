@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""Precompiled auto-tag vocabulary file.
+
+   Compiling the vocabulary means querying every auto-taggable
+   colloquialism, and the resulting dicts can't be shared between
+   processes. Instead, the export_vocabulary command writes the phrase
+   table for every language to a file of sorted records, which workers
+   map into memory and binary search in place. The pages are shared
+   through the OS page cache, and loading is just opening the file.
+
+   Layout (little-endian):
+
+       header: magic, format version, longest phrase in tokens, number of
+               phrases, number of first tokens, SHA-256 of the data
+       phrase offsets: number of phrases + 1 uint32s
+       first token offsets: number of first tokens + 1 uint32s
+       data: phrase records, then first token records
+
+   Phrase records are 'LANGUAGE\\x1fTOKEN TOKEN...\\x00TYPE' and first token
+   records 'LANGUAGE\\x1fTOKEN', UTF-8 encoded, each sorted bytewise.
+   Offsets are relative to the start of the data.
+
+   Like the rest of the parser core, this module doesn't import Django.
+"""
+from __future__ import unicode_literals
+
+import binascii
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+
+from .matcher import Matcher, phrase_key
+
+
+MAGIC = b'CLQV'
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct(str('<4sHHII32s'))
+OFFSET = struct.Struct(str('<I'))
+
+LANGUAGE_SEP = b'\x1f'
+TYPE_SEP = b'\x00'
+
+
+class VocabularyFileError(Exception):
+    pass
+
+
+def encode_key(language, tokens):
+    return language.encode('utf-8') + LANGUAGE_SEP + \
+        ' '.join(tokens).encode('utf-8')
+
+
+def write_vocabulary_file(path, vocabulary):
+    """Write vocabulary, an iterable of dicts with 'language', 'type' and
+       'value' keys, to path. As for Matcher, the first of several entries
+       with the same value in a language is used. The file is replaced
+       atomically, so workers never map a partial file. Returns the hex
+       digest of the data, which identifies the vocabulary version. """
+
+    phrases = {}
+    first_tokens = set()
+    max_length = 0
+
+    for info in vocabulary:
+        key = phrase_key(info['value'])
+        if not key:
+            continue
+
+        encoded = encode_key(info['language'], key)
+        if encoded in phrases:
+            continue
+
+        phrases[encoded] = info['type'].encode('utf-8')
+        first_tokens.add(encode_key(info['language'], key[:1]))
+        max_length = max(max_length, len(key))
+
+    records = [key + TYPE_SEP + phrases[key] for key in sorted(phrases)]
+    records.extend(sorted(first_tokens))
+
+    offsets = [0]
+    for record in records:
+        offsets.append(offsets[-1] + len(record))
+    # the first token offsets start where the phrase offsets end
+    offsets.insert(len(phrases) + 1, offsets[len(phrases)])
+
+    data = b''.join(records)
+    digest = hashlib.sha256(data).digest()
+
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(dir=directory, delete=False) as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, max_length,
+                            len(phrases), len(first_tokens), digest))
+        for offset in offsets:
+            f.write(OFFSET.pack(offset))
+        f.write(data)
+    os.chmod(f.name, 0o644)
+    os.rename(f.name, path)
+
+    return binascii.hexlify(digest).decode('ascii')
+
+
+class RecordTable(object):
+    """Sorted records within a mapped vocabulary file, from index lo to
+       hi. """
+
+    def __init__(self, buf, offsets_start, data_start, lo, hi):
+        self.buf = buf
+        self.offsets_start = offsets_start
+        self.data_start = data_start
+        self.lo = lo
+        self.hi = hi
+
+    def __len__(self):
+        return self.hi - self.lo
+
+    def record(self, index):
+        start, end = struct.unpack_from(
+            str('<II'), self.buf, self.offsets_start + index * OFFSET.size)
+        return self.buf[self.data_start + start:self.data_start + end]
+
+    def key(self, index):
+        return self.record(index).split(TYPE_SEP, 1)[0]
+
+    def bisect(self, key, prefix=False):
+        """Return the index of the first record whose key is not less than
+           key, or if prefix, doesn't start with key and isn't less than
+           it. """
+
+        lo, hi = self.lo, self.hi
+        while lo < hi:
+            mid = (lo + hi) // 2
+            found = self.key(mid)
+            if found < key or prefix and found.startswith(key):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def find(self, key):
+        """Return the record with exactly key, or None. """
+
+        index = self.bisect(key)
+        if index < self.hi:
+            record = self.record(index)
+            if record.split(TYPE_SEP, 1)[0] == key:
+                return record
+        return None
+
+    def partition(self, prefix):
+        """Return a table of the records starting with prefix. """
+
+        return RecordTable(self.buf, self.offsets_start, self.data_start,
+                           self.bisect(prefix), self.bisect(prefix, True))
+
+
+class MappedPhrases(object):
+    """Read-only mapping of token tuples to types for one language, as
+       used by Matcher.find. """
+
+    def __init__(self, table, language, types=None):
+        self.table = table
+        self.language = language
+        self.types = frozenset(types) if types is not None else None
+
+    def get(self, key, default=None):
+        record = self.table.find(encode_key(self.language, key))
+        if record is None:
+            return default
+
+        tag_type = record.split(TYPE_SEP, 1)[1].decode('utf-8')
+        if self.types is not None and tag_type not in self.types:
+            return default
+        return tag_type
+
+    def __len__(self):
+        if self.types is None:
+            return len(self.table)
+        return sum(1 for i in range(self.table.lo, self.table.hi)
+                   if self.table.record(i).split(TYPE_SEP, 1)[1].decode(
+                       'utf-8') in self.types)
+
+
+class MappedTokens(object):
+    """Read-only set of first tokens for one language. """
+
+    def __init__(self, table, language):
+        self.table = table
+        self.language = language
+
+    def __contains__(self, token):
+        return self.table.find(encode_key(self.language, (token, ))) \
+            is not None
+
+
+class MappedMatcher(Matcher):
+    """Matcher over one language's partition of a mapped vocabulary file,
+       optionally restricted to the given types. """
+
+    def __init__(self, vocabulary_file, language, types=None):
+        prefix = language.encode('utf-8') + LANGUAGE_SEP
+        self.phrases = MappedPhrases(
+            vocabulary_file.phrases.partition(prefix), language, types)
+        self.first_tokens = MappedTokens(
+            vocabulary_file.first_tokens.partition(prefix), language)
+        self.max_length = vocabulary_file.max_length
+        self.digest_parts = (vocabulary_file.version, language,
+                             sorted(types) if types is not None else None)
+
+    def get_digest(self):
+        # rather than reading the partition, as the file only changes when
+        # it is re-exported
+        return hashlib.sha1(('%s' % (self.digest_parts, )).encode('utf-8')) \
+            .hexdigest()
+
+
+class VocabularyFile(object):
+    """A vocabulary file written by write_vocabulary_file, mapped
+       read-only. """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self.buf) < HEADER.size:
+            raise VocabularyFileError('%s is truncated' % path)
+
+        magic, version, self.max_length, phrase_count, first_count, \
+            digest = HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC:
+            raise VocabularyFileError(
+                '%s is not a vocabulary file' % path)
+        if version != FORMAT_VERSION:
+            raise VocabularyFileError(
+                '%s has format version %s, expected %s' % (
+                    path, version, FORMAT_VERSION))
+
+        self.digest = digest
+        offsets_start = HEADER.size
+        first_offsets_start = offsets_start + \
+            (phrase_count + 1) * OFFSET.size
+        data_start = first_offsets_start + (first_count + 1) * OFFSET.size
+
+        self.phrases = RecordTable(
+            self.buf, offsets_start, data_start, 0, phrase_count)
+        self.first_tokens = RecordTable(
+            self.buf, first_offsets_start, data_start, 0, first_count)
+        self._matchers = {}
+
+    @property
+    def version(self):
+        """Hex digest of the data, as returned by write_vocabulary_file.
+        """
+
+        return binascii.hexlify(self.digest).decode('ascii')
+
+    def get_matcher(self, language, types=None):
+        key = (language, frozenset(types) if types is not None else None)
+        if key not in self._matchers:
+            self._matchers[key] = MappedMatcher(self, language, types)
+        return self._matchers[key]
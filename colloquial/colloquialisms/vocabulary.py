@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""Auto-tag vocabulary, partitioned by language and optionally type.
+
+   Each transcript is only scanned for colloquialisms in its own language,
+   so a matcher is compiled per (language, types) and kept for the life of
+   the process. A version token in the default cache is changed whenever
+   colloquialisms are saved or deleted, so that every process rebuilds its
+   matchers on next use. Queryset updates don't send signals; call
+   invalidate() after them.
+
+   Alternatively, set COLLOQUIAL_VOCABULARY_FILE to the path of a file
+   written by the export_vocabulary command, which every process maps
+   rather than querying and compiling the vocabulary itself (see
+   vocabfile.py). The file is reloaded when it's replaced, and must be
+   re-exported for vocabulary changes to take effect.
+"""
+from __future__ import unicode_literals
+
+import os
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .matcher import Matcher
+from .vocabfile import VocabularyFile
+
+
+VERSION_KEY = 'colloquial:vocabulary:version'
+
+_matchers = {}
+_version = [None]
+_files = {}
+
+
+def get_version():
+    """Return the current vocabulary version token. """
+
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = uuid4().hex
+        if not cache.add(VERSION_KEY, version, None):
+            version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def invalidate(**kwargs):
+    """Discard compiled matchers in all processes. Accepts signal
+       arguments so it may be connected as a receiver. """
+
+    cache.set(VERSION_KEY, uuid4().hex, None)
+    _matchers.clear()
+
+
+def get_vocabulary(language, types=None):
+    """Return the auto-tag vocabulary for language, as dicts with 'type'
+       and 'value' keys, optionally restricted to the given types. """
+
+    from .models import Colloquialism
+
+    qs = Colloquialism.objects.filter(language=language)
+    if types is not None:
+        qs = qs.filter(type__in=types)
+    return qs.filter_auto().values('type', 'value')
+
+
+def get_full_vocabulary():
+    """Return the auto-tag vocabulary of every language, as dicts with
+       'language', 'type' and 'value' keys. """
+
+    from .models import Colloquialism
+
+    languages = Colloquialism.objects.order_by('language') \
+        .values_list('language', flat=True).distinct()
+    for language in languages:
+        for info in get_vocabulary(language):
+            info['language'] = language
+            yield info
+
+
+def get_vocabulary_file(path):
+    """Return the mapped VocabularyFile at path, reloading it if the file
+       has been replaced since it was last loaded. """
+
+    stat = os.stat(path)
+    token = (stat.st_ino, stat.st_mtime)
+    loaded = _files.get(path)
+    if loaded is None or loaded[0] != token:
+        loaded = _files[path] = (token, VocabularyFile(path))
+    return loaded[1]
+
+
+def get_matcher(language, types=None):
+    """Return a Matcher for the auto-tag vocabulary of language, optionally
+       restricted to the given types. """
+
+    path = getattr(settings, 'COLLOQUIAL_VOCABULARY_FILE', None)
+    if path:
+        return get_vocabulary_file(path).get_matcher(language, types)
+
+    version = get_version()
+    if version != _version[0]:
+        _matchers.clear()
+        _version[0] = version
+
+    key = (language, frozenset(types) if types is not None else None)
+    # another thread may clear _matchers at any point, so only look it up
+    # once
+    matcher = _matchers.get(key)
+    if matcher is None:
+        matcher = _matchers[key] = Matcher(get_vocabulary(language, types))
+    return matcher
@@ -1,12 +1,12 @@
 from django.contrib import admin
 
 from .models import Transcript, Tag
-from ..colloquialisms.admin import BaseTranscriptAdmin
+from ..colloquialisms.admin import BaseTranscriptAdmin, BaseTagInline, \
+    BaseTagAdmin
 
 
-class TagInline(admin.TabularInline):
+class TagInline(BaseTagInline):
     model = Tag
-    extra = 0
 
 
 @admin.register(Transcript)
@@ -15,10 +15,13 @@ class TranscriptAdmin(BaseTranscriptAdmin):
                     'links', )
     list_filter = ('created', )
     search_fields = ('value', 'meaning')
+    readonly_fields = ('tag_summary', )
     inlines = (TagInline, )
 
 
 @admin.register(Tag)
-class TagAdmin(admin.ModelAdmin):
+class TagAdmin(BaseTagAdmin):
     list_display = ('transcript', 'colloquialism', 'start', )
+    list_select_related = ('transcript', 'colloquialism', )
+    raw_id_fields = ('transcript', 'colloquialism', )
     search_fields = ('transcript__title', 'colloquialism__value')
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import hashlib
+import os
+from itertools import islice
+from multiprocessing.pool import ThreadPool
+
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+
+from ...models import Transcript
+from ....colloquialisms.models import DEFAULT_LANGUAGE
+from ....colloquialisms.parser import validate_webvtt
+
+
+def find_files(directory, extension='.vtt'):
+    """Yield the paths of files with extension under directory, in order.
+    """
+
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(extension):
+                yield os.path.join(root, name)
+
+
+def hashed_lines(f, digest):
+    """Yield the lines of f, updating digest with each. """
+
+    for line in f:
+        digest.update(line)
+        yield line
+
+
+def check_file(path):
+    """Validate the file at path in one streaming pass. Returns (errors,
+       hex sha256 digest of the content). """
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        errors = validate_webvtt(hashed_lines(f, digest))
+    return errors, digest.hexdigest()
+
+
+class Command(BaseCommand):
+    help = 'Create a transcript for each WebVTT (.vtt) file in a directory ' \
+           'tree, titled with the file name. Invalid files are reported ' \
+           'and skipped.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument('--language', default=DEFAULT_LANGUAGE,
+                            help='Language of the transcripts')
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Number of transcripts created at a time')
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Number of files checked and written to storage at once')
+        parser.add_argument('--parse', action='store_true',
+                            help='Parse tags from each transcript')
+
+    def save_file(self, item):
+        """Write the file at path to storage, given (path, hash), returning
+           the stored name. Files already stored aren't written again. """
+
+        path, digest = item
+        field = Transcript._meta.get_field('transcript_file')
+        with open(path, 'rb') as f:
+            return field.store(None, os.path.basename(path), File(f), digest)
+
+    def create_batch(self, pool, batch, language):
+        """Write batch, a list of (path, hash), to storage and create their
+           transcripts. Returns the created transcripts. """
+
+        # store each distinct file once
+        unique = list(dict((digest, (path, digest))
+                           for path, digest in batch).values())
+        stored = dict((digest, name) for (path, digest), name in zip(
+            unique, pool.map(self.save_file, unique)))
+        names = [stored[digest] for path, digest in batch]
+        transcripts = [
+            Transcript(
+                title=os.path.splitext(os.path.basename(path))[0][:100],
+                transcript_file=name, transcript_hash=digest,
+                language=language)
+            for (path, digest), name in zip(batch, names)]
+
+        try:
+            with transaction.atomic():
+                last_pk = Transcript.objects.aggregate(
+                    last_pk=Max('pk'))['last_pk'] or 0
+                transcripts = Transcript.objects.bulk_create(transcripts)
+        except Exception:
+            # remove the files no other transcript shares
+            storage = Transcript._meta.get_field('transcript_file').storage
+            shared = set(Transcript.objects.filter(
+                transcript_file__in=names).values_list(
+                    'transcript_file', flat=True))
+            pool.map(storage.delete, set(names) - shared)
+            raise
+
+        if any(t.pk is None for t in transcripts):
+            # not all databases return primary keys from bulk inserts
+            transcripts = list(Transcript.objects.filter(
+                pk__gt=last_pk, transcript_file__in=names).order_by('pk'))
+        return transcripts
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        if not os.path.isdir(directory):
+            raise CommandError('%s is not a directory' % directory)
+
+        created = invalid = tags = 0
+        pool = ThreadPool(max(options['workers'], 1))
+
+        try:
+            paths = find_files(directory)
+            while True:
+                paths_batch = list(islice(paths, options['batch_size']))
+                if not paths_batch:
+                    break
+
+                batch = []
+                for path, (errors, digest) in zip(
+                        paths_batch, pool.map(check_file, paths_batch)):
+                    if errors:
+                        invalid += 1
+                        self.stderr.write('%s: %s' % (
+                            path, '; '.join(errors)))
+                    else:
+                        batch.append((path, digest))
+
+                if not batch:
+                    continue
+
+                transcripts = self.create_batch(
+                    pool, batch, options['language'])
+                created += len(transcripts)
+
+                if options['parse']:
+                    for transcript in transcripts:
+                        count, errors = transcript.parse(save=True)
+                        tags += count
+                        for error in errors:
+                            self.stderr.write('%s: %s' % (
+                                transcript.transcript_file.name, error))
+        finally:
+            pool.close()
+            pool.join()
+
+        self.stdout.write('%s transcripts created, %s invalid files' % (
+            created, invalid))
+        if options['parse']:
+            self.stdout.write('%s tags parsed' % tags)
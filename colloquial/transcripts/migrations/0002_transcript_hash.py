@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.8 on 2026-10-19 09:33
+from __future__ import unicode_literals
+
+import colloquial.colloquialisms.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transcripts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transcript',
+            name='transcript_hash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='transcript',
+            name='transcript_file',
+            field=colloquial.colloquialisms.fields.HashedFileField(blank=True, default='', hash_field='transcript_hash', help_text='WebVTT format', upload_to='transcripts'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.8 on 2026-10-19 10:07
+from __future__ import unicode_literals
+
+import colloquial.colloquialisms.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transcripts', '0002_transcript_hash'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transcript',
+            name='transcript_file',
+            field=colloquial.colloquialisms.fields.HashedFileField(blank=True, content_addressed=True, default='', hash_field='transcript_hash', help_text='WebVTT format', upload_to='transcripts'),
+        ),
+    ]
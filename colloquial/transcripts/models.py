@@ -6,6 +6,7 @@ from django.utils.translation import ugettext_lazy as _
 from django.utils.encoding import python_2_unicode_compatible
 from django.conf import settings
 
+from ..colloquialisms.fields import HashedFileField
 from ..colloquialisms.querysets import TranscriptQuerySet
 from ..colloquialisms.models import AbstractTranscript, \
     AbstractTag, DEFAULT_LANGUAGE
@@ -19,9 +20,13 @@ UPLOAD_PATH = getattr(settings, 'COLLOQUIAL_UPLOAD_PATH', 'transcripts')
 class Transcript(AbstractTranscript, models.Model):
     title = models.CharField(
         max_length=100, blank=True, default='', verbose_name=_('title'))
-    transcript_file = models.FileField(
+    transcript_file = HashedFileField(
         blank=True, default='', upload_to=UPLOAD_PATH,
-        help_text='WebVTT format')
+        help_text='WebVTT format', hash_field='transcript_hash',
+        content_addressed=True)
+    transcript_hash = models.CharField(
+        max_length=64, blank=True, default='', editable=False,
+        db_index=True)
     language = models.CharField(
         max_length=10, choices=settings.LANGUAGES, db_index=True,
         verbose_name=_('language'), default=DEFAULT_LANGUAGE)
@@ -47,6 +52,9 @@ class Transcript(AbstractTranscript, models.Model):
     def get_language(self):
         return self.language
 
+    def get_transcript_hash(self):
+        return self.transcript_hash
+
     def to_json(self):
         return {
             'title': self.title,
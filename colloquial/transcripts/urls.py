@@ -1,9 +1,11 @@
 from django.conf.urls import url
 
 from .models import Transcript
-from ..colloquialisms.views import tags
+from ..colloquialisms.views import similar, tags
 
 
 urlpatterns = [
     url(r'^tags/(?P<item_pk>\d+)', tags, {'item_cls': Transcript}, 'tags'),
+    url(r'^similar/(?P<item_pk>\d+)', similar, {'item_cls': Transcript},
+        'similar'),
 ]
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+"""Run the benchmark suite and print scaling curves. With --max-exponent,
+   exit with an error if any benchmark scales worse than the given exponent
+   (e.g. 1.5 to catch quadratic regressions).
+
+   The db suite runs against a test database created from the settings
+   module; set DJANGO_SETTINGS_MODULE to benchmark e.g. Postgres rather than
+   the default SQLite.
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+
+import django
+from django.conf import settings
+
+
+SUITES = ('parser', 'db', )
+
+
+def parse_sizes(value):
+    return tuple(int(v) for v in value.split(','))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('suites', nargs='*',
+                        help='one or more of: %s' % ', '.join(SUITES))
+    parser.add_argument('--sizes', type=parse_sizes,
+                        default=(100, 200, 400, 800))
+    parser.add_argument('--vocabulary-sizes', type=parse_sizes,
+                        default=(10, 100, 1000))
+    parser.add_argument('--db-sizes', type=parse_sizes,
+                        default=(1000, 2000, 4000, 8000))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-exponent', type=float, default=None)
+    args = parser.parse_args()
+    suites = args.suites or SUITES
+    for suite in suites:
+        if suite not in SUITES:
+            parser.error('unknown suite %s' % suite)
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tests.test_settings')
+    django.setup()
+
+    exponents = {}
+
+    if 'parser' in suites:
+        from benchmarks import bench_parser
+        exponents.update(bench_parser.run(
+            sizes=args.sizes, vocabulary_sizes=args.vocabulary_sizes,
+            repeat=args.repeat, seed=args.seed))
+
+    if 'db' in suites:
+        from django.db import connection
+        from benchmarks import bench_db
+
+        # run against a throwaway test database
+        connection.creation.create_test_db(verbosity=0)
+        try:
+            exponents.update(bench_db.run(
+                sizes=args.db_sizes, repeat=args.repeat,
+                seed_value=args.seed))
+        finally:
+            connection.creation.destroy_test_db(
+                settings.DATABASES['default']['NAME'], verbosity=0)
+
+    failed = [name for name, exponent in sorted(exponents.items())
+              if args.max_exponent is not None and exponent is not None and
+              exponent > args.max_exponent]
+    for name in failed:
+        print('%s scales with exponent %.2f (max %.2f)' % (
+            name, exponents[name], args.max_exponent))
+
+    sys.exit(bool(failed))
@@ -30,7 +30,7 @@ setup(
     install_requires=['Django>=1.8', 'pyvtt==0.0.1'],
     include_package_data=True,
     package_data={},
-    packages=find_packages(exclude=('tests', )),
+    packages=find_packages(exclude=('tests', 'benchmarks', )),
     classifiers=[
         'Development Status :: 5 - Production/Stable',
         'Environment :: Web Environment',
@@ -3,7 +3,15 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME':  'test.sqlite',
-    }
+        # a file rather than in memory, so the replica can share it
+        'TEST': {'NAME': 'test_colloquial.sqlite'},
+    },
+    # for read routing tests, see colloquialisms/routing.py
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME':  'test.sqlite',
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
 SECRET_KEY = '1'